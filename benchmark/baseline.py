@@ -0,0 +1,124 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+""" Machine-readable benchmark baselines.
+
+    A baseline is a json file with the environment of the run, the results
+    of each case ({case: {metric: value}}) and which metrics are better
+    higher or lower, so runs can be compared metric by metric.
+"""
+
+from __future__ import print_function
+
+import json
+import platform
+import sys
+import time
+
+
+def environment():
+    """ Describe where the benchmark ran.
+    """
+    return {'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def save(filename, results, higher=(), lower=()):
+    """ Save the results of a run as a baseline.
+        @param filename [string] The json file.
+        @param results [dict] The metrics of each case.
+        @param higher [list] The metrics where higher is better.
+        @param lower [list] The metrics where lower is better.
+    """
+    with open(filename, 'w') as f:
+        json.dump({'environment': environment(), 'results': results,
+                   'higher': list(higher), 'lower': list(lower)}, f,
+                  indent=2, sort_keys=True)
+
+
+def load(filename):
+    """ Load a baseline.
+        @param filename [string] The json file.
+        @returns [dict] The baseline (environment, results, higher, lower).
+    """
+    with open(filename) as f:
+        return json.load(f)
+
+
+def compare(results, filename, tolerance=0.1):
+    """ Compare the results of a run with a baseline and print the changes.
+        @param results [dict] The metrics of each case.
+        @param filename [string] The json file of the baseline.
+        @param tolerance [float] The relative change reported as a
+        regression.
+        @returns [list] The (case, metric, baseline, value) regressions.
+    """
+    state = load(filename)
+    baseline = state['results']
+    higher = state.get('higher', [])
+    lower = state.get('lower', [])
+    regressions = []
+    for case in sorted(results):
+        if case not in baseline:
+            continue
+        for metric in list(higher) + list(lower):
+            old = baseline[case].get(metric)
+            new = results[case].get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / float(old)
+            worse = -change if metric in higher else change
+            flag = ''
+            if worse > tolerance:
+                flag = 'REGRESSION'
+                regressions.append((case, metric, old, new))
+            elif -worse > tolerance:
+                flag = 'improved'
+            print('{:<40} {:<18} {:>12.4g} {:>12.4g} {:>+7.1%} {}'.format(
+                case, metric, old, new, change, flag))
+    return regressions
+
+
+def add_options(parser):
+    """ Add the baseline options to an argument parser.
+    """
+    parser.add_argument('--save', metavar='FILE',
+                        help='save the results as a baseline')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare the results with a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='relative change reported as a regression')
+
+
+def finish(args, results, higher=(), lower=()):
+    """ Save and/or compare the results as asked by the options.
+        @returns [int] The exit status (1 if a regression was found).
+    """
+    if args.save:
+        save(args.save, results, higher, lower)
+    if args.compare:
+        if compare(results, args.compare, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    # compare two baselines: baseline.py OLD NEW
+    if len(sys.argv) != 3:
+        print('usage: baseline.py OLD NEW')
+        sys.exit(2)
+    sys.exit(1 if compare(load(sys.argv[2])['results'], sys.argv[1]) else 0)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import print_function
+
+import timeit
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import numpy
+
+from task_behavior_engine import codec
+from task_behavior_engine.tree import Blackboard
+from task_behavior_engine.tree import NodeStatus
+
+
+def build_blackboard(nodes, image_size):
+    """ Build a blackboard holding a small value, an image and a status for
+        each of a number of nodes.
+    """
+    blackboard = Blackboard()
+    blackboard.save('mission', 'patrol')
+    for i in range(nodes):
+        scope = 'node' + str(i)
+        blackboard.save('count', i, scope)
+        blackboard.save('image', numpy.zeros(image_size, numpy.uint8), scope)
+        blackboard.set_node_status(scope, NodeStatus(NodeStatus.ACTIVE))
+    return blackboard
+
+
+def pickle_round_trip(blackboard):
+    return pickle.loads(pickle.dumps(blackboard, 2))
+
+
+def codec_round_trip(blackboard):
+    return codec.loads(*codec.dumps(blackboard))
+
+
+def bench(name, func, blackboard, nbytes, number):
+    seconds = min(timeit.repeat(lambda: func(blackboard),
+                                repeat=3, number=number)) / number
+    print('{:<8} {:>10.3f} ms {:>10.1f} MB/s'.format(
+        name, seconds * 1e3, nbytes / seconds / 1e6))
+
+
+if __name__ == '__main__':
+    for nodes, image_size in [(100, 0), (100, 64 * 1024), (10, 4 << 20)]:
+        blackboard = build_blackboard(nodes, image_size)
+        nbytes = len(pickle.dumps(blackboard, 2))
+        number = max(1, int(1e8 / max(nbytes, 1e6)))
+        print('{} nodes, {} byte images'.format(nodes, image_size))
+        bench('pickle', pickle_round_trip, blackboard, nbytes, number)
+        bench('codec', codec_round_trip, blackboard, nbytes, number)
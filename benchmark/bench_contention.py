@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+""" Throughput and tail latency of NodeData and Blackboard under contention.
+
+    For each target and each thread count N, N writer threads and N reader
+    threads call the target at the same time for --seconds, on a few keys
+    shared by all threads (so they contend for the same per-key locks).
+    Every call is timed, and the throughput and latency percentiles of the
+    readers and the writers are reported.
+
+    Targets:
+        nodedata: attribute reads and writes on a NodeData.
+        blackboard: Blackboard.get() and save() on a node scope.
+        get_memory: Blackboard.get_memory() of a scope (as a monitor does)
+                    while writers save() to it.
+
+    Usage: bench_contention.py [--threads N ...] [--target NAME ...]
+                               [--save FILE] [--compare FILE]
+"""
+
+from __future__ import print_function
+
+import argparse
+import sys
+import threading
+import timeit
+
+import baseline
+
+from task_behavior_engine.tree import Blackboard
+from task_behavior_engine.tree import NodeData
+
+
+def nodedata_target(keys):
+    """ Get the reader and the writer calls of a NodeData.
+        @param keys [list] The keys shared by the threads.
+        @returns [tuple] The reader and writer functions of a key.
+    """
+    nodedata = NodeData()
+    for key in keys:
+        setattr(nodedata, key, 0)
+    return (lambda key: getattr(nodedata, key),
+            lambda key: setattr(nodedata, key, 1))
+
+
+def blackboard_target(keys):
+    blackboard = Blackboard()
+    scope = 'node'
+    for key in keys:
+        blackboard.save(key, 0, scope)
+    return (lambda key: blackboard.get(key, scope),
+            lambda key: blackboard.save(key, 1, scope))
+
+
+def get_memory_target(keys):
+    blackboard = Blackboard()
+    scope = 'node'
+    for key in keys:
+        blackboard.save(key, 0, scope)
+    return (lambda key: blackboard.get_memory(scope),
+            lambda key: blackboard.save(key, 1, scope))
+
+
+TARGETS = [('nodedata', nodedata_target),
+           ('blackboard', blackboard_target),
+           ('get_memory', get_memory_target)]
+
+
+def worker(call, key, start, stop, latencies):
+    """ Call a function on a key until stopped, timing each call.
+        @param latencies [list] Filled with the latency of each call.
+    """
+    timer = timeit.default_timer
+    append = latencies.append
+    start.wait()
+    while not stop.is_set():
+        before = timer()
+        call(key)
+        append(timer() - before)
+
+
+def summarize(latencies, seconds):
+    """ Get the throughput and the latency percentiles of threads.
+        @param latencies [list] The latencies of each thread.
+        @returns [dict] The metrics.
+    """
+    values = sorted(value for thread in latencies for value in thread)
+    if not values:
+        return {'ops_per_second': 0.0}
+
+    def percentile(fraction):
+        return values[min(len(values) - 1, int(fraction * len(values)))] * 1e6
+    return {'ops_per_second': len(values) / seconds,
+            'p50_us': percentile(0.5),
+            'p99_us': percentile(0.99),
+            'p999_us': percentile(0.999),
+            'max_us': values[-1] * 1e6}
+
+
+def measure(target, threads, keys, seconds):
+    """ Run the readers and the writers of a target.
+        @param threads [int] The number of readers (and of writers).
+        @returns [dict] The metrics of the readers and the writers.
+    """
+    read, write = target(keys)
+    start = threading.Event()
+    stop = threading.Event()
+    readers = [[] for i in range(threads)]
+    writers = [[] for i in range(threads)]
+    pool = []
+    for i in range(threads):
+        key = keys[i % len(keys)]
+        pool.append(threading.Thread(
+            target=worker, args=(read, key, start, stop, readers[i])))
+        pool.append(threading.Thread(
+            target=worker, args=(write, key, start, stop, writers[i])))
+    for thread in pool:
+        thread.daemon = True
+        thread.start()
+    begin = timeit.default_timer()
+    start.set()
+    stop.wait(seconds)
+    stop.set()
+    for thread in pool:
+        thread.join()
+    elapsed = timeit.default_timer() - begin
+    result = {}
+    for role, latencies in (('read', readers), ('write', writers)):
+        for metric, value in summarize(latencies, elapsed).items():
+            result[role + '_' + metric] = value
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='numbers of readers (and of writers)')
+    parser.add_argument('--target', nargs='+', default=[t for t, f in TARGETS],
+                        choices=[t for t, f in TARGETS])
+    parser.add_argument('--keys', type=int, default=2,
+                        help='number of keys shared by the threads')
+    parser.add_argument('--seconds', type=float, default=1.0,
+                        help='time spent measuring each case')
+    baseline.add_options(parser)
+    args = parser.parse_args()
+
+    keys = ['key_%d' % i for i in range(args.keys)]
+    results = {}
+    print('{:<20} {:<5} {:>10} {:>8} {:>8} {:>9} {:>9}'.format(
+        'case', 'role', 'ops/s', 'p50 us', 'p99 us', 'p99.9 us', 'max us'))
+    for name, target in TARGETS:
+        if name not in args.target:
+            continue
+        for threads in args.threads:
+            case = '%s/threads=%d' % (name, threads)
+            result = results[case] = measure(target, threads, keys,
+                                             args.seconds)
+            for role in ('read', 'write'):
+                print('{:<20} {:<5} {:>10.0f} {:>8.2f} {:>8.2f} {:>9.2f} '
+                      '{:>9.1f}'.format(
+                          case, role, result[role + '_ops_per_second'],
+                          result.get(role + '_p50_us', 0),
+                          result.get(role + '_p99_us', 0),
+                          result.get(role + '_p999_us', 0),
+                          result.get(role + '_max_us', 0)))
+    return baseline.finish(
+        args, results,
+        higher=['read_ops_per_second', 'write_ops_per_second'],
+        lower=['read_p99_us', 'write_p99_us', 'read_p999_us',
+               'write_p999_us'])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
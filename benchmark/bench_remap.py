@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+""" Latency of blackboard calls as remappings grow.
+
+    A node reads a number of remapped keys (remaps) from a chain of nodes
+    (depth: the value is remapped from node to node depth times), with
+    values of a given size, on a blackboard shared with other nodes.  Each
+    parameter is swept on its own from the default configuration, and the
+    latency of get_memory(), save() and get() on the reading node is
+    measured.  A sweep stops once a call is slower than --max-call (reading
+    a remapped key reads the whole memory of its source, so chains grow as
+    remaps ** depth).
+
+    Usage: bench_remap.py [--remaps N ...] [--depth N ...] [--size N ...]
+                          [--nodes N ...] [--save FILE] [--compare FILE]
+"""
+
+from __future__ import print_function
+
+import argparse
+import sys
+import timeit
+
+import baseline
+
+from task_behavior_engine.tree import Blackboard
+
+DEFAULTS = {'remaps': 10, 'depth': 1, 'size': 16, 'nodes': 10}
+
+
+def build(remaps, depth, size, nodes):
+    """ Build a blackboard with remapping chains.
+        @param remaps [int] The number of keys remapped into the reader.
+        @param depth [int] The number of remappings between the source of a
+        key and the reader.
+        @param size [int] The size in bytes of the values.
+        @param nodes [int] The number of other nodes on the blackboard.
+        @returns [tuple] The blackboard and the scope of the reader.
+    """
+    blackboard = Blackboard()
+    for i in range(nodes):
+        blackboard.save('value', i, 'other_%d' % i)
+    value = b'x' * size
+    for key in range(remaps):
+        blackboard.save('key_%d' % key, value, 'source')
+    for level in range(1, depth + 1):
+        for key in range(remaps):
+            blackboard.add_remapping('source' if level == 1 else
+                                     'chain_%d' % (level - 1),
+                                     'key_%d' % key,
+                                     'chain_%d' % level if level < depth
+                                     else 'reader',
+                                     'key_%d' % key)
+    if not remaps:
+        blackboard.save('key_0', value, 'reader')
+    return blackboard, 'reader'
+
+
+def measure(blackboard, scope, seconds):
+    """ Measure the calls on the reader.
+        @param seconds [float] The time to spend measuring each call.
+        @returns [dict] The latency of each call in nanoseconds.
+    """
+    operations = {
+        'get_memory_ns': lambda: blackboard.get_memory(scope),
+        'save_ns': lambda: blackboard.save('local', 1, scope),
+        'get_ns': lambda: blackboard.get('key_0', scope)}
+    result = {}
+    for metric, operation in sorted(operations.items()):
+        number = 1
+        while timeit.timeit(operation, number=number) < seconds / 10 and \
+                number < 1 << 20:
+            number *= 4
+        call = min(timeit.repeat(operation, number=number, repeat=5))
+        result[metric] = call / number * 1e9
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--remaps', type=int, nargs='+',
+                        default=[0, 1, 10, 100])
+    parser.add_argument('--depth', type=int, nargs='+',
+                        default=[1, 2, 5, 10, 20])
+    parser.add_argument('--size', type=int, nargs='+',
+                        default=[16, 1 << 16, 1 << 22])
+    parser.add_argument('--nodes', type=int, nargs='+',
+                        default=[10, 1000, 10000])
+    parser.add_argument('--seconds', type=float, default=0.2,
+                        help='time spent measuring each call')
+    parser.add_argument('--max-call', type=float, default=0.01,
+                        help='stop a sweep once a call takes longer (s)')
+    baseline.add_options(parser)
+    args = parser.parse_args()
+
+    results = {}
+    print('{:<20} {:>14} {:>10} {:>10}'.format(
+        'case', 'get_memory ns', 'save ns', 'get ns'))
+    for parameter in ('remaps', 'depth', 'size', 'nodes'):
+        values = sorted(getattr(args, parameter))
+        for i, value in enumerate(values):
+            config = dict(DEFAULTS)
+            config[parameter] = value
+            name = '%s=%d' % (parameter, value)
+            blackboard, scope = build(**config)
+            result = results[name] = measure(blackboard, scope, args.seconds)
+            print('{:<20} {:>14.0f} {:>10.0f} {:>10.0f}'.format(
+                name, result['get_memory_ns'], result['save_ns'],
+                result['get_ns']))
+            if max(result.values()) > args.max_call * 1e9 and \
+                    i + 1 < len(values):
+                print('{:<20} skipped (calls slower than {}s)'.format(
+                    '%s>%d' % (parameter, value), args.max_call))
+                break
+    return baseline.finish(args, results,
+                           lower=['get_memory_ns', 'save_ns', 'get_ns'])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
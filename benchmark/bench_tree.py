@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+""" Tick throughput, per-node overhead and memory of synthetic trees.
+
+    Every composite of branch.py and every decorator of decorator.py is
+    benchmarked in a wide tree (one node with many leaves) and a deep tree
+    (a chain of nodes ending with a leaf).  The leaves are chosen so every
+    node of the tree is ticked on every tick, except for the wide Random
+    trees which tick one child per tick (ns/node is per node ticked).  The
+    blackboard calls made by nodes are benchmarked on their own, and so is
+    the creation of a tree, with its constructors and with Node.clone()
+    (which fails the run if it is slower than the constructors).
+
+    Usage: bench_tree.py [--width N ...] [--depth N ...] [--save FILE]
+                         [--compare FILE]
+"""
+
+from __future__ import print_function
+
+import argparse
+import gc
+import sys
+import timeit
+
+import baseline
+
+from task_behavior_engine import branch
+from task_behavior_engine import decorator
+from task_behavior_engine.node import Continue
+from task_behavior_engine.node import Fail
+from task_behavior_engine.node import Success
+from task_behavior_engine.tree import Blackboard
+
+# the leaf that makes each node tick all of its children
+COMPOSITES = [(branch.Selector, Fail),
+              (branch.Sequencer, Success),
+              (branch.Runner, Success),
+              (branch.Any, Fail),
+              (branch.All, Success),
+              (branch.Random, Success),
+              (branch.Progressor, Success),
+              (branch.Majority, Continue),
+              (branch.First, Continue)]
+
+DECORATORS = [(decorator.Negate, Success, ()),
+              (decorator.Repeat, Success, ()),
+              (decorator.While, Success, ()),
+              (decorator.Until, Fail, ()),
+              (decorator.UntilCount, Fail, (sys.maxsize,)),
+              (decorator.Fail, Success, ()),
+              (decorator.Succeed, Fail, ())]
+
+
+def wide_composite(composite, leaf, width):
+    blackboard = Blackboard()
+    root = composite('root', blackboard=blackboard)
+    for i in range(width):
+        root.add_child(leaf('leaf_%d' % i, blackboard=blackboard))
+    # Random only ticks the child it selected
+    ticked = 1 if composite is branch.Random else width
+    return root, width + 1, ticked + 1
+
+
+def deep_composite(composite, leaf, depth):
+    blackboard = Blackboard()
+    root = node = composite('node_0', blackboard=blackboard)
+    for i in range(1, depth):
+        child = composite('node_%d' % i, blackboard=blackboard)
+        node.add_child(child)
+        node = child
+    node.add_child(leaf('leaf', blackboard=blackboard))
+    return root, depth + 1, depth + 1
+
+
+def wide_decorator(decorator_class, leaf, args, width):
+    blackboard = Blackboard()
+    root = branch.Runner('root', blackboard=blackboard)
+    for i in range(width):
+        node = decorator_class('node_%d' % i, *args, blackboard=blackboard)
+        node.set_child(leaf('leaf', blackboard=blackboard))
+        root.add_child(node)
+    return root, 2 * width + 1, 2 * width + 1
+
+
+def deep_decorator(decorator_class, leaf, args, depth):
+    blackboard = Blackboard()
+    root = node = decorator_class('node_0', *args, blackboard=blackboard)
+    for i in range(1, depth):
+        child = decorator_class('node_%d' % i, *args, blackboard=blackboard)
+        node.set_child(child)
+        node = child
+    node.set_child(leaf('leaf', blackboard=blackboard))
+    return root, depth + 1, depth + 1
+
+
+def cases(widths, depths):
+    """ Generate the benchmark cases.
+        @returns [generator] (name, build) where build() returns the root
+        of a new tree, its number of nodes and the number of nodes ticked
+        by each tick.
+    """
+    for composite, leaf in COMPOSITES:
+        name = composite.__name__
+        for width in widths:
+            yield ('%s/wide/%d' % (name, width),
+                   lambda c=composite, l=leaf, w=width:
+                   wide_composite(c, l, w))
+        for depth in depths:
+            yield ('%s/deep/%d' % (name, depth),
+                   lambda c=composite, l=leaf, d=depth:
+                   deep_composite(c, l, d))
+    for decorator_class, leaf, args in DECORATORS:
+        name = decorator_class.__module__.split('.')[-1] + '.' + \
+            decorator_class.__name__
+        for width in widths:
+            yield ('%s/wide/%d' % (name, width),
+                   lambda c=decorator_class, l=leaf, a=args, w=width:
+                   wide_decorator(c, l, a, w))
+        for depth in depths:
+            yield ('%s/deep/%d' % (name, depth),
+                   lambda c=decorator_class, l=leaf, a=args, d=depth:
+                   deep_decorator(c, l, a, d))
+
+
+def blackboard_cases():
+    """ Generate the blackboard cases.
+        @returns [generator] (name, operation) where operation() is one call
+        on a blackboard.
+    """
+    blackboard = Blackboard()
+    node = branch.Sequencer('node', blackboard=blackboard)
+    blackboard.save('key', 1)
+    blackboard.save('key', 1, node._id)
+    blackboard.set_node_status(node._id, node._result)
+    yield 'Blackboard/save', lambda: blackboard.save('key', 1)
+    yield 'Blackboard/get', lambda: blackboard.get('key')
+    yield 'Blackboard/node_save', lambda: blackboard.save('key', 1, node._id)
+    yield 'Blackboard/node_get', lambda: blackboard.get('key', node._id)
+    yield 'Blackboard/get_memory', lambda: blackboard.get_memory(node._id)
+    yield ('Blackboard/set_node_status',
+           lambda: blackboard.set_node_status(node._id, node._result))
+
+
+def build_mission(blackboard):
+    """ Build a representative tree of 18 nodes.
+        @returns [Node] The root of the tree.
+    """
+    root = branch.Sequencer('mission', blackboard=blackboard)
+    for i in range(3):
+        option = branch.Selector('option_%d' % i, blackboard=blackboard)
+        option.add_child(decorator.Negate(
+            'check', child=Success('sense', blackboard=blackboard),
+            blackboard=blackboard))
+        option.add_child(Continue('act', blackboard=blackboard))
+        option.add_child(Fail('fallback', blackboard=blackboard))
+        root.add_child(option)
+    root.add_child(decorator.UntilCount(
+        'retry', 3, child=Fail('attempt', blackboard=blackboard),
+        blackboard=blackboard))
+    return root
+
+
+def create_cases():
+    """ Generate the tree creation cases.
+        @returns [generator] (name, operation) where operation() creates the
+        same tree, with its constructors or by cloning a prototype.
+    """
+    blackboard = Blackboard()
+    prototype = build_mission(blackboard)
+    yield 'Create/constructors', lambda: build_mission(blackboard)
+    yield 'Create/clone', prototype.clone
+
+
+def measure_memory(build):
+    """ Measure the memory of a tree (after its first tick).
+        The size of the objects created is counted with sys.getsizeof, so
+        it works without tracemalloc (which Python 2 does not have).
+        @returns [int] The number of bytes.
+    """
+    gc.collect()
+    before = set(id(o) for o in gc.get_objects())
+    before.add(id(before))
+    root, nodes, ticked = build()
+    root.tick()
+    gc.collect()
+    size = 0
+    for o in gc.get_objects():
+        if id(o) not in before:
+            size += sys.getsizeof(o)
+            # the dict of an instance is tracked, its strings are not
+            if isinstance(o, dict):
+                size += sum(sys.getsizeof(v) for v in o.values()
+                            if isinstance(v, str))
+    del root
+    return size
+
+
+def measure(build, seconds):
+    """ Measure the ticks of a tree.
+        @param build [function] Returns the root of a tree, its size and
+        the number of nodes ticked by each tick.
+        @param seconds [float] The time to spend measuring.
+        @returns [dict] The metrics.
+    """
+    root, nodes, ticked = build()
+    root.tick()
+    # calibrate the number of ticks per repeat
+    number = 1
+    while timeit.timeit(root.tick, number=number) < seconds / 10 and \
+            number < 1 << 20:
+        number *= 4
+    tick = min(timeit.repeat(root.tick, number=number, repeat=5)) / number
+    return {'nodes': nodes,
+            'ticks_per_second': 1.0 / tick,
+            'ns_per_node': tick * 1e9 / ticked,
+            'bytes_per_node': measure_memory(build) / float(nodes)}
+
+
+def measure_operation(operation, seconds):
+    """ Measure a blackboard call.
+        @returns [dict] The metrics.
+    """
+    number = 1
+    while timeit.timeit(operation, number=number) < seconds / 10 and \
+            number < 1 << 24:
+        number *= 4
+    call = min(timeit.repeat(operation, number=number, repeat=5)) / number
+    return {'ops_per_second': 1.0 / call}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--width', type=int, nargs='+', default=[10, 100])
+    parser.add_argument('--depth', type=int, nargs='+', default=[10, 50])
+    parser.add_argument('--seconds', type=float, default=0.5,
+                        help='time spent measuring each case')
+    parser.add_argument('--filter', default='',
+                        help='only run the cases containing this text')
+    baseline.add_options(parser)
+    args = parser.parse_args()
+
+    results = {}
+    print('{:<30} {:>6} {:>12} {:>10} {:>10}'.format(
+        'case', 'nodes', 'ticks/s', 'ns/node', 'B/node'))
+    for name, build in cases(args.width, args.depth):
+        if args.filter not in name:
+            continue
+        result = results[name] = measure(build, args.seconds)
+        print('{:<30} {:>6} {:>12.0f} {:>10.0f} {:>10.0f}'.format(
+            name, result['nodes'], result['ticks_per_second'],
+            result['ns_per_node'], result['bytes_per_node']))
+    print('{:<30} {:>6} {:>12}'.format('case', '', 'ops/s'))
+    for name, operation in blackboard_cases():
+        if args.filter not in name:
+            continue
+        result = results[name] = measure_operation(operation, args.seconds)
+        print('{:<30} {:>6} {:>12.0f}'.format(name, '',
+                                              result['ops_per_second']))
+    print('{:<30} {:>6} {:>12}'.format('case', '', 'trees/s'))
+    created = [(name, operation) for name, operation in create_cases()
+               if args.filter in name]
+    # alternate the cases so both see the same load
+    for i in range(3):
+        for name, operation in created:
+            result = measure_operation(operation, args.seconds / 3)
+            best = results.get(name)
+            if best is None or \
+                    result['ops_per_second'] > best['ops_per_second']:
+                results[name] = result
+    for name, operation in created:
+        print('{:<30} {:>6} {:>12.0f}'.format(
+            name, '', results[name]['ops_per_second']))
+    failed = False
+    if 'Create/constructors' in results and 'Create/clone' in results:
+        speedup = results['Create/clone']['ops_per_second'] / \
+            results['Create/constructors']['ops_per_second']
+        print('clone() is %.2fx as fast as the constructors' % speedup)
+        if speedup < 1:
+            print('FAIL: clone() is slower than the constructors')
+            failed = True
+    status = baseline.finish(args, results,
+                             higher=['ticks_per_second', 'ops_per_second'],
+                             lower=['ns_per_node', 'bytes_per_node'])
+    return 1 if failed else status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+""" Soak test: memory growth and latency drift over a long run.
+
+    Representative trees are ticked for a number of cycles.  Every --churn
+    cycles a tree is canceled and one of its subtrees is replaced by a new
+    one (new nodes, new scopes and new remappings), as a long deployment
+    does when missions change.  Every --interval cycles the RSS, the number
+    of objects, the size of the blackboards (scopes, statuses, remappings,
+    longest status text) and the percentiles of the cycle latency are
+    sampled.  The run fails (exit status 1) if, from the first sample to the
+    last, a measure grows more than its threshold.
+
+    Usage: soak.py [--cycles N] [--interval N] [--churn N] [--output FILE]
+"""
+
+from __future__ import print_function
+
+import argparse
+import gc
+import itertools
+import json
+import resource
+import sys
+import timeit
+
+from task_behavior_engine import branch
+from task_behavior_engine import decorator
+from task_behavior_engine.node import Fail
+from task_behavior_engine.node import Success
+from task_behavior_engine.tree import Blackboard
+from task_behavior_engine.tree import Node
+from task_behavior_engine.tree import NodeStatus
+
+_generations = itertools.count()
+
+
+def _sense(nodedata):
+    nodedata.reading = nodedata.get_data('reading', 0) + 1
+    return NodeStatus(NodeStatus.SUCCESS)
+
+
+def _act(nodedata):
+    nodedata.steps = nodedata.get_data('steps', 0) + 1
+    if nodedata.steps % 5:
+        return NodeStatus(NodeStatus.ACTIVE, "acting")
+    return NodeStatus(NodeStatus.SUCCESS, "done")
+
+
+def _reset_report(nodedata):
+    nodedata.report = NodeStatus(NodeStatus.SUCCESS, "report")
+
+
+def _report(nodedata):
+    # statuses of a long running leaf merged together (see NodeStatus.merge)
+    nodedata.report.merge(NodeStatus.SUCCESS, "ok")
+    return NodeStatus(NodeStatus.ACTIVE, "reporting")
+
+
+def build_task(blackboard):
+    """ Build a task subtree: sense, act on the (remapped) reading, retry.
+        @returns [Node] The root of the subtree.
+    """
+    task = branch.Sequencer('task_%d' % next(_generations),
+                            blackboard=blackboard)
+    sense = Node('sense', blackboard=blackboard, run_cb=_sense)
+    act = Node('act', blackboard=blackboard, run_cb=_act)
+    retry = decorator.UntilCount('retry', 3, blackboard=blackboard)
+    retry.set_child(Fail('attempt', blackboard=blackboard))
+    task.add_child(sense)
+    task.add_child(act)
+    task.add_child(decorator.Succeed('recover', child=retry,
+                                     blackboard=blackboard))
+    blackboard.add_remapping(sense._id, 'reading', act._id, 'target')
+    return task
+
+
+def build_mission():
+    """ Build a mission tree: tasks run in parallel with a reporter.
+        @returns [tuple] The root and the function replacing a task.
+    """
+    blackboard = Blackboard()
+    root = branch.Runner('mission', blackboard=blackboard)
+    tasks = branch.All('tasks', blackboard=blackboard)
+    for i in range(4):
+        tasks.add_child(build_task(blackboard))
+    root.add_child(tasks)
+    root.add_child(Node('report', blackboard=blackboard, run_cb=_report,
+                        configure_cb=_reset_report))
+
+    def churn():
+        root.cancel()
+        task = tasks.get_children()[0]
+        tasks.remove_child(task)
+        tasks.add_child(build_task(blackboard))
+    return root, churn
+
+
+def build_selector():
+    """ Build a fallback tree: a selector over repeated sequences.
+        @returns [tuple] The root and the function replacing a fallback.
+    """
+    blackboard = Blackboard()
+    root = branch.Selector('fallback', blackboard=blackboard)
+    for i in range(3):
+        root.add_child(decorator.Negate('option_%d' % next(_generations),
+                                        child=build_task(blackboard),
+                                        blackboard=blackboard))
+    root.add_child(Success('last_resort', blackboard=blackboard))
+
+    def churn():
+        root.cancel()
+        root.remove_child(root.get_children()[0])
+        root.prepend_child(
+            decorator.Negate('option_%d' % next(_generations),
+                             child=build_task(blackboard),
+                             blackboard=blackboard))
+    return root, churn
+
+
+TREES = [('mission', build_mission), ('selector', build_selector)]
+
+
+def rss():
+    """ Get the resident set size of the process.
+        @returns [int] The number of bytes (the peak RSS where /proc is not
+        available).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (IOError, OSError):
+        # ru_maxrss is in kilobytes on linux, bytes on mac
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def percentile(values, fraction):
+    """ Get a percentile of sorted values.
+    """
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def sample(cycle, roots, latencies):
+    """ Measure the process and the blackboards of the trees.
+        @param latencies [list] The latency of each cycle since the last
+        sample (in seconds).
+        @returns [dict] The measures.
+    """
+    gc.collect()
+    scopes = statuses = remaps = text = 0
+    for root in roots:
+        blackboard = root._blackboard
+        blackboard.collect()
+        scopes += len(blackboard._node_memory)
+        statuses += len(blackboard._node_status)
+        remaps += sum(len(memory['remapping'])
+                      for memory in blackboard._node_memory.values())
+        for scope, status in blackboard.get_status().items():
+            text = max(text, len(status.text))
+        for scope, memory in blackboard._node_memory.items():
+            report = memory['node_data'].get_data('report')
+            if report is not None:
+                text = max(text, len(report.text))
+    latencies = sorted(latencies)
+    return {'cycle': cycle,
+            'rss': rss(),
+            'objects': len(gc.get_objects()),
+            'scopes': scopes,
+            'statuses': statuses,
+            'remaps': remaps,
+            'text': text,
+            'p50_us': percentile(latencies, 0.5) * 1e6,
+            'p99_us': percentile(latencies, 0.99) * 1e6,
+            'max_us': latencies[-1] * 1e6}
+
+
+def check(samples, thresholds):
+    """ Compare the last sample with the first one.
+        @param thresholds [dict] The allowed growth of each measure, absolute
+        for sizes and relative for latencies (a ratio).
+        @returns [list] The description of each threshold exceeded.
+    """
+    failures = []
+    first, last = samples[0], samples[-1]
+    for measure, limit in sorted(thresholds.items()):
+        if measure.endswith('_us'):
+            growth = last[measure] / max(first[measure], 1e-9)
+        else:
+            growth = last[measure] - first[measure]
+        if growth > limit:
+            failures.append('%s grew from %g to %g (limit %g)' %
+                            (measure, first[measure], last[measure], limit))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cycles', type=int, default=2000000)
+    parser.add_argument('--interval', type=int, default=100000,
+                        help='cycles between samples')
+    parser.add_argument('--churn', type=int, default=1000,
+                        help='cycles between subtree replacements')
+    parser.add_argument('--warmup', type=int, default=1,
+                        help='samples ignored before the first one')
+    parser.add_argument('--max-rss', type=float, default=16,
+                        help='allowed RSS growth (MB)')
+    parser.add_argument('--max-objects', type=int, default=1000,
+                        help='allowed growth of the number of objects')
+    parser.add_argument('--max-scopes', type=int, default=0,
+                        help='allowed growth of the scopes, statuses and '
+                        'remappings of the blackboards')
+    parser.add_argument('--max-text', type=int, default=1024,
+                        help='allowed growth of the longest status text')
+    parser.add_argument('--max-drift', type=float, default=2.0,
+                        help='allowed ratio of the p50 and p99 latencies')
+    parser.add_argument('--output', metavar='FILE',
+                        help='save the samples as json')
+    args = parser.parse_args()
+
+    trees = [build() for name, build in TREES]
+    roots = [root for root, churn in trees]
+    ticks = [root.tick for root in roots]
+    churns = [churn for root, churn in trees]
+    timer = timeit.default_timer
+
+    samples = []
+    latencies = []
+    print('{:>10} {:>8} {:>9} {:>7} {:>8} {:>7} {:>7} {:>8} {:>8} {:>8}'
+          .format('cycle', 'RSS MB', 'objects', 'scopes', 'statuses',
+                  'remaps', 'text', 'p50 us', 'p99 us', 'max us'))
+    for cycle in range(1, args.cycles + 1):
+        start = timer()
+        for tick in ticks:
+            tick()
+        latencies.append(timer() - start)
+        if cycle % args.churn == 0:
+            churns[cycle // args.churn % len(churns)]()
+        if cycle % args.interval == 0:
+            measures = sample(cycle, roots, latencies)
+            latencies = []
+            samples.append(measures)
+            print('{cycle:>10} {0:>8.1f} {objects:>9} {scopes:>7} '
+                  '{statuses:>8} {remaps:>7} {text:>7} {p50_us:>8.1f} '
+                  '{p99_us:>8.1f} {max_us:>8.1f}'.format(
+                      measures['rss'] / 1e6, **measures))
+
+    thresholds = {'rss': args.max_rss * 1e6,
+                  'objects': args.max_objects,
+                  'scopes': args.max_scopes,
+                  'statuses': args.max_scopes,
+                  'remaps': args.max_scopes,
+                  'text': args.max_text,
+                  'p50_us': args.max_drift,
+                  'p99_us': args.max_drift}
+    failures = []
+    if len(samples) > args.warmup + 1:
+        failures = check(samples[args.warmup:], thresholds)
+    else:
+        print('not enough samples to check growth')
+    for failure in failures:
+        print('FAIL: ' + failure)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'samples': samples, 'failures': failures}, f,
+                      indent=2, sort_keys=True)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
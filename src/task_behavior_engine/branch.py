@@ -35,19 +35,18 @@ class Selector(Behavior):
         super(Selector, self).__init__(name, run_cb=self.run, *args, **kwargs)
 
     def run(self, nodedata):
-        logger.debug("Selector.run() " + str(self._children))
         self.reset_children_status()
         for c in self._children:
-            logger.debug("Selector.tick_child() " + c._name)
             result = self.tick_child(c)
             if result.status == NodeStatus.ACTIVE or result.status == NodeStatus.PENDING:
-                return NodeStatus(NodeStatus.ACTIVE,
-                                  str("Executing " + self._name + ":" + c._name))
+                return self._get_status(NodeStatus.ACTIVE,
+                                        "Executing %(node)s:%(child)s", c)
             if result.status == NodeStatus.SUCCESS:
-                return NodeStatus(NodeStatus.SUCCESS,
-                                  str("Successfully completed " + self._name + ":" + c._name))
+                return self._get_status(NodeStatus.SUCCESS,
+                                        "Successfully completed %(node)s:%(child)s", c)
 
-        return NodeStatus(NodeStatus.FAIL, str("All children failed in " + self._name))
+        return self._get_status(NodeStatus.FAIL,
+                                "All children failed in %(node)s")
 
 
 class Sequencer(Behavior):
@@ -62,19 +61,18 @@ class Sequencer(Behavior):
         super(Sequencer, self).__init__(name, run_cb=self.run, *args, **kwargs)
 
     def run(self, nodedata):
-        logger.debug("Sequencer.run() " + str(self._children))
         self.reset_children_status()
         for c in self._children:
-            logger.debug("Sequencer.tick_child() " + c._name)
             result = self.tick_child(c)
             if result.status == NodeStatus.ACTIVE or result.status == NodeStatus.PENDING:
-                return NodeStatus(NodeStatus.ACTIVE,
-                                  str("Executing " + self._name + ":" + c._name))
+                return self._get_status(NodeStatus.ACTIVE,
+                                        "Executing %(node)s:%(child)s", c)
             if not result.status == NodeStatus.SUCCESS:
-                return NodeStatus(NodeStatus.FAIL,
-                                  str("Failed to complete " + self._name + ":" + c._name))
+                return self._get_status(NodeStatus.FAIL,
+                                        "Failed to complete %(node)s:%(child)s", c)
 
-        return NodeStatus(NodeStatus.SUCCESS, str("All children succeeded in " + self._name))
+        return self._get_status(NodeStatus.SUCCESS,
+                                "All children succeeded in %(node)s")
 
 
 class Runner(Behavior):
@@ -88,15 +86,14 @@ class Runner(Behavior):
         super(Runner, self).__init__(name, run_cb=self.run, *args, **kwargs)
 
     def run(self, nodedata):
-        logger.debug("Runner.run() " + str(self._children))
         self.reset_children_status()
         for c in self._children:
-            logger.debug("Runner.tick_child() " + c._name)
             result = self.tick_child(c)
             if result.status == NodeStatus.ACTIVE or result.status == NodeStatus.PENDING:
-                return NodeStatus(NodeStatus.ACTIVE,
-                                  str("Executing " + self._name + ":" + c._name))
-        return NodeStatus(NodeStatus.SUCCESS, str("All children finished in " + self._name))
+                return self._get_status(NodeStatus.ACTIVE,
+                                        "Executing %(node)s:%(child)s", c)
+        return self._get_status(NodeStatus.SUCCESS,
+                                "All children finished in %(node)s")
 
 
 class Any(Behavior):
@@ -114,26 +111,25 @@ class Any(Behavior):
                                   *args, **kwargs)
 
     def configure(self, nodedata):
-        logger.debug("Any.configure() " + str(self._children))
         self._open_nodes = []
         for child in self._children:
             self._open_nodes.append(child._id)
 
     def run(self, nodedata):
-        logger.debug("Any.run() " + str(self._children))
         active = False
         for c in self._children:
             if c._id in self._open_nodes:
-                logger.debug("Any.tick_child() " + c._name)
                 result = self.tick_child(c)
                 if result.status == NodeStatus.SUCCESS:
-                    return NodeStatus(NodeStatus.SUCCESS, str("Found SUCCESS in " + self._name + ":" + c._name))
+                    return self._get_status(NodeStatus.SUCCESS,
+                                            "Found SUCCESS in %(node)s:%(child)s", c)
                 if result.status == NodeStatus.ACTIVE or result.status == NodeStatus.PENDING:
                     active = True
         if active:
-            return NodeStatus(NodeStatus.ACTIVE, str("Executing " + self._name))
+            return self._get_status(NodeStatus.ACTIVE, "Executing %(node)s")
 
-        return NodeStatus(NodeStatus.FAIL, str("Failed to complete " + self._name + ". All children failed."))
+        return self._get_status(NodeStatus.FAIL,
+                                "Failed to complete %(node)s. All children failed.")
 
 
 class All(Behavior):
@@ -151,26 +147,25 @@ class All(Behavior):
                                   *args, **kwargs)
 
     def configure(self, nodedata):
-        logger.debug("All.configure() " + str(self._children))
         self._open_nodes = []
         for child in self._children:
             self._open_nodes.append(child._id)
 
     def run(self, nodedata):
-        logger.debug("All.run() " + str(self._children))
         active = False
         for c in self._children:
             if c._id in self._open_nodes:
-                logger.debug("All.tick_child() " + c._name)
                 result = self.tick_child(c)
                 if result.status == NodeStatus.FAIL:
-                    return NodeStatus(NodeStatus.FAIL, str("Found FAIL in " + self._name + ":" + c._name))
+                    return self._get_status(NodeStatus.FAIL,
+                                            "Found FAIL in %(node)s:%(child)s", c)
                 if result.status == NodeStatus.ACTIVE or result.status == NodeStatus.PENDING:
                     active = True
         if active:
-            return NodeStatus(NodeStatus.ACTIVE, str("Executing " + self._name))
+            return self._get_status(NodeStatus.ACTIVE, "Executing %(node)s")
 
-        return NodeStatus(NodeStatus.SUCCESS, str("All succeeded in " + self._name))
+        return self._get_status(NodeStatus.SUCCESS,
+                                "All succeeded in %(node)s")
 
 
 class Random(Behavior):
@@ -191,15 +186,24 @@ class Random(Behavior):
             logger.info("No children set")
             self.child = None
             return
-        logger.debug("Random.config() " + str(self._children))
         self.child = random.choice(self._children)
-        logger.info("Selected random child: " + self.child._name)
+        logger.info("Selected random child: %s", self.child._name)
+
+    def _get_state(self):
+        state = super(Random, self)._get_state()
+        state['child'] = self.child._name if self.child else None
+        return state
+
+    def _set_state(self, state):
+        super(Random, self)._set_state(state)
+        self.child = None
+        for c in self._children:
+            if c._name == state.get('child'):
+                self.child = c
 
     def run(self, nodedata):
         if self.child is None:
-            logger.debug("Random.run() empty")
-            return NodeStatus(NodeStatus.SUCCESS, "No child selected")
-        logger.debug("Random.run() " + str(self.child._name))
+            return self._get_status(NodeStatus.SUCCESS, "No child selected")
         self.reset_children_status()
         return self.tick_child(self.child)
 
@@ -222,24 +226,31 @@ class Progressor(Behavior):
                                          *args, **kwargs)
 
     def configure(self, nodedata):
-        logger.debug("Progressor.config()" + str(self._children))
         self.index = 0
 
+    def _get_state(self):
+        state = super(Progressor, self)._get_state()
+        state['index'] = getattr(self, 'index', 0)
+        return state
+
+    def _set_state(self, state):
+        super(Progressor, self)._set_state(state)
+        self.index = state.get('index', 0)
+
     def run(self, nodedata):
-        logger.debug("Progressor.run()" + str(self._children))
-        for i, c in enumerate(self._children):
-            if self.index == i:
-                logger.debug("Progressor.tick_child() " + c._name)
-                result = self.tick_child(c)
-                if result.status == NodeStatus.ACTIVE or result.status == NodeStatus.PENDING:
-                    return NodeStatus(NodeStatus.ACTIVE,
-                                      str("Executing " + self._name + ":" + c._name))
-                if not result.status == NodeStatus.SUCCESS:
-                    return NodeStatus(result.status,
-                                      str("Failed to complete " + self._name + ":" + c._name))
-                self.index += 1
+        while self.index < len(self._children):
+            c = self._children[self.index]
+            result = self.tick_child(c)
+            if result.status == NodeStatus.ACTIVE or result.status == NodeStatus.PENDING:
+                return self._get_status(NodeStatus.ACTIVE,
+                                        "Executing %(node)s:%(child)s", c)
+            if not result.status == NodeStatus.SUCCESS:
+                return self._get_status(result.status,
+                                        "Failed to complete %(node)s:%(child)s", c)
+            self.index += 1
 
-        return NodeStatus(NodeStatus.SUCCESS, str("All children succeeded in " + self._name))
+        return self._get_status(NodeStatus.SUCCESS,
+                                "All children succeeded in %(node)s")
 
 
 class Majority(Behavior):
@@ -258,38 +269,44 @@ class Majority(Behavior):
                                        *args, **kwargs)
 
     def configure(self, nodedata):
-        logger.debug("Majority.config() " + str(self._children))
         self.num_fail = 0
         self.num_succeed = 0
         self._open_nodes = []
         for child in self._children:
             self._open_nodes.append(child._id)
 
+    def _get_state(self):
+        state = super(Majority, self)._get_state()
+        state['num_fail'] = getattr(self, 'num_fail', 0)
+        state['num_succeed'] = getattr(self, 'num_succeed', 0)
+        return state
+
+    def _set_state(self, state):
+        super(Majority, self)._set_state(state)
+        self.num_fail = state.get('num_fail', 0)
+        self.num_succeed = state.get('num_succeed', 0)
+
     def run(self, nodedata):
-        logger.debug("Majority.run() " + str(self._children))
         num_children = float(len(self._children))
         for c in self._children:
             if c._id in self._open_nodes:
-                logger.debug("Majority.tick_child() " + c._name)
                 result = self.tick_child(c)
                 if result.status == NodeStatus.FAIL:
                     self.num_fail += 1
                 if result.status == NodeStatus.SUCCESS:
                     self.num_succeed += 1
 
-                logger.debug("num_fail: " + str(self.num_fail))
-                logger.debug("num_succeed: " + str(self.num_succeed))
+                logger.debug("num_fail: %d num_succeed: %d of %d",
+                             self.num_fail, self.num_succeed, num_children)
 
-                logger.debug(
-                    "num_fail/num_children= " + str(self.num_fail / num_children))
                 if self.num_fail / num_children > 0.5:
-                    return NodeStatus(NodeStatus.FAIL, "The majority of children failed")
-                logger.debug(
-                    "num_succeed/num_children= " + str(self.num_succeed / num_children))
+                    return self._get_status(NodeStatus.FAIL,
+                                            "The majority of children failed")
                 if self.num_succeed / num_children >= 0.5:
-                    return NodeStatus(NodeStatus.SUCCESS, "The majority of children succeeded")
+                    return self._get_status(NodeStatus.SUCCESS,
+                                            "The majority of children succeeded")
 
-        return NodeStatus(NodeStatus.ACTIVE, str("Executing " + self._name))
+        return self._get_status(NodeStatus.ACTIVE, "Executing %(node)s")
 
 
 class First(Behavior):
@@ -303,11 +320,9 @@ class First(Behavior):
         super(First, self).__init__(name, run_cb=self.run, *args, **kwargs)
 
     def run(self, nodedata):
-        logger.debug("First.run() " + str(self._children))
         for c in self._children:
-            logger.debug("First.tick_child() " + c._name)
             result = self.tick_child(c)
             if result.status == NodeStatus.FAIL or result.status == NodeStatus.SUCCESS:
                 return result
 
-        return NodeStatus(NodeStatus.ACTIVE)
+        return self._get_status(NodeStatus.ACTIVE, "")
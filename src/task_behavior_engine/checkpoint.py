@@ -0,0 +1,448 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import logging
+import mmap
+import os
+import struct
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    from Queue import Empty
+except ImportError:
+    from queue import Empty
+
+from task_behavior_engine.delta import DeltaStream
+from task_behavior_engine.delta import Subscription
+from task_behavior_engine.tree import NodeStatus
+from task_behavior_engine.tree import walk
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'TBECKPT1'
+_HEADER = struct.Struct('<8sQ')
+_RECORD = struct.Struct('<II')
+_TOMBSTONE = 0xFFFFFFFF
+
+
+class Checkpoint(object):
+
+    """ A Checkpoint persists the execution state of a tree into a
+        memory-mapped file so that a restarted process can resume it.
+
+        The file is an append-only log of (key, value) records.  Each save()
+        only appends the records that changed since the last save().  Once
+        the log is full it is compacted into a new file.
+
+        Saved state:
+            node: The result/forced state of each node, plus any state the
+                  node keeps itself (see Node._get_state()).
+            status: The blackboard status of each node.
+            data: The NodeData of each node.
+            base: The global memory of each blackboard in the tree.
+
+        Nodes are addressed by path (root/child/grandchild) so the state can
+        be restored onto a freshly built tree with new node ids.
+
+        The first save() pickles the whole tree, later ones only pickle what
+        changed since: the state of the nodes that ran, and the statuses and
+        keys reported by the DeltaStream of each blackboard.  The stream of
+        a blackboard is shared if it exists, otherwise the Checkpoint
+        creates one, so a DeltaStream of your own must be created before
+        the Checkpoint.  Values changed in place (ie. a list appended to)
+        and keys written behind the back of the blackboard are only saved by
+        save(full=True).
+    """
+
+    def __init__(self, filename, root, size=1 << 20):
+        """ Checkpoint constructor.
+            Existing checkpoints in filename are kept until restore() or
+            save() is called.
+            @param filename [string] The checkpoint file.
+            @param root [Node] The root of the tree to checkpoint.
+            @param size [int] The initial size of the file in bytes.
+        """
+        self._filename = filename
+        self._root = root
+        self._file = None
+        self._mmap = None
+        self._end = _HEADER.size
+        self._written = {}
+        self._live_size = 0
+        self._unpicklable = set()
+        # the blackboards followed, and (stream, subscription, owned) of each
+        self._tracked = None
+        self._streams = []
+        # (node, state version, state) of each path at the last save
+        self._nodes = {}
+
+        if os.path.exists(filename) and os.path.getsize(filename) >= _HEADER.size:
+            self._open(max(size, os.path.getsize(filename)))
+            magic, end = _HEADER.unpack_from(self._mmap, 0)
+            if magic == _MAGIC and end <= len(self._mmap):
+                self._end = end
+                for key, value in self._read().items():
+                    self._set_record(pickle.loads(key), (key, value))
+            else:
+                logger.warning("Ignoring invalid checkpoint " + filename)
+                self._commit()
+        else:
+            self._open(size)
+            self._commit()
+
+    def _open(self, size):
+        """ Open (and grow) the checkpoint file and map it into memory.
+            @param size [int] The minimum size of the file in bytes.
+        """
+        self._close_file()
+        mode = 'r+b' if os.path.exists(self._filename) else 'w+b'
+        self._file = open(self._filename, mode)
+        self._file.seek(0, os.SEEK_END)
+        if self._file.tell() < size:
+            self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+
+    def _close_file(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _commit(self):
+        """ Write the header, marking all records up to the end as valid.
+        """
+        _HEADER.pack_into(self._mmap, 0, _MAGIC, self._end)
+
+    def _set_record(self, key, record):
+        """ Update the live records.
+            @param key [tuple] The key of the record.
+            @param record [tuple] The pickled (key, value), None to remove
+            the record.
+        """
+        previous = self._written.pop(key, None)
+        if previous is not None:
+            self._live_size -= _RECORD.size + len(previous[0]) + \
+                len(previous[1])
+        if record is not None:
+            self._written[key] = record
+            self._live_size += _RECORD.size + len(record[0]) + len(record[1])
+
+    def _read(self):
+        """ Read the valid records in the log.
+            @returns [dict] The latest value of every live key.
+        """
+        records = {}
+        offset = _HEADER.size
+        while offset < self._end:
+            key_len, value_len = _RECORD.unpack_from(self._mmap, offset)
+            offset += _RECORD.size
+            key = self._mmap[offset:offset + key_len]
+            offset += key_len
+            if value_len == _TOMBSTONE:
+                records.pop(key, None)
+                continue
+            records[key] = self._mmap[offset:offset + value_len]
+            offset += value_len
+        return records
+
+    def _append(self, key, value):
+        """ Append a record to the log.
+            @param key [bytes] The pickled key.
+            @param value [bytes] The pickled value, None for a removed key.
+        """
+        value_len = _TOMBSTONE if value is None else len(value)
+        _RECORD.pack_into(self._mmap, self._end, len(key), value_len)
+        self._end += _RECORD.size
+        self._mmap[self._end:self._end + len(key)] = key
+        self._end += len(key)
+        if value is not None:
+            self._mmap[self._end:self._end + len(value)] = value
+            self._end += len(value)
+
+    def _compact(self):
+        """ Rewrite the log with only the live records.
+            The log is written into a new file that replaces the old one,
+            so a crash never leaves a partially written checkpoint.
+        """
+        live_size = _HEADER.size + self._live_size
+        size = max(len(self._mmap), 2 * live_size)
+        self._close_file()
+        filename = self._filename
+        self._filename = filename + '.tmp'
+        if os.path.exists(self._filename):
+            os.remove(self._filename)
+        self._open(size)
+        self._end = _HEADER.size
+        for key, value in self._written.values():
+            self._append(key, value)
+        self._commit()
+        self._mmap.flush()
+        self._close_file()
+        os.rename(self._filename, filename)
+        self._filename = filename
+        self._open(size)
+
+    def _dumps(self, key, value):
+        """ Pickle a value, skipping values that can not be pickled.
+            @returns [bytes] The pickled value or None.
+        """
+        try:
+            return pickle.dumps(value, 2)
+        except Exception as e:
+            if key not in self._unpicklable:
+                self._unpicklable.add(key)
+                logger.warning("Can not checkpoint " + str(key) + ": " + str(e))
+            return None
+
+    def _track(self, blackboards):
+        """ Follow the changes to the blackboards of the tree.
+            @param blackboards [list] The blackboards of the tree.
+        """
+        self._untrack()
+        for blackboard in blackboards:
+            stream = blackboard._deltas
+            owned = stream is None
+            if owned:
+                stream = DeltaStream(blackboard)
+            # a single queued delta that accumulates the changes until save()
+            subscription = stream.subscribe(1, Subscription.MERGE)
+            self._streams.append((stream, subscription, owned))
+        self._tracked = blackboards
+
+    def _untrack(self):
+        """ Stop following the blackboards of the tree.
+        """
+        for stream, subscription, owned in self._streams:
+            stream.unsubscribe(subscription)
+            if owned and not stream._subscriptions:
+                stream.close()
+        self._streams = []
+        self._tracked = None
+
+    def _drain(self):
+        """ Get the changes to each followed blackboard since the last call.
+            @returns [list] The Delta of each blackboard (None if nothing
+            was reported).
+        """
+        deltas = []
+        for stream, subscription, owned in self._streams:
+            # send the changes made since the last tick
+            stream.flush()
+            try:
+                deltas.append(subscription.get_nowait())
+            except Empty:
+                deltas.append(None)
+        return deltas
+
+    def _add_node(self, values, path, node):
+        """ Collect the whole state of a node.
+            @param values [dict] The values of the records by key.
+            @param path [string] The path of the node.
+            @param node [Node] The node.
+        """
+        blackboard = node._blackboard
+        values[('node', path)] = node._get_state()
+        status = blackboard.get_node_status(node._id)
+        values[('status', path)] = (status.status, status.text)
+        memory = blackboard._node_memory.get(node._id, {})
+        nodedata = memory.get('node_data')
+        if nodedata is not None:
+            for key in nodedata.keys():
+                values[('data', path, key)] = nodedata[key]
+
+    def _collect(self, nodes, blackboards):
+        """ Collect the current state of the tree.
+            @param nodes [list] (path, node) of each node of the tree.
+            @param blackboards [list] The blackboards of the tree.
+            @returns [tuple] The values of the records by key, and the keys
+            of the records to remove.
+        """
+        values = {}
+        self._nodes = {}
+        for path, node in nodes:
+            self._add_node(values, path, node)
+            self._nodes[path] = (node, node._state_version,
+                                 values[('node', path)])
+
+        for index, blackboard in enumerate(blackboards):
+            for key, value in blackboard._base_memory.items():
+                values[('base', index, key)] = value
+
+        return values, [key for key in self._written if key not in values]
+
+    def _collect_changes(self, nodes, blackboards, deltas):
+        """ Collect the state of the tree that changed since the last save.
+            @param nodes [list] (path, node) of each node of the tree.
+            @param blackboards [list] The blackboards of the tree.
+            @param deltas [list] The changes to each blackboard.
+            @returns [tuple] The values of the records by key, and the keys
+            of the records to remove.
+        """
+        values = {}
+        removed = []
+        paths = {}
+        last = self._nodes
+        self._nodes = {}
+        for path, node in nodes:
+            paths[node._id] = path
+            version = node._state_version
+            seen = last.pop(path, None)
+            if seen is None or seen[0] is not node:
+                self._add_node(values, path, node)
+                state = values[('node', path)]
+            elif seen[1] != version:
+                # the node ran, only its changed state is pickled
+                state = node._get_state()
+                if state != seen[2]:
+                    values[('node', path)] = state
+            else:
+                state = seen[2]
+            self._nodes[path] = (node, version, state)
+        if last:
+            # nodes removed from the tree
+            removed.extend(key for key in self._written
+                           if key[0] != 'base' and key[1] in last)
+
+        for index, (blackboard, delta) in enumerate(zip(blackboards, deltas)):
+            if delta is None:
+                continue
+            for scope, status in delta.statuses.items():
+                path = paths.get(scope)
+                if path is not None:
+                    values[('status', path)] = (status.status, status.text)
+            base = blackboard._base_memory
+            for scope, key in delta.writes:
+                if scope is None:
+                    if key in base:
+                        values[('base', index, key)] = base[key]
+                    else:
+                        removed.append(('base', index, key))
+                    continue
+                path = paths.get(scope)
+                memory = blackboard._node_memory.get(scope)
+                if path is not None and memory is not None and \
+                        key in memory['node_data']:
+                    values[('data', path, key)] = memory['node_data'][key]
+
+        return values, removed
+
+    def save(self, sync=False, full=False):
+        """ Save the changes since the last save.
+            Saving flushes the DeltaStream of each blackboard, so changes
+            made since the last tick are sent to its subscriptions.
+            @param sync [bool] Flush the file to disk before returning.
+            @param full [bool] Compare the whole state of the tree with the
+            checkpoint, rather than only the changes that were tracked.
+            @returns [int] The number of records written.
+        """
+        nodes = list(walk(self._root))
+        blackboards = []
+        for path, node in nodes:
+            if node._blackboard not in blackboards:
+                blackboards.append(node._blackboard)
+        if self._tracked != blackboards:
+            self._track(blackboards)
+            full = True
+        deltas = self._drain()
+        if full:
+            values, removed = self._collect(nodes, blackboards)
+        else:
+            values, removed = self._collect_changes(nodes, blackboards,
+                                                    deltas)
+
+        changed = []
+        for key, value in values.items():
+            value = self._dumps(key, value)
+            written = self._written.get(key)
+            if value is None:
+                removed.append(key)
+            elif written is None or written[1] != value:
+                changed.append((key, value))
+        removed = [key for key in set(removed) if key in self._written]
+        if not changed and not removed:
+            return 0
+
+        needed = 0
+        for key, value in changed:
+            record = (pickle.dumps(key, 2), value)
+            self._set_record(key, record)
+            needed += _RECORD.size + len(record[0]) + len(value)
+        for key in removed:
+            needed += _RECORD.size + len(self._written[key][0])
+        records = [self._written[key] for key, value in changed] + \
+            [(self._written[key][0], None) for key in removed]
+        for key in removed:
+            self._set_record(key, None)
+
+        if (self._end + needed > len(self._mmap) or
+                self._end - _HEADER.size > 4 * max(self._live_size, 4096)):
+            self._compact()
+        else:
+            for key, value in records:
+                self._append(key, value)
+            self._commit()
+
+        if sync:
+            self._mmap.flush()
+        return len(changed) + len(removed)
+
+    def restore(self):
+        """ Restore the tree from the checkpoint.
+            Nodes are restored without calling any callbacks, so ACTIVE nodes
+            resume on the next tick without being configured again.
+            Records for paths that no longer exist in the tree are ignored.
+            @returns [int] The number of records restored.
+        """
+        nodes = dict(walk(self._root))
+        blackboards = []
+        for path, node in walk(self._root):
+            if node._blackboard not in blackboards:
+                blackboards.append(node._blackboard)
+
+        restored = 0
+        for key, (pickled_key, value) in self._written.items():
+            value = pickle.loads(value)
+            kind = key[0]
+            if kind == 'base':
+                if key[1] < len(blackboards):
+                    blackboards[key[1]]._base_memory[key[2]] = value
+                    restored += 1
+                continue
+            node = nodes.get(key[1])
+            if node is None:
+                logger.debug("Skipping checkpoint of unknown node " + key[1])
+                continue
+            if kind == 'node':
+                node._set_state(value)
+            elif kind == 'status':
+                node._blackboard.set_node_status(node._id, NodeStatus(*value))
+            elif kind == 'data':
+                memory = node._blackboard._get_node_memory(node._id)
+                memory['node_data'][key[2]] = value
+            restored += 1
+        # compare the whole tree on the next save
+        self._untrack()
+        return restored
+
+    def close(self):
+        """ Close the checkpoint file and stop following the tree.
+        """
+        self._untrack()
+        self._close_file()
@@ -0,0 +1,165 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import io
+import struct
+import sys
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    buffer
+except NameError:
+    def _view(obj, offset=0, size=-1):
+        view = memoryview(obj).cast('B')
+        if size < 0:
+            return view[offset:]
+        return view[offset:offset + size]
+else:
+    def _view(obj, offset=0, size=-1):
+        return buffer(obj, offset, size)
+
+MIN_SIZE = 4096
+
+_FRAME = struct.Struct('<QI')
+_LENGTH = struct.Struct('<Q')
+
+
+def dumps(obj, min_size=MIN_SIZE):
+    """ Encode an object.
+        The object is pickled, except for large bytes, bytearray and numpy
+        array values, which are passed out-of-band as a list of buffers (the
+        same scheme as pickle protocol 5, which Python 2 does not have).  The
+        buffers reference the memory of the original values, so they can be
+        written out without being copied.  Blackboard, NodeData and
+        StatusTable pickle only their data, so they can all be encoded.
+        @param obj [*] The object to encode.
+        @param min_size [int] The size in bytes from which values are passed
+        out-of-band.
+        @returns [tuple] (data [bytes], buffers [list]) The pickled object
+        and the out-of-band buffers.
+    """
+    buffers = []
+    numpy = sys.modules.get('numpy')
+
+    def persistent_id(obj):
+        kind = type(obj)
+        if kind is bytes or kind is bytearray:
+            if len(obj) < min_size:
+                return None
+            buffers.append(obj)
+            return (kind.__name__, len(buffers) - 1)
+        if numpy is not None and kind is numpy.ndarray:
+            if (obj.nbytes < min_size or obj.dtype.hasobject or
+                    not obj.flags.c_contiguous):
+                return None
+            buffers.append(_view(obj))
+            return ('ndarray', len(buffers) - 1, obj.dtype.str, obj.shape)
+        return None
+
+    stream = io.BytesIO()
+    pickler = pickle.Pickler(stream, 2)
+    pickler.persistent_id = persistent_id
+    pickler.dump(obj)
+    return stream.getvalue(), buffers
+
+
+def loads(data, buffers):
+    """ Decode an object.
+        Numpy arrays are views on the buffers (read-only if the buffers are).
+        @param data [bytes] The pickled object.
+        @param buffers [list] The out-of-band buffers.
+        @returns [*] The decoded object.
+    """
+    def persistent_load(pid):
+        buf = buffers[pid[1]]
+        if pid[0] == 'ndarray':
+            import numpy
+            return numpy.frombuffer(buf, dtype=pid[2]).reshape(pid[3])
+        if pid[0] == 'bytearray':
+            return bytearray(buf)
+        if isinstance(buf, bytes):
+            return buf
+        if isinstance(buf, memoryview):
+            return buf.tobytes()
+        return bytes(buf)
+
+    unpickler = pickle.Unpickler(io.BytesIO(data))
+    unpickler.persistent_load = persistent_load
+    return unpickler.load()
+
+
+def _nbytes(buf):
+    if isinstance(buf, memoryview):
+        return buf.nbytes
+    return len(buf)
+
+
+def dump(obj, fileobj, min_size=MIN_SIZE):
+    """ Write an encoded object to a file.
+        The frame is the size of the data and the number of buffers, the size
+        of each buffer, the data and then each buffer.  Buffers are written
+        directly from the memory of the values.
+        @param obj [*] The object to encode.
+        @param fileobj [file] A binary file opened for writing.
+        @param min_size [int] The size in bytes from which values are passed
+        out-of-band.
+        @returns [int] The number of bytes written.
+    """
+    data, buffers = dumps(obj, min_size)
+    sizes = [_nbytes(buf) for buf in buffers]
+    fileobj.write(_FRAME.pack(len(data), len(buffers)))
+    for size in sizes:
+        fileobj.write(_LENGTH.pack(size))
+    fileobj.write(data)
+    for buf in buffers:
+        fileobj.write(buf)
+    return _FRAME.size + _LENGTH.size * len(sizes) + len(data) + sum(sizes)
+
+
+def _read(fileobj, size):
+    data = fileobj.read(size)
+    if len(data) != size:
+        raise EOFError("Truncated frame")
+    return data
+
+
+def load(fileobj):
+    """ Read an encoded object from a file.
+        All buffers are read into one bytearray and numpy arrays are views on
+        it.
+        @param fileobj [file] A binary file opened for reading.
+        @returns [*] The decoded object.
+        @throws EOFError if the file ends before the end of the frame.
+    """
+    data_size, count = _FRAME.unpack(_read(fileobj, _FRAME.size))
+    sizes = [_LENGTH.unpack(_read(fileobj, _LENGTH.size))[0]
+             for i in range(count)]
+    data = _read(fileobj, data_size)
+    if hasattr(fileobj, 'readinto'):
+        blob = bytearray(sum(sizes))
+        if sizes and fileobj.readinto(blob) != len(blob):
+            raise EOFError("Truncated frame")
+    else:
+        # python 2 socket files can not read into a buffer
+        blob = bytearray(_read(fileobj, sum(sizes)))
+    buffers = []
+    offset = 0
+    for size in sizes:
+        buffers.append(_view(blob, offset, size))
+        offset += size
+    return loads(data, buffers)
@@ -34,12 +34,11 @@ class Negate(Decorator):
                                      *args, **kwargs)
 
     def run(self, nodedata):
-        logger.debug("Negate.run() " + self._child._name)
         result = self.tick_child()
         if result == NodeStatus.SUCCESS:
-            return NodeStatus(NodeStatus.FAIL, "Negating " + self._child._name)
+            return self._get_status(NodeStatus.FAIL, "Negating %(child)s", self._child)
         elif result == NodeStatus.FAIL:
-            return NodeStatus(NodeStatus.SUCCESS, "Negating " + self._child._name)
+            return self._get_status(NodeStatus.SUCCESS, "Negating %(child)s", self._child)
 
         return result
 
@@ -56,10 +55,9 @@ class Repeat(Decorator):
                                      *args, **kwargs)
 
     def run(self, nodedata):
-        logger.debug("Repeat.run() " + self._child._name)
         result = self.tick_child()
         if result == NodeStatus.SUCCESS or result == NodeStatus.FAIL:
-            return NodeStatus(NodeStatus.ACTIVE, "Repeating.. " + self._child._name)
+            return self._get_status(NodeStatus.ACTIVE, "Repeating.. %(child)s", self._child)
         return result
 
 
@@ -75,10 +73,9 @@ class While(Decorator):
                                     *args, **kwargs)
 
     def run(self, nodedata):
-        logger.debug("While.run() " + self._child._name)
         result = self.tick_child()
         if result == NodeStatus.SUCCESS:
-            return NodeStatus(NodeStatus.ACTIVE, "Continuing.. " + self._child._name)
+            return self._get_status(NodeStatus.ACTIVE, "Continuing.. %(child)s", self._child)
         return result
 
 
@@ -94,10 +91,9 @@ class Until(Decorator):
                                     *args, **kwargs)
 
     def run(self, nodedata):
-        logger.debug("Until.run() " + self._child._name)
         result = self.tick_child()
         if result == NodeStatus.FAIL:
-            return NodeStatus(NodeStatus.ACTIVE, "Trying again.. " + self._child._name)
+            return self._get_status(NodeStatus.ACTIVE, "Trying again.. %(child)s", self._child)
         return result
 
 
@@ -117,12 +113,13 @@ class UntilCount(Decorator):
         nodedata.max_count = self._max_count
 
     def run(self, nodedata):
-        logger.debug("UntilCount.run() " + self._child._name)
         result = self.tick_child()
         if result == NodeStatus.FAIL:
             nodedata.count += 1
             if nodedata.count < nodedata.max_count:
-                return NodeStatus(NodeStatus.ACTIVE, "Trying again %s until %s..".format(nodedata.count, nodedata.max_count))
+                return self._get_status(NodeStatus.ACTIVE,
+                                        "Trying again.. %(child)s",
+                                        self._child)
         return result
 
 
@@ -139,10 +136,9 @@ class Fail(Decorator):
         super(Fail, self).__init__(name=name, run_cb=self.run, *args, **kwargs)
 
     def run(self, nodedata):
-        logger.debug("Fail.run() " + self._child._name)
         result = self.tick_child()
         if result == NodeStatus.SUCCESS:
-            return NodeStatus(NodeStatus.FAIL, "Failing " + self._child._name)
+            return self._get_status(NodeStatus.FAIL, "Failing %(child)s", self._child)
         return result
 
 
@@ -161,8 +157,7 @@ class Succeed(Decorator):
                                       *args, **kwargs)
 
     def run(self, nodedata):
-        logger.debug("Succeed.run() " + self._child._name)
         result = self.tick_child()
         if result == NodeStatus.FAIL:
-            return NodeStatus(NodeStatus.SUCCESS, "Succeeding " + self._child._name)
+            return self._get_status(NodeStatus.SUCCESS, "Succeeding %(child)s", self._child)
         return result
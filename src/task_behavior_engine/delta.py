@@ -0,0 +1,282 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+import functools
+import logging
+import threading
+import time
+
+try:
+    from Queue import Empty
+except ImportError:
+    from queue import Empty
+
+from task_behavior_engine.tree import NodeStatus
+
+logger = logging.getLogger(__name__)
+
+
+class Delta(object):
+
+    """ The changes to a blackboard during one tick.
+
+        tick: The number of the tick (counted by the DeltaStream).
+        writes: {(scope, key): value} for each key written.  The scope is
+                None for the global memory.  If the stream does not send
+                values, the value is the version of the key (the number of
+                ticks in which it was written).
+        statuses: {scope: NodeStatus} for each node whose status (or status
+                  text) changed.
+    """
+
+    __slots__ = ('tick', 'writes', 'statuses')
+
+    def __init__(self, tick, writes=None, statuses=None):
+        self.tick = tick
+        self.writes = writes if writes is not None else {}
+        self.statuses = statuses if statuses is not None else {}
+
+    def __len__(self):
+        return len(self.writes) + len(self.statuses)
+
+    def __str__(self):
+        return "Delta(tick=%d, writes=%s, statuses=%s)" % (
+            self.tick, self.writes,
+            dict((scope, str(status))
+                 for scope, status in self.statuses.items()))
+
+    def merge(self, delta):
+        """ Merge a later delta into a copy of this one.
+            @param delta [Delta] The later delta.
+            @returns [Delta] The changes of both deltas.
+        """
+        writes = dict(self.writes)
+        writes.update(delta.writes)
+        statuses = dict(self.statuses)
+        statuses.update(delta.statuses)
+        return Delta(delta.tick, writes, statuses)
+
+
+class Subscription(object):
+
+    """ A bounded queue of deltas.
+        When the queue is full, the drop policy decides what happens to a
+        new delta:
+
+        DROP_OLDEST: The oldest queued delta is dropped.
+        DROP_NEWEST: The new delta is dropped.
+        MERGE: The new delta is merged into the newest queued delta, so no
+               change is lost (only the ticks they happened in).
+    """
+
+    DROP_OLDEST = 'drop_oldest'
+    DROP_NEWEST = 'drop_newest'
+    MERGE = 'merge'
+
+    def __init__(self, maxsize=64, policy=DROP_OLDEST):
+        """ Subscription constructor.
+            @param maxsize [int] The number of deltas to queue.
+            @param policy [string] The drop policy used when the queue is full.
+            @throws ValueError on an unknown policy or a maxsize below 1.
+        """
+        if policy not in (self.DROP_OLDEST, self.DROP_NEWEST, self.MERGE):
+            raise ValueError("Unknown drop policy " + str(policy))
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._queue = collections.deque()
+        self._ready = threading.Condition(threading.Lock())
+
+    def __len__(self):
+        return len(self._queue)
+
+    def put(self, delta):
+        """ Queue a delta, applying the drop policy if the queue is full.
+            @param delta [Delta] The delta to queue.
+        """
+        with self._ready:
+            queue = self._queue
+            if len(queue) >= self.maxsize:
+                self.dropped += 1
+                if self.policy == self.DROP_NEWEST:
+                    return
+                if self.policy == self.MERGE:
+                    queue[-1] = queue[-1].merge(delta)
+                    return
+                queue.popleft()
+            queue.append(delta)
+            self._ready.notify()
+
+    def get(self, block=True, timeout=None):
+        """ Get the oldest queued delta.
+            @param block [bool] Wait for a delta if the queue is empty.
+            @param timeout [float] The maximum time to wait in seconds.
+            @returns [Delta] The oldest delta.
+            @throws Empty if no delta is available.
+        """
+        with self._ready:
+            if block and timeout is None:
+                while not self._queue:
+                    self._ready.wait()
+            elif block:
+                end = time.time() + timeout
+                while not self._queue:
+                    remaining = end - time.time()
+                    if remaining <= 0:
+                        break
+                    self._ready.wait(remaining)
+            if not self._queue:
+                raise Empty
+            return self._queue.popleft()
+
+    def get_nowait(self):
+        """ Get the oldest queued delta without waiting.
+            @returns [Delta] The oldest delta.
+            @throws Empty if the queue is empty.
+        """
+        return self.get(False)
+
+
+class DeltaStream(object):
+
+    """ A DeltaStream emits the changes made to a blackboard in each tick.
+
+        Once the outermost tick() of a node using the blackboard returns,
+        the keys written and the nodes whose status changed since the last
+        delta are put in every subscription.  Changes made between ticks are
+        included in the next delta.
+
+        Values are sent by reference, so they should be treated as read-only
+        by subscribers.  Keys declared in a NodeData schema are written as
+        plain attributes, so they are compared (by identity) with their last
+        value when the delta is made.
+    """
+
+    def __init__(self, blackboard, values=True):
+        """ DeltaStream constructor.
+            @param blackboard [Blackboard] The blackboard to follow.
+            @param values [bool] Send the values of written keys (True) or
+            their version (False).
+            @throws RuntimeError if the blackboard already has a stream.
+        """
+        if blackboard._deltas is not None:
+            raise RuntimeError("Blackboard already has a delta stream")
+        self._blackboard = blackboard
+        self._values = values
+        self._tick = 0
+        self._depth = 0
+        self._writes = {}
+        self._touched = set()
+        self._statuses = {}
+        self._versions = {}
+        self._schemas = {}
+        self._subscriptions = []
+        for scope, memory in blackboard._node_memory.items():
+            self._watch(scope, memory['node_data'])
+        for scope, status in blackboard._node_status.items():
+            self._statuses[scope] = (status.status, status.text)
+        blackboard._deltas = self
+
+    def close(self):
+        """ Stop following the blackboard.
+        """
+        blackboard = self._blackboard
+        if blackboard._deltas is not self:
+            return
+        blackboard._deltas = None
+        for memory in blackboard._node_memory.values():
+            memory['node_data']._on_write = None
+        self._schemas = {}
+
+    def subscribe(self, maxsize=64, policy=Subscription.DROP_OLDEST):
+        """ Subscribe to the deltas.
+            @param maxsize [int] The number of deltas to queue.
+            @param policy [string] The drop policy (see Subscription).
+            @returns [Subscription] The queue of deltas.
+        """
+        subscription = Subscription(maxsize, policy)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """ Stop queuing deltas in a subscription.
+            @param subscription [Subscription] The subscription to remove.
+        """
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def _watch(self, scope, nodedata):
+        """ Follow the writes to the NodeData of a scope.
+        """
+        nodedata._on_write = functools.partial(self._write, scope)
+        fields = getattr(nodedata, '_schema', None)
+        if fields is not None:
+            names = [key for key, key_type, default in fields]
+            self._schemas[scope] = (nodedata, names,
+                                    [getattr(nodedata, name) for name in names])
+
+    def _write(self, scope, key, value):
+        self._writes[(scope, key)] = value
+
+    def _status(self, scope):
+        self._touched.add(scope)
+
+    def _clear(self):
+        self._touched.update(self._statuses)
+
+    def _drop(self, scope):
+        self._statuses.pop(scope, None)
+        self._schemas.pop(scope, None)
+        self._touched.discard(scope)
+        for key in [key for key in self._versions if key[0] == scope]:
+            del self._versions[key]
+
+    def flush(self):
+        """ Emit the changes since the last delta.
+            This is called after each tick, but may be called to send changes
+            made outside of a tick.
+            @returns [Delta] The delta sent to the subscriptions.
+        """
+        self._tick += 1
+        writes, self._writes = self._writes, {}
+        for scope, (nodedata, names, last) in self._schemas.items():
+            for i, name in enumerate(names):
+                value = getattr(nodedata, name)
+                if value is not last[i]:
+                    last[i] = value
+                    writes[(scope, name)] = value
+        if not self._values:
+            versions = self._versions
+            for key in writes:
+                writes[key] = versions[key] = versions.get(key, 0) + 1
+
+        statuses = {}
+        table = self._blackboard._node_status
+        touched, self._touched = self._touched, set()
+        for scope in touched:
+            if scope not in table:
+                continue
+            status = table.get(scope)
+            current = (status.status, status.text)
+            if self._statuses.get(scope, (NodeStatus.PENDING, '')) != current:
+                self._statuses[scope] = current
+                statuses[scope] = status
+
+        delta = Delta(self._tick, writes, statuses)
+        for subscription in self._subscriptions:
+            subscription.put(delta)
+        return delta
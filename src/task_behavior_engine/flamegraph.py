@@ -0,0 +1,143 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+import json
+import logging
+import threading
+
+from timeit import default_timer
+
+from task_behavior_engine import tracing
+from task_behavior_engine.tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+_TICK = tracing.TICK
+_ENTER = tracing.ENTER
+
+
+class FlameGraph(Tracer):
+
+    """ A tracer that aggregates the wall time of ticks per tree path.
+
+        The path of a tick is the names of the nodes ticking it, from the
+        outermost tick (ie. 'root;patrol;move_to').  The time of a tick minus
+        the time of the ticks of its children is added to its path, which is
+        the collapsed-stack format of flame graph tools (see
+        write_collapsed()).
+
+        Each tick is also kept as a complete event of the Chrome trace-event
+        format (see write_chrome_trace()) so single ticks can be looked at
+        in a timeline viewer.
+    """
+
+    def __init__(self, maxlen=100000):
+        """ FlameGraph constructor.
+            @param maxlen [int] The number of ticks kept for the timeline (0
+            to only aggregate).
+        """
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._self_times = collections.defaultdict(float)
+        self._spans = collections.deque(maxlen=maxlen) if maxlen else None
+        self._start = default_timer()
+
+    def record(self, kind, node, phase, status, _timer=default_timer):
+        if phase is not _TICK:
+            return
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        if kind == _ENTER:
+            name = node._name.replace(';', ':')
+            if stack:
+                name = stack[-1][0] + ';' + name
+            # [path, start time, time spent in children]
+            stack.append([name, _timer(), 0.0])
+            return
+        if not stack:
+            # the tracer was added in the middle of a tick
+            return
+        path, start, children = stack.pop()
+        elapsed = _timer() - start
+        if stack:
+            stack[-1][2] += elapsed
+        with self._lock:
+            self._self_times[path] += elapsed - children
+            if self._spans is not None:
+                self._spans.append((path, start, elapsed,
+                                    threading.current_thread().ident,
+                                    None if status is None else status.status))
+
+    def clear(self):
+        """ Remove the aggregated times and the kept ticks.
+        """
+        with self._lock:
+            self._self_times.clear()
+            if self._spans is not None:
+                self._spans.clear()
+
+    def get_self_times(self):
+        """ Get the self time of each path.
+            @returns [dict] The self time (in seconds) of each path.
+        """
+        with self._lock:
+            return dict(self._self_times)
+
+    def collapsed(self):
+        """ Get the self times in collapsed-stack format.
+            @returns [list] A 'path microseconds' line per path (sorted by
+            path).
+        """
+        return ["%s %d" % (path, int(round(seconds * 1e6)))
+                for path, seconds in sorted(self.get_self_times().items())]
+
+    def write_collapsed(self, filename):
+        """ Write the self times in collapsed-stack format (ie. for
+            flamegraph.pl or speedscope).
+            @param filename [string] The file.
+        """
+        with open(filename, 'w') as f:
+            for line in self.collapsed():
+                f.write(line + "\n")
+
+    def chrome_trace(self):
+        """ Get the kept ticks in Chrome trace-event format.
+            @returns [dict] The trace, with a complete ('X') event per tick.
+        """
+        with self._lock:
+            spans = list(self._spans or ())
+        events = []
+        for path, start, elapsed, thread, status in spans:
+            args = {'path': path}
+            if status is not None:
+                args['status'] = status
+            events.append({'name': path.rsplit(';', 1)[-1],
+                           'cat': 'tick',
+                           'ph': 'X',
+                           'ts': (start - self._start) * 1e6,
+                           'dur': elapsed * 1e6,
+                           'pid': 0,
+                           'tid': thread,
+                           'args': args})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, filename):
+        """ Write the kept ticks in Chrome trace-event format (ie. for
+            chrome://tracing or Perfetto).
+            @param filename [string] The file.
+        """
+        with open(filename, 'w') as f:
+            json.dump(self.chrome_trace(), f)
@@ -0,0 +1,150 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import logging
+
+from task_behavior_engine.tree import walk
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('_configure', '_run', '_cleanup', '_cancel')
+
+
+class Hook(object):
+
+    """ Base class for hooks called around the phases of a node
+        (_configure, _run, _cleanup and _cancel).
+
+        Hooks are added to the nodes of a tree with add_hook().  Nodes
+        without hooks are not modified, so hooks cost nothing until they are
+        added.
+    """
+
+    def enter(self, node, phase):
+        """ Called before a phase.
+            @param node [Node] The node.
+            @param phase [string] The phase (ie. '_run').
+            @returns [*] A token passed to exit().
+        """
+        return None
+
+    def exit(self, node, phase, token, error):
+        """ Called after a phase, even if it raised.
+            @param node [Node] The node.
+            @param phase [string] The phase (ie. '_run').
+            @param token [*] The token returned by enter().
+            @param error [Exception] The exception raised by the phase, or
+            None.
+        """
+        pass
+
+
+def _wrap(node, phase):
+    """ Wrap a phase of a node so it calls the hooks of the node.
+        @param node [Node] The node.
+        @param phase [string] The phase.
+        @returns [function] The wrapped phase.
+    """
+    original = getattr(node, phase)
+
+    def wrapper(*args, **kwargs):
+        hooks = node._hooks
+        if len(hooks) == 1:
+            hook = hooks[0]
+            token = hook.enter(node, phase)
+            try:
+                result = original(*args, **kwargs)
+            except Exception as e:
+                hook.exit(node, phase, token, e)
+                raise
+            hook.exit(node, phase, token, None)
+            return result
+        tokens = [hook.enter(node, phase) for hook in hooks]
+        try:
+            result = original(*args, **kwargs)
+        except Exception as e:
+            for i in range(len(hooks) - 1, -1, -1):
+                hooks[i].exit(node, phase, tokens[i], e)
+            raise
+        for i in range(len(hooks) - 1, -1, -1):
+            hooks[i].exit(node, phase, tokens[i], None)
+        return result
+    wrapper._original = original
+    # the phase was already overridden on the node itself
+    wrapper._own = phase in node.__dict__
+    return wrapper
+
+
+def add_node_hook(node, hook):
+    """ Add a hook to one node.
+        @param node [Node] The node.
+        @param hook [Hook] The hook.
+    """
+    hooks = node.__dict__.get('_hooks')
+    if hooks is None:
+        node._hooks = ()
+        for phase in PHASES:
+            setattr(node, phase, _wrap(node, phase))
+        hooks = ()
+    if hook not in hooks:
+        # replaced (not modified) so running wrappers keep their hooks
+        node._hooks = hooks + (hook,)
+
+
+def remove_node_hook(node, hook):
+    """ Remove a hook from one node.
+        The node is restored once it has no hooks left.
+        @param node [Node] The node.
+        @param hook [Hook] The hook.
+    """
+    hooks = node.__dict__.get('_hooks')
+    if hooks is None or hook not in hooks:
+        return
+    hooks = tuple(h for h in hooks if h is not hook)
+    if hooks:
+        node._hooks = hooks
+        return
+    del node._hooks
+    for phase in PHASES:
+        wrapper = node.__dict__.pop(phase)
+        if wrapper._own:
+            setattr(node, phase, wrapper._original)
+
+
+def add_hook(root, hook):
+    """ Add a hook to every node of a tree.
+        Nodes added to the tree later are not hooked (add_hook() may be
+        called again, nodes are only hooked once).
+        @param root [Node] The root of the tree.
+        @param hook [Hook] The hook.
+    """
+    for path, node in walk(root):
+        add_node_hook(node, hook)
+
+
+def remove_hook(root, hook):
+    """ Remove a hook from every node of a tree.
+        @param root [Node] The root of the tree.
+        @param hook [Hook] The hook.
+    """
+    for path, node in walk(root):
+        remove_node_hook(node, hook)
+
+
+def get_hooks(node):
+    """ Get the hooks of a node.
+        @param node [Node] The node.
+        @returns [tuple] The hooks of the node.
+    """
+    return node.__dict__.get('_hooks', ())
@@ -0,0 +1,266 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import array
+import bisect
+import logging
+import os
+import threading
+
+from timeit import default_timer
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler
+    from BaseHTTPServer import HTTPServer
+except ImportError:
+    from http.server import BaseHTTPRequestHandler
+    from http.server import HTTPServer
+
+from task_behavior_engine.hooks import Hook
+from task_behavior_engine.hooks import add_hook
+from task_behavior_engine.hooks import remove_hook
+from task_behavior_engine.tree import NodeStatus
+from task_behavior_engine.tree import walk
+
+logger = logging.getLogger(__name__)
+
+# tick duration buckets (upper bounds in seconds)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+OTHER = 'other'
+
+_OUTCOMES = ((NodeStatus.PENDING, 'pending'), (NodeStatus.ACTIVE, 'active'),
+             (NodeStatus.SUCCESS, 'success'), (NodeStatus.FAIL, 'fail'),
+             (NodeStatus.CANCEL, 'cancel'))
+# counters of a node: one per outcome, then the number of cancels
+_CANCELS = len(_OUTCOMES)
+
+
+def _label(value):
+    """ Escape a label value of the Prometheus text format.
+    """
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class TreeMetrics(Hook):
+
+    """ The metrics of one tree (see Metrics.add_tree()).
+
+        Each node has a counter per outcome of its _run phase and a counter
+        of its _cancel phase.  Counters are plain arrays only updated by the
+        thread ticking the tree, so they need no lock.  To bound the number
+        of label values, only the max_nodes nodes closest to the root have
+        their own counters, the others share the counters labeled 'other'.
+
+        The duration of the _run phase of the root (ie. a tick of the tree)
+        is counted in a histogram with the BUCKETS bounds.
+    """
+
+    def __init__(self, root, name=None, max_nodes=256):
+        """ TreeMetrics constructor.
+            @param root [Node] The root of the tree.
+            @param name [string] (optional) The tree label (default is the
+            name of the root).
+            @param max_nodes [int] The number of nodes with their own label.
+        """
+        self._root = root
+        self.name = name or root._name
+        self._max_nodes = max_nodes
+        self._counters = {}
+        self._labels = []
+        self._other = None
+        self._durations = array.array('L', [0] * (len(BUCKETS) + 1))
+        self._duration_sum = 0.0
+        self._update()
+
+    def _update(self):
+        """ Assign counters to the nodes of the tree.
+        """
+        nodes = [(path.count('/'), i, path, node)
+                 for i, (path, node) in enumerate(walk(self._root))
+                 if node._id not in self._counters]
+        nodes.sort()
+        for depth, i, path, node in nodes:
+            if len(self._labels) < self._max_nodes:
+                counters = array.array('L', [0] * (_CANCELS + 1))
+                self._labels.append((path, counters))
+            else:
+                if self._other is None:
+                    self._other = array.array('L', [0] * (_CANCELS + 1))
+                    self._labels.append((OTHER, self._other))
+                counters = self._other
+            self._counters[node._id] = counters
+
+    def enter(self, node, phase):
+        if phase == '_run' and node is self._root:
+            return default_timer()
+        return None
+
+    def exit(self, node, phase, token, error):
+        if phase == '_run':
+            if error is None:
+                self._counters[node._id][node._result.status] += 1
+            if token is not None:
+                elapsed = default_timer() - token
+                self._durations[bisect.bisect_left(BUCKETS, elapsed)] += 1
+                self._duration_sum += elapsed
+        elif phase == '_cancel':
+            self._counters[node._id][_CANCELS] += 1
+
+    def get_counts(self, path):
+        """ Get the counters of a node.
+            @param path [string] The path of the node (or OTHER).
+            @returns [dict] The count of each outcome ('success'...) and of
+            cancels ('canceled').
+        """
+        for label, counters in self._labels:
+            if label == path:
+                counts = dict((outcome, counters[status])
+                              for status, outcome in _OUTCOMES)
+                counts['canceled'] = counters[_CANCELS]
+                return counts
+        raise KeyError(path)
+
+    def format(self):
+        """ Format the metrics of the tree (without HELP/TYPE lines).
+            @returns [tuple] The outcome, cancel and duration lines.
+        """
+        tree = _label(self.name)
+        outcomes = []
+        cancels = []
+        for path, counters in list(self._labels):
+            node = _label(path)
+            for status, outcome in _OUTCOMES:
+                if counters[status]:
+                    outcomes.append(
+                        'tbe_node_outcomes_total{tree="%s",node="%s",'
+                        'outcome="%s"} %d' % (tree, node, outcome,
+                                              counters[status]))
+            if counters[_CANCELS]:
+                cancels.append('tbe_node_cancels_total{tree="%s",node="%s"} %d'
+                               % (tree, node, counters[_CANCELS]))
+        durations = []
+        total = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), self._durations):
+            total += count
+            durations.append('tbe_tick_duration_seconds_bucket{tree="%s",'
+                             'le="%s"} %d' % (tree, bound, total))
+        durations.append('tbe_tick_duration_seconds_sum{tree="%s"} %r'
+                         % (tree, self._duration_sum))
+        durations.append('tbe_tick_duration_seconds_count{tree="%s"} %d'
+                         % (tree, total))
+        return outcomes, cancels, durations
+
+
+class Metrics(object):
+
+    """ Counters of node outcomes and histograms of tick durations of trees,
+        exported in the Prometheus text format (see format(), write() and
+        serve()).
+    """
+
+    def __init__(self):
+        self._trees = []
+
+    def add_tree(self, root, name=None, max_nodes=256):
+        """ Start counting the metrics of a tree.
+            Call it again to include nodes added to the tree since.
+            @param root [Node] The root of the tree.
+            @param name [string] (optional) The tree label (default is the
+            name of the root).
+            @param max_nodes [int] The number of nodes with their own label.
+            @returns [TreeMetrics] The metrics of the tree.
+        """
+        for tree in self._trees:
+            if tree._root is root:
+                tree._update()
+                add_hook(root, tree)
+                return tree
+        tree = TreeMetrics(root, name, max_nodes)
+        add_hook(root, tree)
+        # replaced (not modified) so format() can run in another thread
+        self._trees = self._trees + [tree]
+        return tree
+
+    def remove_tree(self, root):
+        """ Stop counting the metrics of a tree.  Its metrics are dropped.
+            @param root [Node] The root of the tree.
+        """
+        for tree in self._trees:
+            if tree._root is root:
+                remove_hook(root, tree)
+                self._trees = [t for t in self._trees if t is not tree]
+                return
+
+    def format(self):
+        """ Format the metrics in the Prometheus text format.
+            @returns [string] The metrics.
+        """
+        outcomes = []
+        cancels = []
+        durations = []
+        for tree in self._trees:
+            tree_outcomes, tree_cancels, tree_durations = tree.format()
+            outcomes.extend(tree_outcomes)
+            cancels.extend(tree_cancels)
+            durations.extend(tree_durations)
+        lines = [
+            '# HELP tbe_node_outcomes_total Results of the run phase of '
+            'nodes.',
+            '# TYPE tbe_node_outcomes_total counter'] + outcomes + [
+            '# HELP tbe_node_cancels_total Cancels of nodes.',
+            '# TYPE tbe_node_cancels_total counter'] + cancels + [
+            '# HELP tbe_tick_duration_seconds Duration of the ticks of '
+            'trees.',
+            '# TYPE tbe_tick_duration_seconds histogram'] + durations
+        return '\n'.join(lines) + '\n'
+
+    def write(self, filename):
+        """ Write the metrics to a file (ie. for the textfile collector of
+            the node exporter).  The file is replaced atomically.
+            @param filename [string] The file.
+        """
+        with open(filename + '.tmp', 'w') as f:
+            f.write(self.format())
+        os.rename(filename + '.tmp', filename)
+
+    def serve(self, port=0, address='127.0.0.1'):
+        """ Serve the metrics over HTTP from a background thread.
+            @param port [int] The port (0 picks a free port).
+            @param address [string] The address to listen on.
+            @returns [HTTPServer] The server (see server_address, and
+            shutdown() to stop it).
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                body = metrics.format().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type',
+                                 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        server = HTTPServer((address, port), Handler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return server
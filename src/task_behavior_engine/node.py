@@ -25,7 +25,7 @@ class Success(Node):
         super(Success, self).__init__(name, run_cb=self.run, *args, **kwargs)
 
     def run(self, nodedata):
-        return NodeStatus(NodeStatus.SUCCESS)
+        return self._get_status(NodeStatus.SUCCESS, "")
 
 
 class Fail(Node):
@@ -36,7 +36,7 @@ class Fail(Node):
         super(Fail, self).__init__(name, run_cb=self.run, *args, **kwargs)
 
     def run(self, nodedata):
-        return NodeStatus(NodeStatus.FAIL)
+        return self._get_status(NodeStatus.FAIL, "")
 
 
 class Continue(Node):
@@ -47,4 +47,4 @@ class Continue(Node):
         super(Continue, self).__init__(name, run_cb=self.run, *args, **kwargs)
 
     def run(self, nodedata):
-        return NodeStatus(NodeStatus.ACTIVE)
+        return self._get_status(NodeStatus.ACTIVE, "")
@@ -0,0 +1,255 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import logging
+
+from task_behavior_engine import codec
+from task_behavior_engine.tree import Behavior
+from task_behavior_engine.tree import Decorator
+from task_behavior_engine.tree import NodeStatus
+from task_behavior_engine.tree import walk
+
+logger = logging.getLogger(__name__)
+
+
+def _leaves(root):
+    """ Get the leaves (execution nodes) of a tree.
+        @param root [Node] The root of the tree.
+        @returns [list] (path, node) of each leaf.
+    """
+    return [(path, node) for path, node in walk(root)
+            if not isinstance(node, (Behavior, Decorator))]
+
+
+def _snapshot(memory):
+    """ Get the values of a NodeData (or dict) by key.
+    """
+    if isinstance(memory, dict):
+        return dict(memory)
+    return dict((key, memory.get_data(key)) for key in memory.keys())
+
+
+def _changes(before, after):
+    """ Get the keys written between two snapshots (compared by identity).
+        @returns [list] (key, value) of each written key.
+    """
+    return [(key, value) for key, value in after.items()
+            if key not in before or before[key] is not value]
+
+
+class Recording(object):
+
+    """ The results of the run callbacks of the leaves of a tree.
+
+        steps: The steps of each leaf (by path), a step is the status enum
+               and text returned by the run callback, the keys it wrote to
+               its NodeData and the keys it wrote to the global memory of the
+               blackboard (as lists of (key, value)).
+        results: The status enum returned by each tick of the root.
+
+        Values are kept by reference (they are only encoded by save()).
+    """
+
+    def __init__(self, steps=None, results=None):
+        self.steps = steps if steps is not None else {}
+        self.results = results if results is not None else []
+
+    def __len__(self):
+        return len(self.results)
+
+    def save(self, filename):
+        """ Write the recording to a file (see codec).
+            @param filename [string] The file.
+        """
+        with open(filename, 'wb') as f:
+            codec.dump({'steps': self.steps, 'results': self.results}, f)
+
+    @staticmethod
+    def load(filename):
+        """ Read a recording written by save().
+            @param filename [string] The file.
+            @returns [Recording] The recording.
+        """
+        with open(filename, 'rb') as f:
+            state = codec.load(f)
+        return Recording(state['steps'], state['results'])
+
+
+class CallbackRecorder(object):
+
+    """ Records what the run callbacks of the leaves of a tree return and
+        write while the tree is ticked (see Recording).
+
+        Between start() and stop(), the run callback of each leaf and the
+        tick of the root are wrapped.  Writes are found by comparing the
+        NodeData of the leaf and the global memory before and after the
+        callback, so values modified in place are not seen as writes.
+    """
+
+    def __init__(self, root):
+        """ CallbackRecorder constructor.
+            @param root [Node] The root of the tree.
+        """
+        self._root = root
+        self._callbacks = []
+        self.recording = Recording()
+
+    def start(self):
+        """ Start recording.
+        """
+        if self._callbacks:
+            return
+        blackboard = self._root._blackboard
+        for path, node in _leaves(self._root):
+            steps = self.recording.steps.setdefault(path, [])
+            self._callbacks.append((node, node._run_cb))
+            node._run_cb = self._wrap(node._run_cb, blackboard, steps)
+
+        results = self.recording.results
+        tick = self._root.tick
+
+        def record_tick(*args, **kwargs):
+            result = tick(*args, **kwargs)
+            results.append(result.status)
+            return result
+        self._root.tick = record_tick
+
+    @staticmethod
+    def _wrap(run_cb, blackboard, steps):
+        """ Wrap a run callback so its results are added to steps.
+        """
+        def record(nodedata):
+            memory = blackboard._base_memory
+            before = _snapshot(nodedata)
+            global_before = dict(memory)
+            result = run_cb(nodedata)
+            steps.append((result.status, result.text,
+                          _changes(before, _snapshot(nodedata)),
+                          _changes(global_before, memory)))
+            return result
+        return record
+
+    def stop(self):
+        """ Stop recording and restore the callbacks.
+            @returns [Recording] The recording.
+        """
+        for node, run_cb in self._callbacks:
+            node._run_cb = run_cb
+        self._callbacks = []
+        self._root.__dict__.pop('tick', None)
+        return self.recording
+
+
+class CallbackPlayer(object):
+
+    """ Replays a Recording on a tree: the run callbacks of the leaves are
+        replaced by the recorded results and writes, and their configure,
+        cleanup and cancel callbacks are disabled, so the composites of the
+        tree run against the recorded leaves as fast as possible.
+
+        The tree is matched to the recording by path.  A leaf ticked more
+        often than recorded (ie. after a change to the composites) raises a
+        RuntimeError.
+    """
+
+    def __init__(self, root, recording):
+        """ CallbackPlayer constructor.
+            @param root [Node] The root of the tree.
+            @param recording [Recording] The recording.
+        """
+        self._root = root
+        self._recording = recording
+        self._callbacks = []
+        self._positions = {}
+
+    def start(self):
+        """ Replace the callbacks of the leaves by the recording.
+            @throws KeyError if a leaf is not in the recording.
+        """
+        if self._callbacks:
+            return
+        blackboard = self._root._blackboard
+        leaves = _leaves(self._root)
+        for path, node in leaves:
+            if path not in self._recording.steps:
+                raise KeyError("No recording of " + path)
+        for path, node in leaves:
+            self._callbacks.append(
+                (node, node._run_cb, node._configure_cb, node._cleanup_cb,
+                 node._cancel_cb))
+            self._positions[path] = 0
+            node._run_cb = self._replay(path, blackboard)
+            node._configure_cb = None
+            node._cleanup_cb = None
+            node._cancel_cb = None
+
+    def _replay(self, path, blackboard):
+        """ Get a run callback replaying the steps of a leaf.
+        """
+        steps = self._recording.steps[path]
+        positions = self._positions
+        statuses = {}
+
+        def replay(nodedata):
+            position = positions[path]
+            if position == len(steps):
+                raise RuntimeError("Recording of %s is exhausted after %d "
+                                   "steps" % (path, position))
+            positions[path] = position + 1
+            status, text, writes, global_writes = steps[position]
+            for key, value in writes:
+                nodedata[key] = value
+            for key, value in global_writes:
+                blackboard.save(key, value)
+            result = statuses.get((status, text))
+            if result is None:
+                result = statuses[(status, text)] = NodeStatus(status, text)
+            return result
+        return replay
+
+    def stop(self):
+        """ Restore the callbacks of the leaves.
+        """
+        for node, run_cb, configure_cb, cleanup_cb, cancel_cb in \
+                self._callbacks:
+            node._run_cb = run_cb
+            node._configure_cb = configure_cb
+            node._cleanup_cb = cleanup_cb
+            node._cancel_cb = cancel_cb
+        self._callbacks = []
+
+    def remaining(self):
+        """ Get the steps of each leaf that were not replayed yet.
+            @returns [dict] The number of steps left of each leaf (by path).
+        """
+        return dict((path, len(steps) - self._positions.get(path, 0))
+                    for path, steps in self._recording.steps.items())
+
+    def run(self, ticks=None):
+        """ Tick the root as many times as recorded (or ticks times).
+            @param ticks [int] (optional) The number of ticks.
+            @returns [int] The index of the first tick whose result differs
+            from the recording, or None.
+        """
+        if ticks is None:
+            ticks = len(self._recording.results)
+        self.start()
+        results = self._recording.results
+        divergence = None
+        for i in range(ticks):
+            result = self._root.tick()
+            if divergence is None and (i >= len(results) or
+                                       result.status != results[i]):
+                divergence = i
+        return divergence
@@ -0,0 +1,254 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import array
+import logging
+import threading
+
+from timeit import default_timer
+
+from task_behavior_engine.hooks import Hook
+from task_behavior_engine.hooks import add_hook
+from task_behavior_engine.hooks import remove_hook
+from task_behavior_engine.tree import walk
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram(object):
+
+    """ A fixed size histogram of integer values (ie. nanoseconds).
+
+        Buckets are log-linear (as in HDR histograms): values below
+        2^precision have their own bucket, and every power of two above is
+        split in 2^(precision - 1) buckets, so values are kept to a relative
+        precision of 2^-(precision - 1) with a few hundred buckets.  Values
+        above max_value are counted in the last bucket.
+    """
+
+    def __init__(self, max_value=1 << 40, precision=5):
+        """ Histogram constructor.
+            @param max_value [int] The largest value to keep precisely.
+            @param precision [int] The number of significant bits kept.
+        """
+        self._precision = precision
+        self._half = 1 << (precision - 1)
+        self._max_value = max_value
+        self._counts = array.array('L', [0] * (self._index(max_value) + 1))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def _index(self, value):
+        shift = value.bit_length() - self._precision
+        if shift <= 0:
+            return value
+        return shift * self._half + (value >> shift)
+
+    def _value(self, index):
+        """ Get the highest value of a bucket.
+        """
+        if index < 2 * self._half:
+            return index
+        shift = index // self._half - 1
+        return ((index - shift * self._half + 1) << shift) - 1
+
+    def record(self, value):
+        """ Record a value.
+            @param value [int] The value (negative values count as 0).
+        """
+        if value < 0:
+            value = 0
+        self._counts[self._index(min(value, self._max_value))] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, histogram):
+        """ Add the values of another histogram with the same buckets.
+            @param histogram [Histogram] The other histogram.
+        """
+        counts = self._counts
+        for i, count in enumerate(histogram._counts):
+            if count:
+                counts[i] += count
+        self.count += histogram.count
+        self.total += histogram.total
+        self.max = max(self.max, histogram.max)
+
+    def percentile(self, percent):
+        """ Get a percentile of the recorded values.
+            @param percent [float] The percentile (ie. 99).
+            @returns [int] The highest value of the bucket of the percentile
+            (at most the largest value recorded, which is also used above
+            max_value), or 0 without values.
+        """
+        if not self.count:
+            return 0
+        target = max(1, int(self.count * percent / 100.0 + 0.5))
+        last = len(self._counts) - 1
+        seen = 0
+        for i, count in enumerate(self._counts):
+            seen += count
+            if seen >= target:
+                if i == last:
+                    break
+                return min(self._value(i), self.max)
+        return self.max
+
+    def reset(self):
+        """ Remove all values.
+        """
+        self._counts = array.array('L', [0] * len(self._counts))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+
+class PhaseProfile(object):
+
+    """ The latency of one phase of one node.
+        total: The latency of the phase (in nanoseconds).
+        self_time: The latency minus the time spent in the phases of other
+                   nodes (ie. ticking children).
+    """
+
+    __slots__ = ('path', 'phase', 'total', 'self_time')
+
+    def __init__(self, path, phase):
+        self.path = path
+        self.phase = phase
+        self.total = Histogram()
+        self.self_time = Histogram()
+
+
+class Profiler(Hook):
+
+    """ A Profiler records the latency of the phases (_configure, _run,
+        _cleanup and _cancel) of every node of a tree in histograms.
+
+        The time a phase spends in phases of other nodes (ie. the children
+        ticked by a behavior) is counted as child time, so both the total
+        and the self time of each phase are known.
+
+        The profiler is opt-in: the tree is only modified between start()
+        and stop().  Recording a phase costs two timer reads and two
+        histogram updates.
+    """
+
+    def __init__(self, root):
+        """ Profiler constructor.
+            @param root [Node] The root of the tree to profile.
+        """
+        self._root = root
+        self._paths = {}
+        self._profiles = {}
+        self._local = threading.local()
+
+    def start(self):
+        """ Start profiling the tree.
+            Call it again to include nodes added to the tree since.
+        """
+        for path, node in walk(self._root):
+            self._paths[node._id] = path
+        add_hook(self._root, self)
+
+    def stop(self):
+        """ Stop profiling the tree.  The recorded latencies are kept.
+        """
+        remove_hook(self._root, self)
+
+    def reset(self):
+        """ Remove the recorded latencies.
+        """
+        self._profiles = {}
+
+    def enter(self, node, phase):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        # [start time, time spent in other nodes]
+        entry = [default_timer(), 0.0]
+        stack.append(entry)
+        return entry
+
+    def exit(self, node, phase, entry, error):
+        elapsed = default_timer() - entry[0]
+        stack = self._local.stack
+        while stack and stack.pop() is not entry:
+            pass
+        if stack:
+            stack[-1][1] += elapsed
+        profile = self._profiles.get((node._id, phase))
+        if profile is None:
+            path = self._paths.get(node._id, node._name)
+            profile = self._profiles[(node._id, phase)] = \
+                PhaseProfile(path, phase)
+        profile.total.record(int(elapsed * 1e9))
+        profile.self_time.record(int((elapsed - entry[1]) * 1e9))
+
+    def get_profiles(self):
+        """ Get the recorded latencies.
+            @returns [list] The PhaseProfile of each recorded (node, phase).
+        """
+        return list(self._profiles.values())
+
+    def report(self, count=10, sort='total', by_phase=True):
+        """ Get the nodes with the highest latency.
+            @param count [int] The number of rows.
+            @param sort [string] The column to sort by: p50, p99 or total,
+            optionally prefixed by self_ (ie. self_p99).
+            @param by_phase [bool] Report each phase of a node on its own
+            row (True) or all phases of a node together (False).
+            @returns [list] A dict per row with path, phase (None if not
+            by_phase), calls, and p50, p99, max and total (in seconds) of the
+            total and self (self_p50...) latency.
+        """
+        groups = {}
+        for (node_id, phase), profile in self._profiles.items():
+            key = (node_id, phase) if by_phase else node_id
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = PhaseProfile(
+                    profile.path, phase if by_phase else None)
+            group.total.merge(profile.total)
+            group.self_time.merge(profile.self_time)
+
+        rows = []
+        for group in groups.values():
+            row = {'path': group.path, 'phase': group.phase,
+                   'calls': group.total.count}
+            for prefix, histogram in (('', group.total),
+                                      ('self_', group.self_time)):
+                row[prefix + 'p50'] = histogram.percentile(50) / 1e9
+                row[prefix + 'p99'] = histogram.percentile(99) / 1e9
+                row[prefix + 'max'] = histogram.max / 1e9
+                row[prefix + 'total'] = histogram.total / 1e9
+            rows.append(row)
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        return rows[:count]
+
+    def format_report(self, count=10, sort='total', by_phase=True):
+        """ Format report() as a table.
+            @returns [string] The table (times in milliseconds).
+        """
+        lines = ["%-40s %-10s %8s %9s %9s %10s %10s" % (
+            'node', 'phase', 'calls', 'p50', 'p99', 'total', 'self')]
+        for row in self.report(count, sort, by_phase):
+            lines.append("%-40s %-10s %8d %9.3f %9.3f %10.3f %10.3f" % (
+                row['path'], (row['phase'] or '').lstrip('_'), row['calls'],
+                row['p50'] * 1e3, row['p99'] * 1e3, row['total'] * 1e3,
+                row['self_total'] * 1e3))
+        return "\n".join(lines)
@@ -0,0 +1,305 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import itertools
+import json
+import logging
+import os
+import struct
+import threading
+
+from timeit import default_timer
+
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+from task_behavior_engine import tracing
+from task_behavior_engine.tracing import Tracer
+from task_behavior_engine.tree import NodeStatus
+from task_behavior_engine.tree import walk
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'TBETRACE'
+_HEADER = struct.Struct('<8sII')
+_VERSION = 1
+
+# time, tick, node id, kind, phase, status (1 byte of padding)
+RECORD = struct.Struct('<dIIBBbx')
+
+PHASES = (tracing.TICK, tracing.CONFIGURE, tracing.RUN, tracing.CLEANUP,
+          tracing.CANCEL, tracing.FORCE, tracing.OPEN, tracing.CLOSE)
+_PHASE_CODES = dict((phase, code) for code, phase in enumerate(PHASES))
+_TICK = tracing.TICK
+_ENTER = tracing.ENTER
+
+
+def record_dtype():
+    """ Get the numpy dtype of the records.  Requires numpy.
+        @returns [numpy.dtype] The structured dtype of a record.
+    """
+    import numpy
+    return numpy.dtype([('time', '<f8'), ('tick', '<u4'), ('node', '<u4'),
+                        ('kind', 'u1'), ('phase', 'u1'), ('status', 'i1'),
+                        ('pad', 'u1')])
+
+
+def _packer(count):
+    """ Get a struct packing several records in a single call.
+        @param count [int] The number of records.
+        @returns [struct.Struct] The struct.
+    """
+    return struct.Struct('<' + RECORD.format[1:] * count)
+
+
+class TraceRecorder(Tracer):
+
+    """ A tracer that records events as fixed-width binary records.
+
+        Each event is a record of RECORD.size bytes: the time, the tick
+        number (counted on the outermost tick), the node id, the kind
+        (ENTER/EXIT/MARK), the phase (index in PHASES) and the status enum
+        (-1 without a status).
+
+        Events are stored as tuples in a preallocated ring buffer and are
+        only packed into binary records off the hot path (by the writer
+        thread, or by snapshot()), which keeps recording an event under a
+        microsecond.
+
+        Without a filename the recorder is a flight recorder: the ring keeps
+        the latest events (see snapshot()).  With a filename, each chunk of
+        the ring is handed to a background thread once it is full, which
+        packs it and appends it to the file, so the file has every event.
+        The node names are written next to the file (filename + '.nodes',
+        as json).
+    """
+
+    def __init__(self, filename=None, capacity=1 << 16, chunk=4096,
+                 root=None):
+        """ TraceRecorder constructor.
+            @param filename [string] (optional) The file to spill to.
+            @param capacity [int] The number of events in the ring buffer
+            (rounded up to a multiple of chunk).
+            @param chunk [int] The number of events written at once.
+            @param root [Node] (optional) A tree whose nodes are named by
+            path (other nodes are named by name).
+        """
+        self._chunk = chunk
+        self._packer = _packer(chunk)
+        self._ring = [None] * (max(1, -(-capacity // chunk)) * chunk)
+        self._index = 0
+        self._chunk_end = chunk
+        self._wrapped = False
+        self._tick = 0
+        self._depth = 0
+        self._names = {}
+        if root is not None:
+            for path, node in walk(root):
+                self._names[node._id] = path
+
+        self._filename = filename
+        self._queue = None
+        self._thread = None
+        if filename is not None:
+            self._file = open(filename, 'wb')
+            self._file.write(_HEADER.pack(_MAGIC, _VERSION, RECORD.size))
+            self._queue = Queue()
+            self._thread = threading.Thread(target=self._write)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _write(self):
+        """ Pack and write the queued chunks to the file (background
+            thread).
+        """
+        while True:
+            records = self._queue.get()
+            if records is None:
+                break
+            self._file.write(self._pack(records))
+
+    def record(self, kind, node, phase, status, _timer=default_timer,
+               _codes=_PHASE_CODES):
+        # the defaults bind globals to locals, this runs for every event
+        if phase is _TICK:
+            if kind == _ENTER:
+                if not self._depth:
+                    self._tick += 1
+                self._depth += 1
+            else:
+                self._depth -= 1
+        node_id = node._id
+        if node_id not in self._names:
+            self._names[node_id] = node._name
+        index = self._index
+        self._ring[index] = (_timer(), self._tick, node_id, kind,
+                             _codes[phase],
+                             -1 if status is None else status.status)
+        index += 1
+        self._index = index
+        if index == self._chunk_end:
+            self._end_chunk()
+
+    def _end_chunk(self):
+        """ Queue the chunk that was just filled and move to the next one.
+        """
+        index = self._index
+        if self._queue is not None:
+            self._queue.put(self._ring[index - self._chunk:index])
+        if index == len(self._ring):
+            self._index = 0
+            self._wrapped = True
+        self._chunk_end = self._index + self._chunk
+
+    def _pack(self, records):
+        """ Pack records into fixed-width binary records.
+            @param records [list] The record tuples (at most a chunk).
+            @returns [bytes] The packed records.
+        """
+        packer = self._packer
+        if len(records) != self._chunk:
+            packer = _packer(len(records))
+        return packer.pack(*itertools.chain.from_iterable(records))
+
+    def get_names(self):
+        """ Get the names of the recorded nodes.
+            @returns [dict] The name (or path) of each node id.
+        """
+        return dict(self._names)
+
+    def snapshot(self):
+        """ Get the events in the ring buffer (oldest first).
+            @returns [bytes] The packed records.
+        """
+        ring = self._ring
+        if self._wrapped:
+            ring = ring[self._index:] + ring[:self._index]
+        else:
+            ring = ring[:self._index]
+        chunk = self._chunk
+        return b''.join(self._pack(ring[i:i + chunk])
+                        for i in range(0, len(ring), chunk))
+
+    def close(self):
+        """ Write the remaining events and the node names, and stop the
+            writer thread.
+        """
+        if self._thread is None:
+            return
+        start = self._chunk_end - self._chunk
+        if start != self._index:
+            self._queue.put(self._ring[start:self._index])
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+        with open(self._filename + '.nodes', 'w') as f:
+            json.dump(dict((str(node_id), name)
+                           for node_id, name in self._names.items()), f)
+
+
+class _Node(object):
+
+    """ Stands in for a node when replaying a trace.
+    """
+
+    __slots__ = ('_id', '_name')
+
+    def __init__(self, node_id, name):
+        self._id = node_id
+        self._name = name
+
+
+class TraceReader(object):
+
+    """ Read the records written by a TraceRecorder as numpy arrays.
+        Requires numpy.
+    """
+
+    def __init__(self, filename):
+        """ TraceReader constructor.
+            The records are memory-mapped, not read into memory.
+            @param filename [string] The trace file.
+            @throws ValueError if the file is not a trace.
+        """
+        import numpy
+        with open(filename, 'rb') as f:
+            header = f.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            raise ValueError("Invalid trace file " + filename)
+        magic, version, size = _HEADER.unpack(header)
+        if magic != _MAGIC or size != RECORD.size:
+            raise ValueError("Invalid trace file " + filename)
+        dtype = record_dtype()
+        count = (os.path.getsize(filename) - _HEADER.size) // dtype.itemsize
+        if count:
+            self.records = numpy.memmap(filename, dtype, 'r', _HEADER.size,
+                                        (count,))
+        else:
+            self.records = numpy.zeros(0, dtype)
+        self.names = {}
+        try:
+            with open(filename + '.nodes') as f:
+                self.names = dict((int(node_id), name)
+                                  for node_id, name in json.load(f).items())
+        except IOError:
+            logger.warning("No node names for " + filename)
+
+    @staticmethod
+    def from_snapshot(data, names=None):
+        """ Read the records of TraceRecorder.snapshot().
+            @param data [bytes] The records.
+            @param names [dict] (optional) The name of each node id.
+            @returns [TraceReader] The reader.
+        """
+        import numpy
+        reader = TraceReader.__new__(TraceReader)
+        reader.records = numpy.frombuffer(data, record_dtype())
+        reader.names = dict(names or {})
+        return reader
+
+    def __len__(self):
+        return len(self.records)
+
+    def tick(self, number):
+        """ Get the records of one tick.
+            @param number [int] The tick number.
+            @returns [numpy.ndarray] The records of the tick.
+        """
+        return self.records[self.records['tick'] == number]
+
+    def replay(self, tracer, start=0, stop=None):
+        """ Send the recorded events to a tracer (ie. a LoggingTracer).
+            Nodes are given as objects with only _id and _name.
+            @param tracer [Tracer] The tracer.
+            @param start [int] The index of the first record.
+            @param stop [int] (optional) The index after the last record.
+            @returns [int] The number of events replayed.
+        """
+        nodes = {}
+        count = 0
+        for record in self.records[start:stop]:
+            node_id = int(record['node'])
+            node = nodes.get(node_id)
+            if node is None:
+                node = nodes[node_id] = _Node(
+                    node_id, self.names.get(node_id, str(node_id)))
+            status = int(record['status'])
+            tracer.record(int(record['kind']), node,
+                          PHASES[record['phase']],
+                          None if status < 0 else NodeStatus(status))
+            count += 1
+        return count
@@ -0,0 +1,313 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import logging
+import os
+import socket
+import threading
+
+from task_behavior_engine import codec
+
+logger = logging.getLogger(__name__)
+
+
+class BlackboardServer(object):
+
+    """ A BlackboardServer shares a blackboard with other processes over a
+        Unix domain socket (see BlackboardClient).
+
+        Each request is a batch of commands, which are run in order while
+        holding the server lock, and answered with one result per command.
+        Code in the server process that uses the blackboard while the server
+        is running (ie. ticking the tree) may hold the lock to keep a batch
+        from being applied in the middle of it.
+
+        Requests are unpickled (see codec), so a client can run any code in
+        the server process: only trusted processes may connect.  The socket
+        file is created readable and writable by its owner only (mode 0600);
+        put it in a directory that other users cannot write to.
+    """
+
+    def __init__(self, blackboard, path):
+        """ BlackboardServer constructor.
+            @param blackboard [Blackboard] The blackboard to share.
+            @param path [string] The path of the socket.
+        """
+        self._blackboard = blackboard
+        self._path = path
+        self._socket = None
+        self._thread = None
+        self._running = False
+        self._connections = []
+        self.lock = threading.RLock()
+
+    def start(self):
+        """ Listen on the socket and serve clients in background threads.
+            An existing socket file at path is replaced.  The socket file is
+            only accessible to its owner.
+        """
+        if os.path.exists(self._path):
+            os.remove(self._path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # the umask makes bind() create the file as 0600, so there is no
+        # window where other users could connect before a chmod()
+        umask = os.umask(0o177)
+        try:
+            self._socket.bind(self._path)
+        finally:
+            os.umask(umask)
+        self._socket.listen(16)
+        self._socket.settimeout(0.1)
+        self._running = True
+        self._thread = threading.Thread(target=self._accept)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        """ Stop serving and remove the socket file.
+        """
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            if os.path.exists(self._path):
+                os.remove(self._path)
+        for connection in list(self._connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+    def _accept(self):
+        while self._running:
+            try:
+                connection, address = self._socket.accept()
+            except socket.timeout:
+                continue
+            except socket.error:
+                break
+            connection.settimeout(None)
+            self._connections.append(connection)
+            thread = threading.Thread(target=self._serve, args=(connection,))
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, connection):
+        """ Answer the requests of one client until it disconnects.
+            @param connection [socket] The client connection.
+        """
+        reader = connection.makefile('rb')
+        writer = connection.makefile('wb')
+        try:
+            while True:
+                try:
+                    commands = codec.load(reader)
+                except EOFError:
+                    break
+                with self.lock:
+                    results = [self._execute(command) for command in commands]
+                codec.dump(results, writer)
+                writer.flush()
+        except (socket.error, IOError, ValueError) as e:
+            logger.debug("Blackboard client disconnected: " + str(e))
+        finally:
+            self._connections.remove(connection)
+            reader.close()
+            writer.close()
+            connection.close()
+
+    def _execute(self, command):
+        """ Run one command.
+            @param command [tuple] (name, scope, argument)
+            @returns [tuple] (True, result) or (False, exception)
+        """
+        name, scope, argument = command
+        blackboard = self._blackboard
+        try:
+            if name == 'save':
+                for key, value in argument.items():
+                    blackboard.save(key, value, scope)
+                return (True, None)
+            if name == 'get':
+                return (True, blackboard.get(argument, scope))
+            if name == 'get_memory':
+                return (True, blackboard.get_memory(scope))
+            raise ValueError("Unknown command " + str(name))
+        except Exception as e:
+            return (False, e)
+
+
+class BlackboardClient(object):
+
+    """ A BlackboardClient uses a blackboard shared by a BlackboardServer
+        with the same save()/get()/get_memory() calls as a Blackboard.
+
+        Writes are not sent right away: they are coalesced per scope (only
+        the last value of each key is kept) and sent together in one request
+        by flush(), which is called once batch_size keys are waiting, before
+        any read, and on close().  get_many() sends many reads in one
+        request.
+
+        Connections are kept in a pool, so the client may be used from many
+        threads.
+    """
+
+    def __init__(self, path, batch_size=256, pool_size=4):
+        """ BlackboardClient constructor.
+            @param path [string] The path of the server socket.
+            @param batch_size [int] The number of waiting keys that triggers
+            a flush().
+            @param pool_size [int] The number of idle connections to keep.
+        """
+        self._path = path
+        self._batch_size = batch_size
+        self._pool_size = pool_size
+        self._pool = []
+        self._pending = {}
+        self._pending_count = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        with self._lock:
+            if self._pool:
+                return self._pool.pop()
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(self._path)
+        return (connection, connection.makefile('rb'),
+                connection.makefile('wb'))
+
+    def _release(self, connection):
+        with self._lock:
+            if len(self._pool) < self._pool_size:
+                self._pool.append(connection)
+                return
+        self._disconnect(connection)
+
+    @staticmethod
+    def _disconnect(connection):
+        sock, reader, writer = connection
+        reader.close()
+        writer.close()
+        sock.close()
+
+    def _request(self, commands):
+        """ Send a batch of commands and wait for the results.
+            @param commands [list] (name, scope, argument) for each command.
+            @returns [list] (ok, result) for each command.
+        """
+        connection = self._connect()
+        try:
+            codec.dump(commands, connection[2])
+            connection[2].flush()
+            results = codec.load(connection[1])
+        except:
+            self._disconnect(connection)
+            raise
+        self._release(connection)
+        return results
+
+    @staticmethod
+    def _result(result):
+        ok, value = result
+        if not ok:
+            raise value
+        return value
+
+    def save(self, key, value, scope=None):
+        """ Saves a (key, value) pair onto tree_scope/node_scope.
+            The value is sent with the next flush().
+            @param key [string] the key of the item.
+            @param value [*] The value of the item.
+            @param scope [uuid] (optional) The uuid of the tree.
+        """
+        with self._lock:
+            items = self._pending.setdefault(scope, {})
+            if key not in items:
+                self._pending_count += 1
+            items[key] = value
+            full = self._pending_count >= self._batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """ Send the waiting writes.
+            If the request fails, the writes wait for the next flush().
+            @returns [int] The number of keys sent.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            count, self._pending_count = self._pending_count, 0
+        if not pending:
+            return 0
+        commands = [('save', scope, items) for scope, items in pending.items()]
+        try:
+            results = self._request(commands)
+        except:
+            self._restore(pending)
+            raise
+        for result in results:
+            self._result(result)
+        return count
+
+    def _restore(self, pending):
+        """ Put writes that could not be sent back with the waiting writes,
+            unless their key was written again since.
+            @param pending [dict] The writes of each scope.
+        """
+        with self._lock:
+            for scope, items in pending.items():
+                waiting = self._pending.setdefault(scope, {})
+                for key, value in items.items():
+                    if key not in waiting:
+                        waiting[key] = value
+                        self._pending_count += 1
+
+    def get(self, key, scope=None):
+        """ Gets a (key, value) pair from tree_scope/node_scope.
+            @param key [string] The key to retrieve.
+            @param scope [uuid] (optional) The uuid of the tree.
+            @returns The value of the key in the tree_scope/node_scope.
+            @throws KeyError if the key does not exist.
+        """
+        return self.get_many([(key, scope)])[0]
+
+    def get_many(self, keys):
+        """ Gets many keys in one request.
+            @param keys [list] (key, scope) for each key to retrieve.
+            @returns [list] The value of each key.
+            @throws KeyError if a key does not exist.
+        """
+        self.flush()
+        results = self._request([('get', scope, key) for key, scope in keys])
+        return [self._result(result) for result in results]
+
+    def get_memory(self, scope):
+        """ Gets a copy of the current nodedata with any remappings.
+            @param scope [uuid] The id of the scope/node.
+            @returns [NodeData] A copy of the node data.
+        """
+        self.flush()
+        return self._result(self._request([('get_memory', scope, None)])[0])
+
+    def close(self):
+        """ Send the waiting writes and close all connections.
+        """
+        self.flush()
+        with self._lock:
+            pool, self._pool = self._pool, []
+        for connection in pool:
+            self._disconnect(connection)
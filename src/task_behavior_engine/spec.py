@@ -0,0 +1,325 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+""" Build trees from declarative JSON specs.
+
+    A spec describes the root node of a tree, the remappings between its
+    nodes and the initial values of the global memory of its blackboard:
+
+        {"root": {"type": "Sequencer", "name": "root",
+                  "children": [
+                      {"type": "Node", "name": "sense",
+                       "params": {"run_cb": "sense"},
+                       "data": {"rate": 10}},
+                      {"type": "UntilCount", "name": "retry",
+                       "params": {"max_count": 3},
+                       "children": [{"type": "node.Fail",
+                                     "name": "attempt"}]}]},
+         "remappings": [{"from": "root/sense", "from_key": "reading",
+                         "to": "root/retry", "to_key": "target"}],
+         "blackboard": {"mission": "patrol"}}
+
+    type is a name registered with register_type() (the classes of branch,
+    decorator and node are registered by module and class name, and by
+    class name alone when it is unique), params are keyword arguments of
+    the constructor, where callbacks (*_cb) are names registered with
+    register_callback(), data are initial values of the node data, and
+    nodes are named by their path in remappings (see walk()).
+
+    A spec is compiled into a plan (the validated list of nodes to create,
+    with params checked against the constructors of the node classes),
+    which can be cached on disk by the hash of the spec, so loading the
+    same spec again only creates the nodes.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from task_behavior_engine import branch
+from task_behavior_engine import decorator
+from task_behavior_engine import node
+from task_behavior_engine.tree import Behavior
+from task_behavior_engine.tree import Blackboard
+from task_behavior_engine.tree import Decorator
+from task_behavior_engine.tree import Node
+
+logger = logging.getLogger(__name__)
+
+# bump when the plan layout (or its validation) changes so old cache files
+# are not used
+FORMAT = 2
+
+CALLBACKS = ('run_cb', 'configure_cb', 'cleanup_cb', 'cancel_cb')
+
+_types = {}
+_callbacks = {}
+
+
+def register_type(name, node_class):
+    """ Make a node class available to specs.
+        @param name [string] The type name used in specs.
+        @param node_class [type] The class (a subclass of Node).
+    """
+    if not (inspect.isclass(node_class) and issubclass(node_class, Node)):
+        raise TypeError("%r is not a node class" % (node_class,))
+    _types[name] = node_class
+
+
+def register_callback(name, callback):
+    """ Make a callback available to specs (see CALLBACKS).
+        @param name [string] The callback name used in specs.
+        @param callback [function] The callback.
+    """
+    _callbacks[name] = callback
+
+
+def _register_defaults():
+    """ Register the node classes of this package.
+    """
+    classes = [('tree', Node)]
+    for module in (branch, decorator, node):
+        short = module.__name__.split('.')[-1]
+        for name, value in sorted(vars(module).items()):
+            if inspect.isclass(value) and issubclass(value, Node) and \
+                    value.__module__ == module.__name__:
+                classes.append((short, value))
+    names = [cls.__name__ for short, cls in classes]
+    for short, cls in classes:
+        register_type(short + '.' + cls.__name__, cls)
+        if names.count(cls.__name__) == 1:
+            register_type(cls.__name__, cls)
+
+
+_register_defaults()
+
+
+def _check_keys(where, item, required, optional):
+    if not isinstance(item, dict):
+        raise ValueError("%s: expected an object" % where)
+    for key in required:
+        if key not in item:
+            raise ValueError("%s: missing %s" % (where, key))
+    for key in item:
+        if key not in required and key not in optional:
+            raise ValueError("%s: unknown key %s" % (where, key))
+
+
+def _constructor_params(node_class):
+    """ Get the params accepted by the constructor of a node class.
+        Constructors pass their other keyword arguments on to the
+        constructor of their base class, so the arguments of the
+        constructors up to Node are accepted.
+        @param node_class [type] The node class.
+        @returns [tuple] The set of accepted params and the list of
+        required ones.
+    """
+    accepted = set()
+    required = None
+    for cls in node_class.__mro__:
+        init = vars(cls).get('__init__')
+        if init is None:
+            continue
+        argspec = inspect.getargspec(init)
+        args = [arg for arg in argspec.args[1:] if arg != 'name']
+        if required is None:
+            optional = len(argspec.defaults or ())
+            required = args[:len(args) - optional]
+        accepted.update(args)
+        if cls is Node or argspec.keywords is None:
+            break
+    return accepted, required or []
+
+
+def _compile_node(item, where, parent, nodes, paths):
+    """ Validate a node of a spec and add it (then its children) to nodes.
+        @param where [string] The path of the parent (for errors).
+        @param parent [int] The index of the parent in nodes (or None).
+    """
+    _check_keys(where, item, ('type', 'name'), ('params', 'data', 'children'))
+    name = item['name']
+    path = where + '/' + name if parent is not None else name
+    node_class = _types.get(item['type'])
+    if node_class is None:
+        raise ValueError("%s: unknown type %s" % (path, item['type']))
+    params = item.get('params', {})
+    data = item.get('data', {})
+    children = item.get('children', [])
+    if not isinstance(params, dict) or not isinstance(data, dict):
+        raise ValueError("%s: params and data must be objects" % path)
+    for key in ('name', 'blackboard', 'child'):
+        if key in params:
+            raise ValueError("%s: %s can not be a param" % (path, key))
+    accepted, required = _constructor_params(node_class)
+    for key in required:
+        if key not in params:
+            raise ValueError("%s: missing param %s of %s" %
+                             (path, key, item['type']))
+    for key in params:
+        if key not in accepted:
+            raise ValueError("%s: unknown param %s of %s" %
+                             (path, key, item['type']))
+    for key in CALLBACKS:
+        if key in params and params[key] not in _callbacks:
+            raise ValueError("%s: unknown callback %s" % (path, params[key]))
+    if not isinstance(children, list):
+        raise ValueError("%s: children must be a list" % path)
+    if children and not issubclass(node_class, (Behavior, Decorator)):
+        raise ValueError("%s: %s can not have children" %
+                         (path, item['type']))
+    if len(children) > 1 and issubclass(node_class, Decorator):
+        raise ValueError("%s: a decorator has one child" % path)
+
+    index = len(nodes)
+    nodes.append((item['type'], name, params, data, parent))
+    paths[path] = index
+    names = set()
+    for child in children:
+        if isinstance(child, dict) and child.get('name') in names:
+            raise ValueError("%s: duplicate child %s" % (path, child['name']))
+        _compile_node(child, path, index, nodes, paths)
+        names.add(child['name'])
+
+
+def compile_spec(spec):
+    """ Validate a spec and resolve it into a plan.
+        @param spec [dict] The spec (as decoded from JSON).
+        @returns [dict] The plan: the nodes in depth first order as
+        (type, name, params, data, parent index), the remappings as
+        (from index, from key, to index, to key) and the blackboard values.
+        @throws ValueError if the spec is not valid.
+    """
+    _check_keys('spec', spec, ('root',), ('remappings', 'blackboard'))
+    nodes = []
+    paths = {}
+    _compile_node(spec['root'], '', None, nodes, paths)
+
+    remappings = []
+    for remapping in spec.get('remappings', []):
+        _check_keys('remapping', remapping,
+                    ('from', 'from_key', 'to', 'to_key'), ())
+        for key in ('from', 'to'):
+            if remapping[key] not in paths:
+                raise ValueError("remapping: unknown node %s" %
+                                 remapping[key])
+        remappings.append((paths[remapping['from']], remapping['from_key'],
+                           paths[remapping['to']], remapping['to_key']))
+
+    values = spec.get('blackboard', {})
+    if not isinstance(values, dict):
+        raise ValueError("blackboard: expected an object")
+    return {'format': FORMAT, 'nodes': nodes, 'remappings': remappings,
+            'blackboard': values}
+
+
+def build(plan, blackboard=None):
+    """ Create the nodes of a plan.
+        @param plan [dict] The plan (see compile_spec()).
+        @param blackboard [Blackboard] (optional) The blackboard of the
+        tree, a new one by default.
+        @returns [Node] The root of the tree.
+        @throws ValueError if a type or callback is no longer registered.
+    """
+    if blackboard is None:
+        blackboard = Blackboard()
+    nodes = []
+    for type_name, name, params, data, parent in plan['nodes']:
+        node_class = _types.get(type_name)
+        if node_class is None:
+            raise ValueError("%s: unknown type %s" % (name, type_name))
+        kwargs = dict(params)
+        for key in CALLBACKS:
+            if key in kwargs:
+                callback = _callbacks.get(kwargs[key])
+                if callback is None:
+                    raise ValueError("%s: unknown callback %s" %
+                                     (name, kwargs[key]))
+                kwargs[key] = callback
+        new = node_class(name, blackboard=blackboard, **kwargs)
+        for key, value in data.items():
+            blackboard.save(key, value, new._id)
+        if parent is not None:
+            parent = nodes[parent]
+            if isinstance(parent, Decorator):
+                parent.set_child(new)
+            else:
+                parent.add_child(new)
+        nodes.append(new)
+    for from_index, from_key, to_index, to_key in plan['remappings']:
+        blackboard.add_remapping(nodes[from_index]._id, from_key,
+                                 nodes[to_index]._id, to_key)
+    for key, value in plan['blackboard'].items():
+        blackboard.save(key, value)
+    return nodes[0]
+
+
+def _cached_plan(text, cache_dir):
+    """ Get the plan of a spec, from the cache if it was compiled before.
+        @param text [bytes] The JSON text of the spec.
+        @param cache_dir [string] The cache directory (or None).
+        @returns [dict] The plan.
+    """
+    if cache_dir is None:
+        return compile_spec(json.loads(text))
+    digest = hashlib.sha1(('%d:' % FORMAT).encode('ascii') + text).hexdigest()
+    filename = os.path.join(cache_dir, digest + '.plan')
+    try:
+        with open(filename, 'rb') as f:
+            plan = pickle.load(f)
+        if plan.get('format') == FORMAT:
+            return plan
+    except (IOError, OSError):
+        pass
+    except Exception:
+        logger.warning("Ignoring unreadable cached plan %s", filename)
+
+    plan = compile_spec(json.loads(text))
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    # write then rename, so concurrent starts never read a partial plan
+    temporary = '%s.%d.tmp' % (filename, os.getpid())
+    with open(temporary, 'wb') as f:
+        pickle.dump(plan, f, pickle.HIGHEST_PROTOCOL)
+    os.rename(temporary, filename)
+    return plan
+
+
+def loads(text, blackboard=None, cache_dir=None):
+    """ Build a tree from the JSON text of a spec.
+        @param text [string] The JSON text.
+        @param blackboard [Blackboard] (optional) The blackboard of the tree.
+        @param cache_dir [string] (optional) The directory where compiled
+        specs are cached (by the hash of the text).
+        @returns [Node] The root of the tree.
+        @throws ValueError if the spec is not valid.
+    """
+    if not isinstance(text, bytes):
+        text = text.encode('utf-8')
+    return build(_cached_plan(text, cache_dir), blackboard)
+
+
+def load(filename, blackboard=None, cache_dir=None):
+    """ Build a tree from a JSON spec file (see loads()).
+        @param filename [string] The spec file.
+        @returns [Node] The root of the tree.
+    """
+    with open(filename, 'rb') as f:
+        return loads(f.read(), blackboard, cache_dir)
@@ -0,0 +1,161 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import time
+
+import numpy
+
+
+class TimeSeries(object):
+
+    """ A fixed capacity history of timestamped samples.
+
+        Samples are kept in numpy ring buffers that are written twice (at i
+        and i + capacity), so the last N samples are always one contiguous
+        slice.  last() and window() return read-only views on the buffers
+        (no copy), which are overwritten as new samples are appended; copy
+        them to keep them across appends.
+
+        Timestamps must not decrease.  If ttl is set, samples older than ttl
+        seconds are expired before last() and window() are evaluated.
+
+        A TimeSeries is saved on a blackboard like any other value (see
+        Blackboard.append()), so remapped keys share the same history.
+    """
+
+    def __init__(self, capacity, shape=(), dtype=numpy.float64, ttl=None):
+        """ TimeSeries constructor.
+            @param capacity [int] The maximum number of samples kept.
+            @param shape [tuple] The shape of each sample.
+            @param dtype [numpy.dtype] The type of the samples.
+            @param ttl [float] (optional) The time to live of the samples in
+            seconds.
+            @throws ValueError if the capacity is below 1.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.ttl = ttl
+        self._times = numpy.zeros(2 * capacity)
+        self._values = numpy.zeros((2 * capacity,) + tuple(shape), dtype)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __str__(self):
+        return "TimeSeries(%d/%d samples)" % (self._size, self.capacity)
+
+    def __getstate__(self):
+        """ Only the live samples are pickled.
+        """
+        times, values = self._view(self._size)
+        return {'capacity': self.capacity, 'ttl': self.ttl,
+                'times': times, 'values': values}
+
+    def __setstate__(self, state):
+        values = state['values']
+        self.__init__(state['capacity'], values.shape[1:], values.dtype,
+                      state['ttl'])
+        size = len(values)
+        capacity = self.capacity
+        self._times[:size] = self._times[capacity:capacity + size] = \
+            state['times']
+        self._values[:size] = self._values[capacity:capacity + size] = values
+        self._next = size % capacity
+        self._size = size
+
+    def append(self, value, timestamp=None):
+        """ Append a sample in O(1), replacing the oldest sample once the
+            capacity is reached.
+            @param value [*] The sample (converted to the dtype and shape).
+            @param timestamp [float] (optional) The time of the sample in
+            seconds (default is now).
+            @throws ValueError if timestamp is older than the latest sample.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        capacity = self.capacity
+        i = self._next
+        if self._size and timestamp < self._times[i - 1 + capacity]:
+            raise ValueError("Timestamps of a TimeSeries can not decrease")
+        self._times[i] = self._times[i + capacity] = timestamp
+        self._values[i] = self._values[i + capacity] = value
+        self._next = i + 1 if i + 1 < capacity else 0
+        if self._size < capacity:
+            self._size += 1
+
+    def clear(self):
+        """ Remove all samples.
+        """
+        self._next = 0
+        self._size = 0
+
+    def expire(self, now=None):
+        """ Remove the samples older than ttl.
+            @param now [float] (optional) The current time (default is now).
+            @returns [int] The number of samples removed.
+        """
+        if self.ttl is None or not self._size:
+            return 0
+        if now is None:
+            now = time.time()
+        times, values = self._view(self._size)
+        expired = int(numpy.searchsorted(times, now - self.ttl, 'left'))
+        self._size -= expired
+        return expired
+
+    def _view(self, size):
+        end = self._next + self.capacity
+        times = self._times[end - size:end]
+        values = self._values[end - size:end]
+        times.flags.writeable = False
+        values.flags.writeable = False
+        return times, values
+
+    def latest(self):
+        """ Get the latest sample.
+            @returns [tuple] (timestamp, value) of the latest sample.
+            @throws IndexError if the series is empty.
+        """
+        if not self._size:
+            raise IndexError("TimeSeries is empty")
+        i = self._next - 1 + self.capacity
+        return self._times[i], self._values[i]
+
+    def last(self, count=None):
+        """ Get the last samples (oldest first).
+            @param count [int] (optional) The number of samples (default is
+            all of them).
+            @returns [tuple] (timestamps, values) as read-only numpy views.
+        """
+        self.expire()
+        if count is None or count > self._size:
+            count = self._size
+        return self._view(count)
+
+    def window(self, seconds, now=None):
+        """ Get the samples of the last seconds (oldest first).
+            @param seconds [float] The length of the window.
+            @param now [float] (optional) The end of the window (default is
+            now).
+            @returns [tuple] (timestamps, values) as read-only numpy views.
+        """
+        if now is None:
+            now = time.time()
+        self.expire(now)
+        times, values = self._view(self._size)
+        start = int(numpy.searchsorted(times, now - seconds, 'left'))
+        return times[start:], values[start:]
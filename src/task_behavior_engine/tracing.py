@@ -0,0 +1,155 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+import logging
+
+from timeit import default_timer
+
+logger = logging.getLogger(__name__)
+
+# event kinds
+ENTER = 0
+EXIT = 1
+MARK = 2
+
+# phases
+TICK = 'tick'
+CONFIGURE = 'configure'
+RUN = 'run'
+CLEANUP = 'cleanup'
+CANCEL = 'cancel'
+
+# marks
+FORCE = 'force'
+OPEN = 'open'
+CLOSE = 'close'
+
+# The registered tracers.  The engine only builds events while this list is
+# not empty, so tracing costs a single check when it is disabled.
+_tracers = []
+
+
+class Tracer(object):
+
+    """ Base class for tracers.
+        A tracer receives typed events from the engine:
+
+        ENTER/EXIT: A node enters/exits a phase (TICK, CONFIGURE, RUN,
+                    CLEANUP or CANCEL).  The status is the result of the
+                    node at that time.
+        MARK: Something happened to a node (FORCE with the forced status,
+              OPEN/CLOSE when a behavior adds/removes the node from its
+              open nodes).
+    """
+
+    def record(self, kind, node, phase, status):
+        """ Record an event.
+            @param kind [int] ENTER, EXIT or MARK.
+            @param node [Node] The node.
+            @param phase [string] The phase (or mark).
+            @param status [NodeStatus] The status of the node (may be None).
+        """
+        raise NotImplementedError('record must be defined.')
+
+
+def add_tracer(tracer):
+    """ Start sending events to a tracer.
+        @param tracer [Tracer] The tracer.
+    """
+    if tracer not in _tracers:
+        _tracers.append(tracer)
+
+
+def remove_tracer(tracer):
+    """ Stop sending events to a tracer.
+        @param tracer [Tracer] The tracer.
+    """
+    if tracer in _tracers:
+        _tracers.remove(tracer)
+
+
+def is_enabled():
+    """ Check if any tracer is registered.
+        @returns [bool] True if events are being traced.
+    """
+    return bool(_tracers)
+
+
+def emit(kind, node, phase, status=None):
+    """ Send an event to all tracers.
+        Callers check _tracers first, so no event is built while tracing is
+        disabled.
+    """
+    for tracer in _tracers:
+        tracer.record(kind, node, phase, status)
+
+
+Event = collections.namedtuple(
+    'Event', ['time', 'kind', 'node_id', 'name', 'phase', 'status', 'text'])
+
+
+class TraceBuffer(Tracer):
+
+    """ A tracer that keeps the latest events in memory.
+        Events are stored as Event tuples (the node is stored by id and
+        name so nodes are not kept alive by the buffer).
+    """
+
+    def __init__(self, maxlen=100000):
+        """ TraceBuffer constructor.
+            @param maxlen [int] The number of events to keep.
+        """
+        self.events = collections.deque(maxlen=maxlen)
+
+    def record(self, kind, node, phase, status):
+        if status is None:
+            self.events.append(Event(default_timer(), kind, node._id,
+                                     node._name, phase, None, ''))
+        else:
+            self.events.append(Event(default_timer(), kind, node._id,
+                                     node._name, phase, status.status,
+                                     status.text))
+
+    def clear(self):
+        """ Remove all events.
+        """
+        self.events.clear()
+
+
+class LoggingTracer(Tracer):
+
+    """ A tracer that writes events to a logger.
+        Messages are only formatted if the logger is enabled for the level.
+    """
+
+    _FORMATS = {ENTER: "%s.%s() entering... %s",
+                EXIT: "%s.%s() exiting.. %s",
+                MARK: "%s %s %s"}
+
+    def __init__(self, log=None, level=logging.DEBUG):
+        """ LoggingTracer constructor.
+            @param log [logging.Logger] The logger (default is the logger of
+            the tree module).
+            @param level [int] The logging level of the messages.
+        """
+        if log is None:
+            log = logging.getLogger('task_behavior_engine.tree')
+        self._logger = log
+        self._level = level
+
+    def record(self, kind, node, phase, status):
+        if self._logger.isEnabledFor(self._level):
+            self._logger.log(self._level, self._FORMATS[kind], node._name,
+                             phase, status)
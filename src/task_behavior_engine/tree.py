@@ -13,9 +13,19 @@
 # under the License.
 
 
+import array
+import copy
+import functools
+import itertools
 import logging
+import sys
 import threading
+import types
 import uuid
+import weakref
+
+from task_behavior_engine import tracing
+from task_behavior_engine.tracing import _tracers
 
 logger = logging.getLogger(__name__)
 
@@ -25,11 +35,26 @@ class NodeData(object):
     """ This object is a dictionary that holds all of the data for a node.
         You can access the members by standard dictionary calls (nodedata[name])
         or via attribute (nodedata.name)
+
+        If the node's scope has a parent scope (see
+        Blackboard.set_parent_scope()), keys that are not found in this
+        NodeData are looked up in the parent scopes.
+
+        If _on_write is set, it is called with (key, value) after each write
+        (this is how DeltaStream tracks the keys written in a tick).
     """
 
+    # the instance dictionary is only created if other private attributes
+    # are set
+    __slots__ = ('_data', '_locks', '_inherit', '_on_new_key', '_on_write',
+                 '__dict__')
+
     def __init__(self):
         self._data = {}
         self._locks = {}
+        self._inherit = None
+        self._on_new_key = None
+        self._on_write = None
 
     def __contains__(self, key):
         return key in self._data.keys()
@@ -42,9 +67,10 @@ class NodeData(object):
             self._locks[name] = threading.Lock()
 
         with self._locks[name]:
-            temp = self._data[name]
+            if self._inherit is None or name in self._data:
+                return self._data[name]
 
-        return temp
+        return self._inherit(name)
 
     def __setattr__(self, name, value):
         """ Override setattr to be thread safe. """
@@ -53,20 +79,38 @@ class NodeData(object):
 
         if not name in self._locks.keys():
             self._locks[name] = threading.Lock()
+        if self._on_new_key is not None and name not in self._data:
+            self._on_new_key()
 
         self._locks[name].acquire()
         self._data[name] = value
         self._locks[name].release()
+        if self._on_write is not None:
+            self._on_write(name, value)
 
     def __getitem__(self, key):
         return self.__getattr__(key)
 
     def __setitem__(self, key, item):
+        if self._on_new_key is not None and key not in self._data:
+            self._on_new_key()
         self._data[key] = item
+        if self._on_write is not None:
+            self._on_write(key, item)
 
     def __str__(self):
         return str(self._data)
 
+    def __getstate__(self):
+        """ Only the data is pickled (not the locks or scope links).
+        """
+        return dict((key, self[key]) for key in self.keys())
+
+    def __setstate__(self, state):
+        self.__init__()
+        for key, value in state.items():
+            self[key] = value
+
     def keys(self):
         """ Gets all of the keys
             @returns List A list of all of the keys
@@ -80,7 +124,12 @@ class NodeData(object):
             @throws KeyError if key not found and default not set
         """
         if not key in self._data.keys():
-            self._data[key] = default
+            if self._inherit is not None:
+                try:
+                    return self._inherit(key)
+                except KeyError:
+                    pass
+            self.set_data(key, default)
         return self._data[key]
 
     def set_data(self, key, value):
@@ -88,7 +137,137 @@ class NodeData(object):
             @param key [string] The data key
             @param value [*] The data value
         """
+        if self._on_new_key is not None and key not in self._data:
+            self._on_new_key()
         self._data[key] = value
+        if self._on_write is not None:
+            self._on_write(key, value)
+
+
+def _restore_nodedata(schema, name, state):
+    """ Unpickle a NodeData created by nodedata_class().
+        The class is generated again (once per schema) from the schema.
+    """
+    key = (name, repr(schema))
+    if key not in _schema_classes:
+        _schema_classes[key] = nodedata_class(schema, name)
+    nodedata = _schema_classes[key]()
+    nodedata.__setstate__(state)
+    return nodedata
+
+
+_schema_classes = {}
+
+
+def nodedata_class(schema, name='SchemaNodeData'):
+    """ Create a NodeData class with a declared schema.
+        Declared keys are stored in __slots__, so attribute access on them is
+        plain attribute access (no locks or dictionary lookups).  Declared
+        keys always exist and start with their default value.  Undeclared
+        keys may still be used (this is how remappings are applied), they
+        are kept in dictionaries that are only created once one is written.
+        @param schema [list] (name, type, default) for each declared key.
+        @param name [string] The name of the generated class.
+        @returns [type] A NodeData subclass.
+        @throws TypeError if a default does not match its declared type.
+    """
+    schema = tuple((key, key_type, default) for key, key_type, default in schema)
+    for key, key_type, default in schema:
+        if key[0] == '_':
+            raise ValueError("Schema key %s can not start with '_'" % key)
+        if default is not None and not isinstance(default, key_type):
+            raise TypeError("Default of %s must be of type %s" %
+                            (key, key_type.__name__))
+    fields = frozenset(key for key, key_type, default in schema)
+
+    def __init__(self):
+        # the dictionaries of undeclared keys are created when first needed
+        self._data = None
+        self._locks = None
+        self._inherit = None
+        self._on_new_key = None
+        self._on_write = None
+        for key, key_type, default in self._schema:
+            object.__setattr__(self, key, copy.copy(default))
+
+    def __setattr__(self, name, value):
+        if name in fields or name[0] == '_':
+            object.__setattr__(self, name, value)
+        else:
+            __setitem__(self, name, value)
+
+    def __getattr__(self, name):
+        # only called for undeclared keys (and unknown private attributes)
+        if self._data is None and name[0] != '_':
+            if self._inherit is None:
+                raise KeyError(name)
+            return self._inherit(name)
+        return NodeData.__getattr__(self, name)
+
+    def __contains__(self, key):
+        return key in self._fields or \
+            self._data is not None and key in self._data
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            return object.__getattribute__(self, key)
+        return self.__getattr__(key)
+
+    def __setitem__(self, key, item):
+        if key in self._fields:
+            object.__setattr__(self, key, item)
+        else:
+            if self._data is None:
+                self._data = {}
+                self._locks = {}
+            NodeData.set_data(self, key, item)
+
+    def __str__(self):
+        data = dict(self._data or {})
+        for key in self._fields:
+            data[key] = object.__getattribute__(self, key)
+        return str(data)
+
+    def keys(self):
+        keys = [key for key, key_type, default in self._schema]
+        if self._data is not None:
+            keys.extend(self._data.keys())
+        return keys
+
+    def get_data(self, key, default=None):
+        if key in self._fields:
+            return object.__getattribute__(self, key)
+        if key in self:
+            return self._data[key]
+        if self._inherit is not None:
+            try:
+                return self._inherit(key)
+            except KeyError:
+                pass
+        __setitem__(self, key, default)
+        return default
+
+    def __reduce__(self):
+        return (_restore_nodedata,
+                (self._schema, type(self).__name__, self.__getstate__()))
+
+    members = {
+        '__slots__': tuple(key for key, key_type, default in schema),
+        '_schema': schema,
+        '_fields': fields,
+        '__init__': __init__,
+        '__setattr__': __setattr__,
+        '__getattr__': __getattr__,
+        '__contains__': __contains__,
+        '__getitem__': __getitem__,
+        '__setitem__': __setitem__,
+        '__str__': __str__,
+        'keys': keys,
+        'get_data': get_data,
+        'set_data': __setitem__,
+        '__reduce__': __reduce__,
+    }
+    return type(name, (NodeData,), members)
 
 
 class NodeStatus(object):
@@ -100,6 +279,9 @@ class NodeStatus(object):
             SUCCESS: Node has completed successfully
             FAIL: Node has completed with errors
             CANCEL: Node has been canceled
+
+        The statuses returned by the nodes of this package are shared between
+        ticks (see Node._get_status()), so they should not be modified.
     """
 
     PENDING = 0
@@ -145,6 +327,215 @@ class NodeStatus(object):
             self.text = self.text + "; " + text
 
 
+class StatusTable(object):
+
+    """ A table of node statuses stored in compact arrays.
+        Each scope is assigned a dense index the first time it is seen.  The
+        status enum of each scope is kept in an array of bytes (indexed by
+        the dense index) and the status text in a list.
+
+        Each entry is stamped with the epoch it was set in, so clear() is
+        constant time: it only starts a new epoch and entries from older
+        epochs read as PENDING.
+
+        The table also keeps the set of scopes in each status, so the scopes
+        in a given status can be found without scanning the table.
+    """
+
+    def __init__(self, capacity=64):
+        """ StatusTable constructor.
+            @param capacity [int] The number of entries to allocate up front.
+        """
+        self._index = {}
+        self._scopes = []
+        self._free = []
+        self._status = array.array('b', [NodeStatus.PENDING] * capacity)
+        self._epochs = array.array('L', [0] * capacity)
+        self._text = [''] * capacity
+        self._epoch = 1
+        self._normalized = self._epoch
+        self._by_status = {}
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, scope):
+        return scope in self._index
+
+    def __getstate__(self):
+        """ Only the statuses set since the last clear() are pickled.
+            Status enums are stored as bytes.
+        """
+        epoch = self._epoch
+        indexes = [i for i, scope in enumerate(self._scopes)
+                   if scope is not None and self._epochs[i] == epoch]
+        return {'scopes': [self._scopes[i] for i in indexes],
+                'status': bytearray(self._status[i] for i in indexes),
+                'text': [self._text[i] for i in indexes]}
+
+    def __setstate__(self, state):
+        self.__init__(max(64, len(state['scopes'])))
+        for scope, status, text in zip(state['scopes'],
+                                       bytearray(state['status']),
+                                       state['text']):
+            self.set(scope, status, text)
+
+    def _grow(self):
+        """ Double the capacity of the table.
+            The arrays are replaced rather than resized in place, so views
+            returned by as_array() stay valid (they keep the old buffer).
+        """
+        capacity = len(self._status)
+        status = array.array('b', self._status)
+        status.extend([NodeStatus.PENDING] * capacity)
+        epochs = array.array('L', self._epochs)
+        epochs.extend([0] * capacity)
+        self._status = status
+        self._epochs = epochs
+        self._text.extend([''] * capacity)
+
+    def index(self, scope):
+        """ Get the dense index of a scope, assigning one if needed.
+            @param scope [uuid] The id of the node.
+            @returns [int] The index of the scope.
+        """
+        index = self._index.get(scope)
+        if index is None:
+            if self._free:
+                index = self._free.pop()
+                self._scopes[index] = scope
+            else:
+                index = len(self._scopes)
+                if index == len(self._status):
+                    self._grow()
+                self._scopes.append(scope)
+            self._index[scope] = index
+        return index
+
+    def remove(self, scope):
+        """ Remove a scope from the table.  Its index is reused.
+            @param scope [uuid] The id of the node.
+        """
+        index = self._index.pop(scope, None)
+        if index is None:
+            return
+        if self._epochs[index] == self._epoch:
+            self._by_status[self._status[index]].discard(scope)
+        self._status[index] = NodeStatus.PENDING
+        self._text[index] = ''
+        self._epochs[index] = 0
+        self._scopes[index] = None
+        self._free.append(index)
+
+    def scopes(self):
+        """ Get the scopes of the table in index order.
+            @returns [list] The scope of each index (None for unused ones).
+        """
+        return list(self._scopes)
+
+    def get(self, scope):
+        """ Get the status of a scope.
+            Unknown (or cleared) scopes are set to PENDING.  Statuses are
+            stored as arrays, so each call creates a new NodeStatus (nodes
+            do not call it while ticking, see Node._get_status()).
+            @param scope [uuid] The id of the node.
+            @returns [NodeStatus] A copy of the status of the scope.
+        """
+        index = self.index(scope)
+        if self._epochs[index] != self._epoch:
+            self.set(scope, NodeStatus.PENDING, '')
+        return NodeStatus(self._status[index], self._text[index])
+
+    def set(self, scope, status, text=''):
+        """ Set the status of a scope.
+            @param scope [uuid] The id of the node.
+            @param status [int] The status enum.
+            @param text [string] The status text.
+        """
+        index = self._index.get(scope)
+        if index is None:
+            index = self.index(scope)
+        by_status = self._by_status
+        if self._epochs[index] == self._epoch:
+            previous = self._status[index]
+            if previous != status:
+                by_status[previous].discard(scope)
+        else:
+            previous = None
+        if previous != status:
+            scopes = by_status.get(status)
+            if scopes is None:
+                scopes = by_status[status] = set()
+            scopes.add(scope)
+        self._status[index] = status
+        self._text[index] = text
+        self._epochs[index] = self._epoch
+
+    def with_status(self, status):
+        """ Get the scopes in a status.
+            @param status [int] The status enum.
+            @returns [list] The scopes currently in that status.
+        """
+        return list(self._by_status.get(status, ()))
+
+    def count(self, status):
+        """ Count the scopes in a status.
+            @param status [int] The status enum.
+            @returns [int] The number of scopes currently in that status.
+        """
+        return len(self._by_status.get(status, ()))
+
+    def items(self):
+        """ Get the status of all scopes set since the last clear().
+            @returns [list] (scope, NodeStatus) for each scope.
+        """
+        epoch = self._epoch
+        return [(scope, NodeStatus(self._status[i], self._text[i]))
+                for i, scope in enumerate(self._scopes)
+                if self._epochs[i] == epoch]
+
+    def clear(self):
+        """ Reset all statuses to PENDING (in constant time).
+        """
+        self._epoch += 1
+        self._by_status = {}
+
+    def as_array(self):
+        """ Get the status enums of all scopes as a numpy array.
+            The array shares memory with the table, so later status changes
+            are visible through it until the table grows or is cleared.
+            Requires numpy.
+            @returns [numpy.ndarray] The status of each index (see scopes()).
+        """
+        import numpy
+        size = len(self._scopes)
+        status = numpy.frombuffer(self._status, dtype=numpy.int8)[:size]
+        if self._normalized != self._epoch:
+            epochs = numpy.frombuffer(self._epochs, dtype=numpy.uint)[:size]
+            status[epochs != self._epoch] = NodeStatus.PENDING
+            self._normalized = self._epoch
+        return status
+
+
+def _sizeof(obj, seen):
+    """ Get the size of an object, following containers.
+        @param obj [*] The object to measure.
+        @param seen [set] The ids of objects already measured.
+        @returns [int] The size in bytes.
+    """
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += _sizeof(key, seen) + _sizeof(value, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for value in obj:
+            size += _sizeof(value, seen)
+    return size
+
+
 class Blackboard(object):
 
     """ A class to contain all (or related) nodedatas.  This class allows for
@@ -154,16 +545,222 @@ class Blackboard(object):
     def __init__(self):
         self._base_memory = {}
         self._node_memory = {}
-        self._node_status = {}
+        self._node_status = StatusTable()
+        self._remap_targets = {}
+        self._nodes = {}
+        self._dead = []
+        self._scope_parents = {}
+        self._key_location = {}
+        self._deltas = None
+
+    def __getstate__(self):
+        """ Registered nodes, caches and the delta stream are not pickled.
+        """
+        return {'base_memory': self._base_memory,
+                'node_memory': self._node_memory,
+                'node_status': self._node_status,
+                'scope_parents': self._scope_parents}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self._base_memory = state['base_memory']
+        self._node_memory = state['node_memory']
+        self._node_status = state['node_status']
+        for to_scope, memory in self._node_memory.items():
+            for from_scope, from_key in memory['remapping'].values():
+                self._remap_targets.setdefault(from_scope, set()).add(to_scope)
+        for scope, parent_scope in state['scope_parents'].items():
+            self.set_parent_scope(scope, parent_scope)
+
+    def register_node(self, node):
+        """ Register a node that uses this blackboard.
+            The node is assigned an index in the status table, and its scope
+            is dropped once the node is garbage collected.
+            @param node [Node] The node to register.
+        """
+        self.register_nodes((node,))
 
-    def _get_node_memory(self, scope):
+    def register_nodes(self, nodes):
+        """ Register several nodes that use this blackboard at once (see
+            register_node()).
+            @param nodes [list] The nodes to register.
+        """
+        self.collect()
+        index = self._node_status.index
+        refs = self._nodes
+        dead = self._dead
+        for node in nodes:
+            scope = node._id
+            index(scope)
+            if scope not in refs:
+                # the callback may run at any time, so only queue the scope
+                refs[scope] = weakref.ref(
+                    node, lambda ref, scope=scope: dead.append(scope))
+
+    def collect(self):
+        """ Drop the scopes of registered nodes that no longer exist.
+            @returns [int] The number of scopes dropped.
+        """
+        count = 0
+        while self._dead:
+            scope = self._dead.pop()
+            ref = self._nodes.get(scope)
+            if ref is not None and ref() is None:
+                self.drop_scope(scope)
+                count += 1
+        return count
+
+    def drop_scope(self, scope):
+        """ Release the memory, remappings and status of a scope.
+            Remappings from this scope onto other scopes are removed as well
+            (the other scopes keep their last remapped value).
+            @param scope [uuid] The id of the node.
+        """
+        memory = self._node_memory.pop(scope, None)
+        if memory is not None:
+            for from_scope, from_key in memory['remapping'].values():
+                targets = self._remap_targets.get(from_scope)
+                if targets is not None:
+                    targets.discard(scope)
+                    if not targets:
+                        del self._remap_targets[from_scope]
+        for to_scope in self._remap_targets.pop(scope, ()):
+            to_memory = self._node_memory.get(to_scope)
+            if to_memory is None:
+                continue
+            remap = to_memory['remapping']
+            for key in [key for key in remap if remap[key][0] == scope]:
+                del remap[key]
+        self._node_status.remove(scope)
+        self._nodes.pop(scope, None)
+        if self._deltas is not None:
+            self._deltas._drop(scope)
+        # the children of the scope inherit from its parent (or from the
+        # global memory if it has none) from now on
+        parent_scope = self._scope_parents.pop(scope, None)
+        for child_scope, child_parent in self._scope_parents.items():
+            if child_parent == scope:
+                self._scope_parents[child_scope] = parent_scope
+        locations = self._key_location
+        for location in [location for location, owner in locations.items()
+                         if owner is memory or location[0] == scope]:
+            del locations[location]
+
+    def set_parent_scope(self, scope, parent_scope=None):
+        """ Set the parent of a scope.
+            Keys that are not found in a scope are looked up in its parent
+            scopes, up to the global memory.  Scopes without a parent only
+            see their own keys.
+            @param scope [uuid] The id of the scope/node.
+            @param parent_scope [uuid] The id of the parent scope, or None
+            for the global memory.
+            @throws RuntimeError if the parent is a descendant of scope.
+        """
+        ancestor = parent_scope
+        while ancestor is not None:
+            if ancestor == scope:
+                raise RuntimeError("Scope can not be its own ancestor")
+            ancestor = self._scope_parents.get(ancestor)
+        self._scope_parents[scope] = parent_scope
+        self._key_location.clear()
+
+        nodedata = self._get_node_memory(scope)['node_data']
+        nodedata._inherit = functools.partial(self._get_inherited, scope)
+        if parent_scope is not None:
+            nodedata = self._get_node_memory(parent_scope)['node_data']
+            nodedata._on_new_key = self._key_location.clear
+
+    def link_scopes(self, root, parent_scope=None):
+        """ Make the scope of each node in a tree the parent of the scopes
+            of its children, so data saved on a behavior is shared with its
+            whole subtree.
+            @param root [Node] The root of the tree.
+            @param parent_scope [uuid] The parent scope of the root, or None
+            for the global memory.
+        """
+        for path, node in walk(root):
+            if node._blackboard is not self:
+                continue
+            if node is root or node._parent is None:
+                self.set_parent_scope(node._id, parent_scope)
+            else:
+                self.set_parent_scope(node._id, node._parent._id)
+
+    def _get_inherited(self, scope, key):
+        """ Get a key from the parent scopes of scope.
+            The scope that holds the key is cached until a new key is added
+            to any parent scope.
+            @param scope [uuid] The id of the scope.
+            @param key [string] The key to look up.
+            @returns The value of the key in the closest parent scope.
+            @throws KeyError if no parent scope has the key.
+        """
+        owner = self._key_location.get((scope, key))
+        if owner is None:
+            parent_scope = self._scope_parents.get(scope)
+            while parent_scope is not None:
+                memory = self._node_memory.get(parent_scope)
+                if memory is not None and (key in memory['remapping'] or
+                                           key in memory['node_data']):
+                    owner = memory
+                    break
+                parent_scope = self._scope_parents.get(parent_scope)
+            else:
+                if key not in self._base_memory:
+                    raise KeyError(key)
+                owner = self._base_memory
+            self._key_location[(scope, key)] = owner
+        if owner is self._base_memory:
+            return owner[key]
+        # resolve the remappings of the parent, as the parent itself does
+        # (see _get_node_data())
+        remap = owner['remapping'].get(key)
+        if remap is not None:
+            try:
+                return self.get(remap[1], remap[0])
+            except KeyError:
+                pass
+        return owner['node_data'][key]
+
+    def drop_node(self, node):
+        """ Release the scopes of a node and all of its children.
+            @param node [Node] The root of the subtree to drop.
+        """
+        for path, child in walk(node):
+            self.drop_scope(child._id)
+
+    def get_memory_usage(self):
+        """ Measure the memory held by each scope.
+            The size includes the NodeData, its values (following
+            containers) and the remappings, as reported by sys.getsizeof.
+            @returns [dict] The size in bytes of each scope.  The global
+            memory is reported under None.
+        """
+        usage = {None: _sizeof(self._base_memory, set())}
+        for scope, memory in self._node_memory.items():
+            seen = set()
+            size = _sizeof(memory, seen)
+            nodedata = memory.get('node_data')
+            if nodedata is not None:
+                size += _sizeof(nodedata._data, seen)
+                size += _sizeof(nodedata._locks, seen)
+                for key in nodedata.keys():
+                    size += _sizeof(key, seen) + _sizeof(nodedata[key], seen)
+            usage[scope] = size
+        return usage
+
+    def _get_node_memory(self, scope, nodedata_class=NodeData):
         """ Gets node memory
             If memory doesn't exist it will be assigned a default value.
             @param scope [uuid] The id of the node.
+            @param nodedata_class [type] The NodeData class of new memory.
             @returns [dict] The memory.
         """
         if not scope in self._node_memory:
-            self._node_memory[scope] = {'node_data': NodeData(),
+            nodedata = nodedata_class()
+            if self._deltas is not None:
+                self._deltas._watch(scope, nodedata)
+            self._node_memory[scope] = {'node_data': nodedata,
                                         'remapping': {}}
         return self._node_memory[scope]
 
@@ -176,15 +773,16 @@ class Blackboard(object):
         if not 'node_data' in node_memory:
             node_memory['node_data'] = NodeData()
         memory = node_memory['node_data']
-        logger.debug("node_data: " + str(memory))
         remapping = node_memory['remapping']
-        logger.debug("remapping: " + str(remapping))
 
         for key in remapping:
             (from_scope, from_key) = remapping[key]
             try:
                 value = self.get(from_key, from_scope)
-                memory[key] = value
+                # only copy changed values, so unchanged remappings do not
+                # show up as writes
+                if key not in memory or memory[key] is not value:
+                    memory[key] = value
             except:
                 pass
 
@@ -198,12 +796,10 @@ class Blackboard(object):
             @returns [dict] The memory.
         """
         memory = self._base_memory
-        logger.debug("base_memory: " + str(memory))
 
         if(scope):
             memory = self._get_node_memory(scope)
             memory = self._get_node_data(memory)
-            logger.debug(str(scope) + ".node_data: " + str(memory))
 
         return memory
 
@@ -215,6 +811,8 @@ class Blackboard(object):
         """
         memory = self._get_memory(scope)
         memory[key] = value
+        if scope is None and self._deltas is not None:
+            self._deltas._write(None, key, value)
 
     def get(self, key, scope=None):
         """ Gets a (key, value) pair from tree_scope/node_scope.
@@ -225,6 +823,40 @@ class Blackboard(object):
         memory = self._get_memory(scope)
         return memory[key]
 
+    def append(self, key, value, scope=None, timestamp=None, capacity=1024,
+               ttl=None):
+        """ Appends a sample to a time series key on tree_scope/node_scope.
+            If the key does not exist (or is None), a TimeSeries is created
+            with the shape and type of the sample.  The TimeSeries is shared
+            (not copied) by remappings of the key.  Requires numpy.
+            @param key [string] The key of the time series.
+            @param value [*] The sample.
+            @param scope [uuid] (optional) The uuid of the tree.
+            @param timestamp [float] (optional) The time of the sample.
+            @param capacity [int] The capacity of a new time series.
+            @param ttl [float] (optional) The time to live of the samples of
+            a new time series.
+            @returns [TimeSeries] The time series.
+            @throws TypeError if the key holds another type of value.
+        """
+        from task_behavior_engine.timeseries import TimeSeries
+        memory = self._get_memory(scope)
+        try:
+            series = memory[key]
+        except KeyError:
+            series = None
+        if series is None:
+            import numpy
+            sample = numpy.asarray(value)
+            series = TimeSeries(capacity, sample.shape, sample.dtype, ttl)
+            memory[key] = series
+        elif not isinstance(series, TimeSeries):
+            raise TypeError("%s is not a TimeSeries" % key)
+        series.append(value, timestamp)
+        if self._deltas is not None:
+            self._deltas._write(scope, key, series)
+        return series
+
     def add_remapping(self, from_scope, from_key, to_scope, to_key):
         """ Add a remapping from one node->key to another node->key.
             @param from_scope [uuid] The id of the source node.
@@ -237,6 +869,9 @@ class Blackboard(object):
         if to_key in remap:
             raise RuntimeError("Can not map to same key twice")
         remap[to_key] = (from_scope, from_key)
+        self._remap_targets.setdefault(from_scope, set()).add(to_scope)
+        # the key may now be found closer in the scope chain
+        self._key_location.clear()
 
     def get_memory(self, scope):
         """ Gets current nodedata with any remappings.
@@ -246,30 +881,265 @@ class Blackboard(object):
 
     def get_status(self):
         """ Gets all of the node status.
+            @returns [dict] The NodeStatus of each node, keyed by id.
+        """
+        return dict(self._node_status.items())
+
+    def get_status_array(self):
+        """ Gets the status enum of all nodes as a numpy array (no copy).
+            See StatusTable.as_array().
+            @returns [numpy.ndarray] The status of each node index.
         """
-        return self._node_status
+        return self._node_status.as_array()
+
+    def nodes_with_status(self, status):
+        """ Gets the nodes currently in a status.
+            @param status [int] The status enum (ie. NodeStatus.ACTIVE).
+            @returns [list] The ids of the nodes in that status.
+        """
+        return self._node_status.with_status(status)
+
+    def count_status(self, status):
+        """ Counts the nodes currently in a status.
+            @param status [int] The status enum (ie. NodeStatus.FAIL).
+            @returns [int] The number of nodes in that status.
+        """
+        return self._node_status.count(status)
+
+    def get_node_index(self, scope):
+        """ Gets the dense index of a node in the status table.
+            @param scope [uuid] The id of the node.
+            @returns [int] The index of the node in get_status_array().
+        """
+        return self._node_status.index(scope)
 
     def get_node_status(self, scope):
         """ Gets the status of a specific node.
+            A new NodeStatus is created on each call (see StatusTable.get()).
             @param scope [uuid] The id of the node to get.
-            @returns [NodeStatus] The status of the node.
+            @returns [NodeStatus] A copy of the status of the node.
         """
-        if not scope in self._node_status:
-            self._node_status[scope] = NodeStatus()
-        return self._node_status[scope]
+        return self._node_status.get(scope)
 
     def set_node_status(self, scope, status):
         """ Sets the status of a specific node
             @param scope [uuid] The id of the node to set
             @param status [NodeStatus] The status to set the node
         """
-        self._node_status[scope] = status
+        if isinstance(status, NodeStatus):
+            self._node_status.set(scope, status.status, status.text)
+        else:
+            self._node_status.set(scope, status)
+        if self._deltas is not None:
+            self._deltas._status(scope)
+
+    def reset_node_status(self, scope):
+        """ Resets the status of a specific node to PENDING.
+            @param scope [uuid] The id of the node to reset
+        """
+        self._node_status.set(scope, NodeStatus.PENDING)
+        if self._deltas is not None:
+            self._deltas._status(scope)
 
     def clear_node_status(self):
         """ Clears the node_status currently saved.
             This is mostly used for display purposes.
         """
-        self._node_status = {}
+        self._node_status.clear()
+        if self._deltas is not None:
+            self._deltas._clear()
+
+
+# the names of the methods of each node class (see _CloneTemplate)
+_methods = {}
+
+_CALLBACKS = ('_run_cb', '_configure_cb', '_cleanup_cb', '_cancel_cb')
+
+# the attributes of a node set by Node.clone() itself, the others are copied
+# with _copy_attribute()
+_NODE_KEYS = frozenset(('_id', '_uuid', '_parent', '_registry', '_name',
+                        '_force_state', '_result', '_statuses', '_blackboard',
+                        '_template') + _CALLBACKS)
+
+# the types of the attribute values shared by a node and its copies as is
+_IMMUTABLE = frozenset((bool, float, int, str, type(None)))
+
+
+def walk(root, path=None):
+    """ Walk a tree depth first.
+        @param root [Node] The root of the tree.
+        @param path [string] (optional) The path of the root.
+        @returns [generator] (path, node) for every node in the tree.
+    """
+    if path is None:
+        path = root._name
+    yield path, root
+    for child in root.get_children():
+        for item in walk(child, path + "/" + child._name):
+            yield item
+
+
+class NodeRegistry(object):
+
+    """ An index of all nodes in a tree by id and by path.
+        Paths are the names of the nodes from the root down, separated by
+        '/' (ie. root/finish_counts/count_1).  The registry is created by
+        Node.get_registry() and kept up to date as children are added to or
+        removed from the tree.
+    """
+
+    def __init__(self, root):
+        """ NodeRegistry constructor.
+            @param root [Node] The root of the tree to index.
+        """
+        self._root = root
+        self._nodes = {}
+        self._paths = {}
+        self._ids = {}
+        self.add(root)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, path):
+        return path in self._nodes
+
+    def add(self, node):
+        """ Add a node and its subtree to the registry.
+            @param node [Node] The node to add.  Its parent must already be
+            in the registry (unless it is the root).
+        """
+        if node is self._root:
+            path = node._name
+        else:
+            path = self._paths[node._parent._id] + "/" + node._name
+        for child_path, child in walk(node, path):
+            self._nodes[child_path] = child
+            self._paths[child._id] = child_path
+            self._ids[child._id] = child
+            child._registry = self
+
+    def remove(self, node):
+        """ Remove a node and its subtree from the registry.
+            @param node [Node] The node to remove.
+        """
+        for child_path, child in walk(node, self._paths[node._id]):
+            self._nodes.pop(child_path, None)
+            self._paths.pop(child._id, None)
+            self._ids.pop(child._id, None)
+            child._registry = None
+
+    def find(self, path):
+        """ Find a node by path.
+            @param path [string] The path of the node.
+            @returns [Node] The node.
+            @throws KeyError if no node has the path.
+        """
+        return self._nodes[path]
+
+    def get_node(self, node_id):
+        """ Find a node by id.
+            @param node_id [int] The id of the node.
+            @returns [Node] The node.
+            @throws KeyError if no node has the id.
+        """
+        return self._ids[node_id]
+
+    def get_path(self, node):
+        """ Get the path of a node.
+            @param node [Node] The node.
+            @returns [string] The path of the node.
+        """
+        return self._paths[node._id]
+
+    def paths(self):
+        """ Get all of the paths in the registry.
+            @returns [list] The paths.
+        """
+        return list(self._nodes.keys())
+
+
+def _copy_attribute(value, clones):
+    """ Copy an attribute of a node for its copy (see Node.clone()).
+        Nodes of the copied subtree are replaced by their copies, in lists,
+        tuples, sets and dicts as well.  Containers are copied one level
+        deep, other values are shared.
+        @param value [*] The value of the attribute.
+        @param clones [dict] The copy of each node of the subtree by id.
+        @returns The value of the attribute of the copy.
+    """
+    if isinstance(value, Node):
+        return clones.get(value._id, value)
+    value_type = type(value)
+    if value_type is list or value_type is tuple or value_type is set:
+        items = [clones.get(item._id, item) if isinstance(item, Node)
+                 else item for item in value]
+        return items if value_type is list else value_type(items)
+    if value_type is dict:
+        return dict((key, clones.get(item._id, item)
+                     if isinstance(item, Node) else item)
+                    for key, item in value.items())
+    return value
+
+
+class _CloneTemplate(object):
+
+    """ What Node.clone() needs to know about each node of a subtree,
+        computed once per prototype: the parent of the node, the attributes
+        to drop (hooks), the callbacks to bind to the copies and the
+        attributes to copy with _copy_attribute().
+
+        The entry of a node is computed again when the node gets new
+        attributes or callbacks, and the template is dropped when the
+        subtree changes (see Node._attach()).
+    """
+
+    def __init__(self, root):
+        """ _CloneTemplate constructor.
+            @param root [Node] The root of the subtree.
+        """
+        self.nodes = [node for path, node in walk(root)]
+        self.index = dict((node._id, i) for i, node in enumerate(self.nodes))
+        self.entries = []
+        for node in self.nodes:
+            parent = None if node is root else self.index[node._parent._id]
+            self.entries.append([node, parent])
+            self.update(self.entries[-1])
+
+    def update(self, entry):
+        """ Compute the entry of a node from its current attributes.
+            @param entry [list] The entry, as [node, parent index, size,
+            callbacks, attributes to drop, (name, function, owner index) of
+            the callbacks to bind, attributes to copy, whether
+            _clone_state() is extended].
+        """
+        node = entry[0]
+        cls = type(node)
+        methods = _methods.get(cls)
+        if methods is None:
+            methods = _methods[cls] = frozenset(
+                name for name in dir(cls) if callable(getattr(cls, name)))
+        state = node.__dict__
+        # hooks replace the methods of the node on the instance
+        drop = tuple(methods.intersection(state))
+        if '_hooks' in state:
+            drop += ('_hooks',)
+        rebind = []
+        for name in _CALLBACKS:
+            callback = state[name]
+            if type(callback) is types.MethodType and \
+                    isinstance(callback.__self__, Node):
+                owner = self.index.get(callback.__self__._id)
+                if owner is not None and \
+                        self.nodes[owner] is callback.__self__:
+                    rebind.append((name, callback.__func__, owner))
+        attributes = tuple(key for key in state
+                           if key not in _NODE_KEYS and key not in drop)
+        # only subclasses extending _clone_state() need it to be called
+        extended = any('_clone_state' in vars(base)
+                       for base in cls.__mro__[:cls.__mro__.index(Node)])
+        entry[2:] = [len(state), tuple(state[name] for name in _CALLBACKS),
+                     drop, tuple(rebind), attributes, extended]
 
 
 class Node(object):
@@ -286,8 +1156,24 @@ class Node(object):
         The data structure is provided by a Blackboard.  By default, each node
         creates its own Blackboard, however you may set the blackboard to a
         specific one as well so that nodes may share their data.
+
+        A node may declare the schema of its NodeData as a list of
+        (name, type, default) in nodedata_schema.  Its NodeData is then
+        created from nodedata_class(), with attribute-speed access to the
+        declared keys.
     """
 
+    nodedata_schema = None
+
+    _ids = itertools.count(1)
+
+    # the _CloneTemplate of the subtree of this node (see clone())
+    _template = None
+
+    # counts the phases that may have changed the execution state of this
+    # node, so checkpoints only save the state of nodes that ran
+    _state_version = 0
+
     def __init__(self, name, blackboard=Blackboard(), run_cb=None,
                  configure_cb=None, cleanup_cb=None, cancel_cb=None,
                  *args, **kwargs):
@@ -299,7 +1185,10 @@ class Node(object):
             @param cleanup_cb [function] The function to call on exit.
             @param cancel_cb [function] The function to call when canceled.
         """
-        self._id = uuid.uuid4()
+        self._id = next(Node._ids)
+        self._uuid = None
+        self._parent = None
+        self._registry = None
         self._name = name
         self._force_state = None
         self._run_cb = run_cb
@@ -307,43 +1196,90 @@ class Node(object):
         self._cleanup_cb = cleanup_cb
         self._cancel_cb = cancel_cb
         self._result = NodeStatus()
+        self._statuses = {}
         self._blackboard = blackboard
+        self._declare_nodedata()
+        blackboard.register_node(self)
+
+    @classmethod
+    def _nodedata_class(cls):
+        """ Get the NodeData class for the declared nodedata_schema.
+            The class is generated once per node class.
+            @returns [type] The NodeData class, or None without a schema.
+        """
+        if cls.nodedata_schema is None:
+            return None
+        if '_nodedata_cls' not in cls.__dict__:
+            cls._nodedata_cls = nodedata_class(cls.nodedata_schema,
+                                               cls.__name__ + 'Data')
+        return cls._nodedata_cls
+
+    def _declare_nodedata(self):
+        """ Create the NodeData of this node on its blackboard with the
+            declared schema (if any).
+        """
+        nodedata_cls = self._nodedata_class()
+        if nodedata_cls is not None:
+            self._blackboard._get_node_memory(self._id, nodedata_cls)
+
+    def _get_status(self, status, text, child=None):
+        """ Get a status of this node, created the first time it is asked
+            for, so steady state ticks do not allocate statuses.
+            The status is shared, it must not be modified.
+            @param status [int] The status enum.
+            @param text [string] The text, formatted with the name of this
+            node (%(node)s) and of the child (%(child)s).
+            @param child [Node] (optional) The child the status is about.
+            @returns [NodeStatus] The status.
+        """
+        key = (status, text, child)
+        result = self._statuses.get(key)
+        if result is None:
+            result = self._statuses[key] = NodeStatus(status, text % {
+                'node': self._name,
+                'child': child._name if child is not None else ''})
+        return result
 
     def _configure(self):
         """ Configuration performed once before run().
             This is usually used to set up internal variables.
         """
-        logger.debug(
-            self._name + "._configure() entering... " + str(self._result))
+        if _tracers:
+            tracing.emit(tracing.ENTER, self, tracing.CONFIGURE, self._result)
+        self._state_version += 1
         if self._configure_cb:
             nodedata = self._blackboard.get_memory(self._id)
             self._configure_cb(nodedata)
-        self._result = NodeStatus(
-            NodeStatus.ACTIVE, "Configured " + self._name)
-        logger.debug(
-            self._name + "._configure() exiting.. " + str(self._result))
+        self._result = self._get_status(NodeStatus.ACTIVE,
+                                        "Configured %(node)s")
+        if _tracers:
+            tracing.emit(tracing.EXIT, self, tracing.CONFIGURE, self._result)
 
     def _cleanup(self):
         """ Cleanup performed once after run() returns a termination value.
             This is usually used to reset internal variables.
         """
-        logger.debug(
-            self._name + "._cleanup() entering... " + str(self._result))
+        if _tracers:
+            tracing.emit(tracing.ENTER, self, tracing.CLEANUP, self._result)
+        self._state_version += 1
         if self._result == NodeStatus.ACTIVE:
             self._cancel()
         if self._cleanup_cb:
             nodedata = self._blackboard.get_memory(self._id)
             self._cleanup_cb(nodedata)
         self._force_state = None
-        self._result = NodeStatus(
-            NodeStatus.PENDING, "Cleaned up " + self._name)
-        logger.debug(self._name + "._cleanup() exiting.. " + str(self._result))
+        self._result = self._get_status(NodeStatus.PENDING,
+                                        "Cleaned up %(node)s")
+        if _tracers:
+            tracing.emit(tracing.EXIT, self, tracing.CLEANUP, self._result)
 
     def _run(self):
         """ Evaluates the current node.
             @returns [NodeStatus] Outcome status.
         """
-        logger.info(self._name + "._run() entering... " + str(self._result))
+        if _tracers:
+            tracing.emit(tracing.ENTER, self, tracing.RUN, self._result)
+        self._state_version += 1
         if self._force_state:
             self._result = self._force_state
         elif self._run_cb:
@@ -354,24 +1290,25 @@ class Node(object):
         if not type(self._result) == NodeStatus:
             raise NotImplementedError(
                 'Result of run_cb must be a task_behavior_engine.tree.NodeStatus type')
-        logger.info(self._name + "._run() exiting.. " + str(self._result))
         self._blackboard.set_node_status(self._id, self._result)
-        logger.info(self._name + " ::SET_NODE_STATUS:: " + str(self._result))
+        if _tracers:
+            tracing.emit(tracing.EXIT, self, tracing.RUN, self._result)
         return self._result
 
     def _cancel(self):
         """ Forces the current state to CANCEL
             and calls the cancel callback, if it exists.
         """
-        logger.debug(
-            self._name + "._cancel() entering... " + str(self._result))
-        self._force_state = NodeStatus(
-            NodeStatus.CANCEL, "Canceling " + self._name)
+        if _tracers:
+            tracing.emit(tracing.ENTER, self, tracing.CANCEL, self._result)
+        self._force_state = self._get_status(NodeStatus.CANCEL,
+                                             "Canceling %(node)s")
         nodedata = self._blackboard.get_memory(self._id)
         if self._cancel_cb:
             self._cancel_cb(nodedata)
         self._run()
-        logger.debug(self._name + "._cancel() exiting.. " + str(self._result))
+        if _tracers:
+            tracing.emit(tracing.EXIT, self, tracing.CANCEL, self._result)
 
     def cancel(self, *args, **kwargs):
         """ By default a behavior should just call its internal
@@ -383,13 +1320,12 @@ class Node(object):
         """ Forces an execution state.
             @param status [int] forced outcome state (must be NodeStatus enum).
         """
-        logger.debug(
-            self._name + ".force() entering... " + str(self._force_state))
+        self._state_version += 1
         self._force_state = NodeStatus(status)
         self._force_state.text = "Forcing " + self._name + \
             " to " + self._force_state._get_status_str()
-        logger.debug(
-            self._name + ".force() exiting.. " + str(self._force_state))
+        if _tracers:
+            tracing.emit(tracing.MARK, self, tracing.FORCE, self._force_state)
 
     def get_nodedata(self):
         """ Return the NodeData of this behavior
@@ -449,18 +1385,248 @@ class Node(object):
         @param blackboard [Blackboard] The blackboard to assign to this node.
         """
         self._blackboard = blackboard
+        self._declare_nodedata()
+        blackboard.register_node(self)
+
+    def get_children(self):
+        """ Get the children of this node.
+            @returns [list] The child nodes (empty for execution nodes).
+        """
+        return []
+
+    def get_uuid(self):
+        """ Get a universally unique id for this node.
+            The node id (_id) is a cheap sequential number that is unique
+            within this process; the uuid is only generated when asked for.
+            @returns [uuid.UUID] The uuid of this node.
+        """
+        if self._uuid is None:
+            self._uuid = uuid.uuid4()
+        return self._uuid
+
+    def get_registry(self):
+        """ Get the registry of the tree this node belongs to.
+            The registry is created (on the root) the first time it is
+            requested.
+            @returns [NodeRegistry] The registry of the tree.
+        """
+        if self._registry is None:
+            root = self
+            while root._parent is not None:
+                root = root._parent
+            if root._registry is None:
+                NodeRegistry(root)
+        return self._registry
+
+    def get_path(self):
+        """ Get the path of this node from the root of its tree.
+            @returns [string] The path (ie. root/finish_counts/count_1).
+        """
+        return self.get_registry().get_path(self)
+
+    def clone(self, blackboard=None):
+        """ Create a new instance of this node and its subtree, without
+            running constructors.
+            The instance gets new ids and its own execution state, copied
+            from this node: result, forced status, attributes and node data.
+            Attributes holding nodes of the subtree (ie. the children, or the
+            child selected by a Random) are rebased onto their copies.
+            Lists, tuples, sets and dicts held by attributes are copied one
+            level deep, node data values are copied with copy.copy() and
+            other values (ie. constructor parameters) are shared.  Callbacks
+            bound to a node of the subtree are bound to its copy.
+            Remappings and parent scopes between nodes of the subtree are
+            rebased onto the new ids, remappings from other nodes are kept.
+            Hooks (and other wrappers of the methods of a node) are not
+            copied.
+
+            The first clone of a node computes a template of its subtree,
+            which later clones reuse until the subtree changes.
+            @param blackboard [Blackboard] (optional) The blackboard of the
+            copy, the blackboard of this node by default.
+            @returns [Node] The copy of this node.
+        """
+        if blackboard is None:
+            blackboard = self._blackboard
+        template = self._template
+        if template is None:
+            template = self._template = _CloneTemplate(self)
+        entries = template.entries
+        ids = Node._ids
+        shared = {'_uuid': None, '_registry': None, '_template': None,
+                  '_blackboard': blackboard}
+        clones = {}
+        copies = []
+        for entry in entries:
+            node = entry[0]
+            state = node.__dict__
+            if len(state) != entry[2] or entry[3] != (
+                    state['_run_cb'], state['_configure_cb'],
+                    state['_cleanup_cb'], state['_cancel_cb']):
+                template.update(entry)
+            cls = type(node)
+            new = cls.__new__(cls)
+            new_state = new.__dict__
+            new_state.update(state)
+            for key in entry[4]:
+                del new_state[key]
+            new_state.update(shared)
+            new_state['_id'] = next(ids)
+            new_state['_statuses'] = {}
+            clones[state['_id']] = new
+            copies.append(new)
+
+        for entry, new in zip(entries, copies):
+            node, parent, size, callbacks, drop, rebind, attributes, \
+                extended = entry
+            new_state = new.__dict__
+            new_state['_parent'] = None if parent is None else copies[parent]
+            for name, function, owner in rebind:
+                new_state[name] = function.__get__(copies[owner])
+            for key in attributes:
+                value = new_state[key]
+                if isinstance(value, Node):
+                    new_state[key] = clones.get(value._id, value)
+                elif type(value) not in _IMMUTABLE:
+                    new_state[key] = _copy_attribute(value, clones)
+            if extended:
+                node._clone_state(new, clones)
+        blackboard.register_nodes(copies)
+
+        for i, node in enumerate(template.nodes):
+            source = node._blackboard
+            memory = source._node_memory.get(node._id)
+            # empty memory is created when it is first used
+            if memory is not None and (memory['remapping'] or
+                                       memory['node_data'].keys()) or \
+                    node._id in source._scope_parents:
+                node._clone_memory(copies[i], clones)
+        return copies[0]
+
+    def _clone_state(self, new, clones):
+        """ Finish the copy of this node, once every node of the subtree is
+            copied (see clone()).  Subclasses referring to nodes by id must
+            extend this to rebase the ids.
+            @param new [Node] The copy.
+            @param clones [dict] The copy of each node of the subtree by id.
+        """
+
+    def _clone_memory(self, new, clones):
+        """ Copy the node data, remappings and parent scope of this node to
+            its copy.
+            @param new [Node] The copy.
+            @param clones [dict] The copy of each node of the subtree by id.
+        """
+        def rebase(scope):
+            node = clones.get(scope)
+            return scope if node is None else node._id
+
+        source = self._blackboard
+        target = new._blackboard
+        if self._id in source._scope_parents:
+            target.set_parent_scope(
+                new._id, rebase(source._scope_parents[self._id]))
+        memory = source._node_memory.get(self._id)
+        if memory is None:
+            return
+        nodedata = memory['node_data']
+        remapping = memory['remapping']
+        keys = nodedata.keys()
+        if not keys and not remapping:
+            return
+        new_nodedata = target._get_node_memory(
+            new._id, type(nodedata))['node_data']
+        for key in keys:
+            value = nodedata.get_data(key)
+            # remapped values are read from their source again
+            new_nodedata[key] = value if key in remapping else copy.copy(value)
+        for to_key, (from_scope, from_key) in remapping.items():
+            target.add_remapping(rebase(from_scope), from_key, new._id,
+                                 to_key)
+
+    def _attach(self, child):
+        """ Make this node the parent of child.
+            @param child [Node] The new child.
+        """
+        child._parent = self
+        if self._registry is not None:
+            self._registry.add(child)
+        elif child._registry is not None:
+            # the subtree was its own tree, its registry is stale now (the
+            # root creates a new one when it is asked for)
+            for path, node in walk(child):
+                node._registry = None
+        self._drop_templates()
+
+    def _detach(self, child):
+        """ Remove child from this node.
+            @param child [Node] The removed child.
+        """
+        if child._registry is not None:
+            child._registry.remove(child)
+        child._parent = None
+        # do not keep statuses about the child alive
+        self._statuses.clear()
+        self._drop_templates()
+
+    def _drop_templates(self):
+        """ Drop the clone templates of this node and its ancestors, after
+            the subtree of this node changed (see clone()).
+        """
+        node = self
+        while node is not None:
+            if node._template is not None:
+                node._template = None
+            node = node._parent
+
+    def _get_state(self):
+        """ Get the execution state of this node.
+            Subclasses that keep execution state outside of the blackboard
+            should extend this so the state can be checkpointed.
+            @returns [dict] The execution state of this node.
+        """
+        state = {'result': (self._result.status, self._result.text),
+                 'force': None}
+        if self._force_state:
+            state['force'] = (self._force_state.status,
+                              self._force_state.text)
+        return state
+
+    def _set_state(self, state):
+        """ Set the execution state of this node.
+            No callbacks are called, so an ACTIVE node resumes without
+            being configured again.
+            @param state [dict] The execution state from _get_state().
+        """
+        self._result = NodeStatus(*state['result'])
+        self._force_state = None
+        if state['force']:
+            self._force_state = NodeStatus(*state['force'])
 
     def tick(self, *args, **kwargs):
         """Runs the node
         """
-        logger.debug(self._name + ".tick() entering... " + str(self._result))
+        deltas = self._blackboard._deltas
+        if deltas is not None and deltas._depth == 0:
+            # outermost tick on this blackboard, emit a delta once it returns
+            deltas._depth = 1
+            try:
+                return self._tick()
+            finally:
+                deltas._depth = 0
+                deltas.flush()
+        return self._tick()
+
+    def _tick(self):
+        if _tracers:
+            tracing.emit(tracing.ENTER, self, tracing.TICK, self._result)
         if self._result == NodeStatus.PENDING:
             self._configure()
         result = self._run()
-        logger.debug(self._name + ".tick() result: " + str(result))
         if not (self._result == NodeStatus.ACTIVE or self._result == NodeStatus.PENDING):
             self._cleanup()
-        logger.debug(self._name + ".tick() exiting.. " + str(self._result))
+        if _tracers:
+            tracing.emit(tracing.EXIT, self, tracing.TICK, result)
         return result
 
 
@@ -472,44 +1638,47 @@ class Decorator(Node):
 
     def __init__(self, name, child=None, *args, **kwargs):
         super(Decorator, self).__init__(name=name, *args, **kwargs)
-        self._child = child
+        self._child = None
+        self.set_child(child)
 
     def _configure(self):
         """ Configure the child node if this node is configured.
         """
-        logger.debug(
-            self._name + "._configure() entering... " + str(self._result))
         if self._child:
             self._child._configure()
         super(Decorator, self)._configure()
-        logger.debug(
-            self._name + "._configure() exiting.. " + str(self._result))
 
     def _cleanup(self):
         """ Cleanup the child node if this node is cleaned up.
         """
-        logger.debug(
-            self._name + "._cleanup() entering... " + str(self._result))
         if self._child:
             self._child._cleanup()
         super(Decorator, self)._cleanup()
-        logger.debug(self._name + "._cleanup() exiting.. " + str(self._result))
 
     def _cancel(self):
         """ Cancel the child node if this node is canceled.
         """
-        logger.debug(
-            self._name + "._cancel() entering... " + str(self._result))
         if self._child:
             self._child._cancel()
         super(Decorator, self)._cancel()
-        logger.debug(self._name + "._cancel() exiting.. " + str(self._result))
 
     def set_child(self, child):
         """ Assign the child node.  This can also be done at the constructor.
             @param child [Node] The child to add to this decorator
         """
+        if self._child:
+            self._detach(self._child)
         self._child = child
+        if child:
+            self._attach(child)
+
+    def get_children(self):
+        """ Get the child of this decorator.
+            @returns [list] The child node, if assigned.
+        """
+        if self._child:
+            return [self._child]
+        return []
 
     def tick_child(self):
         """ Run the child node.
@@ -542,6 +1711,7 @@ class Behavior(Node):
         """
         if self.check_unique_child(node._name):
             self._children.append(node)
+            self._attach(node)
         else:
             raise RuntimeError(
                 "Could not add node %s to %s. Name is not unique." % (node._name, self._name))
@@ -552,12 +1722,14 @@ class Behavior(Node):
         @throws ValueError if node not child of behavior.
         """
         self._children.remove(node)
+        self._detach(node)
 
     def prepend_child(self, node):
         """Add a node to the beginning of the behavior tree.
         @param node [Node] The node to prepend.
         """
         self._children.insert(0, node)
+        self._attach(node)
 
     def insert_child(self, node, i):
         """Insert node into position i of the behavior tree.
@@ -565,21 +1737,54 @@ class Behavior(Node):
         @param i [int] The position of insertion.
         """
         self._children.insert(i, node)
+        self._attach(node)
+
+    def get_children(self):
+        """ Get the children of this behavior.
+            @returns [list] The child nodes in execution order.
+        """
+        return list(self._children)
+
+    def _get_state(self):
+        """ Get the execution state of this behavior.
+            Open nodes are stored by name so they survive new node ids.
+            @returns [dict] The execution state of this behavior.
+        """
+        state = super(Behavior, self)._get_state()
+        state['open_nodes'] = [child._name for child in self._children
+                               if child._id in self._open_nodes]
+        return state
+
+    def _set_state(self, state):
+        """ Set the execution state of this behavior.
+            @param state [dict] The execution state from _get_state().
+        """
+        super(Behavior, self)._set_state(state)
+        self._open_nodes = [child._id for child in self._children
+                            if child._name in state.get('open_nodes', [])]
+
+    def _clone_state(self, new, clones):
+        """ Rebase the open nodes of the copy onto the copies of the
+            children (see Node.clone()).
+        """
+        super(Behavior, self)._clone_state(new, clones)
+        new._open_nodes = [clones[scope]._id for scope in self._open_nodes
+                           if scope in clones]
 
     def tick_child(self, child):
         """Run a child node
         @param child [Node] The child to run
         """
-        logger.info(child._name + ".tick_child()")
         result = child.tick()
         if result == NodeStatus.ACTIVE:
             if child._id not in self._open_nodes:
-                logger.info("Adding child " + child._name + " to open_nodes")
+                if _tracers:
+                    tracing.emit(tracing.MARK, child, tracing.OPEN)
                 self._open_nodes.append(child._id)
         if child.get_result() == NodeStatus.PENDING:
             if child._id in self._open_nodes:
-                logger.info(
-                    "Removing child " + child._name + " from open_nodes")
+                if _tracers:
+                    tracing.emit(tracing.MARK, child, tracing.CLOSE)
                 self._open_nodes.remove(child._id)
         return result
 
@@ -600,11 +1805,10 @@ class Behavior(Node):
         """
         for child in self._children:
             if not child.get_result() == NodeStatus.PENDING:
-                logger.info("Cleaning up child " + child._name)
                 child._cleanup()
                 if child._id in self._open_nodes:
-                    logger.info(
-                        "Removing child " + child._name + " from open_nodes")
+                    if _tracers:
+                        tracing.emit(tracing.MARK, child, tracing.CLOSE)
                     self._open_nodes.remove(child._id)
 
     def _cleanup(self):
@@ -618,12 +1822,11 @@ class Behavior(Node):
         """ Reset the current node status for all children
         """
         for child in self._children:
-            child._blackboard.set_node_status(child._id, NodeStatus())
+            child._blackboard.reset_node_status(child._id)
 
     def cancel_child(self, child):
         """ Cancel a particular child.
             @param child [Node] The child to cancel
         """
         if not child.get_result() == NodeStatus.PENDING:
-            logger.info("Canceling child " + child._name)
             child._cancel()
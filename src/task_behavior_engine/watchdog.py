@@ -0,0 +1,221 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+import logging
+import sys
+import threading
+import traceback
+
+from timeit import default_timer
+
+from task_behavior_engine.hooks import Hook
+from task_behavior_engine.hooks import PHASES
+from task_behavior_engine.hooks import add_node_hook
+from task_behavior_engine.hooks import remove_node_hook
+from task_behavior_engine.tree import NodeStatus
+from task_behavior_engine.tree import walk
+
+logger = logging.getLogger(__name__)
+
+# the time a node stays ACTIVE (from its first _run returning ACTIVE until
+# its _run returns anything else), ie. while its work runs on another thread
+ACTIVE = 'active'
+
+Overrun = collections.namedtuple(
+    'Overrun', ['path', 'phase', 'budget', 'elapsed', 'stack'])
+
+
+def set_budget(node, seconds, phase='_run'):
+    """ Declare the time budget of a phase of a node.
+        @param node [Node] The node.
+        @param seconds [float] The budget (None to remove it).
+        @param phase [string] The phase (_configure, _run, _cleanup, _cancel)
+        or ACTIVE.
+        @throws ValueError if the phase is unknown.
+    """
+    if phase not in PHASES and phase != ACTIVE:
+        raise ValueError("Unknown phase " + str(phase))
+    budgets = node.__dict__.get('_budgets')
+    if budgets is None:
+        budgets = node._budgets = {}
+    if seconds is None:
+        budgets.pop(phase, None)
+    else:
+        budgets[phase] = seconds
+
+
+def get_budget(node, phase='_run'):
+    """ Get the time budget of a phase of a node.
+        @param node [Node] The node.
+        @param phase [string] The phase.
+        @returns [float] The budget, or None.
+    """
+    return node.__dict__.get('_budgets', {}).get(phase)
+
+
+class Watchdog(Hook):
+
+    """ A thread that detects nodes overrunning their time budgets (see
+        set_budget()).
+
+        A phase overrunning its budget is reported once with the path of the
+        node and the stack of the thread running it (a hung callback cannot
+        be interrupted, the report tells where it is stuck).
+
+        A node staying ACTIVE longer than its ACTIVE budget (ie. waiting on
+        work running on another thread) is reported, and the watchdog can
+        also end it so the rest of the tree keeps going: with action FAIL the
+        node is forced to FAIL, with action CANCEL the node is canceled by
+        the thread ticking it at its next _run.
+
+        Only nodes with budgets are hooked.
+    """
+
+    def __init__(self, root, interval=0.01, action=None, on_overrun=None):
+        """ Watchdog constructor.
+            @param root [Node] The root of the tree.
+            @param interval [float] The time between checks (in seconds).
+            @param action [int] (optional) NodeStatus.FAIL or
+            NodeStatus.CANCEL to end nodes overrunning their ACTIVE budget.
+            @param on_overrun [function] (optional) Called with an Overrun
+            (from the watchdog thread), the default logs a warning.
+            @throws ValueError if the action is not FAIL or CANCEL.
+        """
+        if action not in (None, NodeStatus.FAIL, NodeStatus.CANCEL):
+            raise ValueError("The action must be FAIL or CANCEL")
+        self._root = root
+        self._interval = interval
+        self._action = action
+        self._on_overrun = on_overrun or self._log
+        self._paths = {}
+        self._nodes = []
+        # running phases:
+        # [node, phase, thread, start, budget, deadline, reported]
+        self._running = {}
+        # active nodes: node id -> [node, start, budget, deadline, reported]
+        self._active = {}
+        self._cancels = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """ Hook the nodes with budgets and start the watchdog thread.
+            Call it again to include budgets declared since.
+        """
+        for path, node in walk(self._root):
+            if node.__dict__.get('_budgets'):
+                self._paths[node._id] = path
+                if node not in self._nodes:
+                    add_node_hook(node, self)
+                    self._nodes.append(node)
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """ Stop the watchdog thread and unhook the nodes.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        for node in self._nodes:
+            remove_node_hook(node, self)
+        self._nodes = []
+        self._running.clear()
+        self._active.clear()
+        self._cancels.clear()
+
+    def enter(self, node, phase):
+        if phase == '_run' and node._id in self._cancels:
+            # cancel on the thread ticking the node (_cancel runs _run again)
+            self._cancels.discard(node._id)
+            node._cancel()
+        start = default_timer()
+        budget = node._budgets.get(phase)
+        if budget is None:
+            return start
+        entry = [node, phase, threading.current_thread().ident, start,
+                 budget, start + budget, False]
+        self._running[id(entry)] = entry
+        return entry
+
+    def exit(self, node, phase, token, error):
+        if type(token) is list:
+            self._running.pop(id(token), None)
+            start = token[3]
+        else:
+            start = token
+        if phase != '_run' or ACTIVE not in node._budgets:
+            return
+        if error is None and node._result == NodeStatus.ACTIVE:
+            if node._id not in self._active:
+                budget = node._budgets[ACTIVE]
+                self._active[node._id] = [
+                    node, start, budget, start + budget, False]
+        else:
+            self._active.pop(node._id, None)
+
+    def check(self, now=None):
+        """ Report the overruns (called periodically by the watchdog thread).
+            @param now [float] (optional) The current time.
+            @returns [list] The new Overruns.
+        """
+        if now is None:
+            now = default_timer()
+        overruns = []
+        frames = None
+        for entry in list(self._running.values()):
+            node, phase, thread, start, budget, deadline, reported = entry
+            if reported or now < deadline:
+                continue
+            entry[6] = True
+            if frames is None:
+                frames = sys._current_frames()
+            frame = frames.get(thread)
+            stack = ''.join(traceback.format_stack(frame)) if frame else ''
+            overruns.append(Overrun(
+                self._paths.get(node._id, node._name), phase, budget,
+                now - start, stack))
+        for entry in list(self._active.values()):
+            node, start, budget, deadline, reported = entry
+            if reported or now < deadline:
+                continue
+            entry[4] = True
+            overruns.append(Overrun(
+                self._paths.get(node._id, node._name), ACTIVE, budget,
+                now - start, ''))
+            if self._action == NodeStatus.FAIL:
+                node.force(NodeStatus.FAIL)
+            elif self._action == NodeStatus.CANCEL:
+                self._cancels.add(node._id)
+        for overrun in overruns:
+            self._on_overrun(overrun)
+        return overruns
+
+    def _watch(self):
+        while not self._stop.wait(self._interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Watchdog check failed")
+
+    @staticmethod
+    def _log(overrun):
+        logger.warning("%s.%s() overran its budget of %.3fs (%.3fs)\n%s",
+                       overrun.path, overrun.phase, overrun.budget,
+                       overrun.elapsed, overrun.stack)
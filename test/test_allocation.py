@@ -0,0 +1,126 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import gc
+
+from nose.tools import assert_equal
+
+from task_behavior_engine import branch
+from task_behavior_engine import decorator
+from task_behavior_engine.node import Continue
+from task_behavior_engine.node import Fail
+from task_behavior_engine.node import Success
+from task_behavior_engine.tree import Blackboard
+from task_behavior_engine.tree import NodeStatus
+
+
+def count_allocations(node, ticks=100, warmup=3):
+    """ Count the allocations of steady state ticks of a tree.
+        Objects created and released within a tick are not seen by the
+        count of live objects, only the NodeStatus count sees them.
+        @param node [Node] The root of the tree.
+        @param ticks [int] The number of ticks measured.
+        @param warmup [int] The number of ticks before measuring.
+        @returns [tuple] The number of NodeStatus created, and the number of
+        objects tracked by the garbage collector that are still alive after
+        the ticks, per tick.
+    """
+    for i in range(warmup):
+        node.tick()
+
+    created = [0]
+    init = NodeStatus.__init__
+
+    def counting_init(self, *args, **kwargs):
+        created[0] += 1
+        init(self, *args, **kwargs)
+
+    gc.collect()
+    before = len(gc.get_objects())
+    NodeStatus.__init__ = counting_init
+    try:
+        for i in range(ticks):
+            node.tick()
+    finally:
+        NodeStatus.__init__ = init
+    gc.collect()
+    live = len(gc.get_objects()) - before
+    return created[0] / float(ticks), live / float(ticks)
+
+
+class TestAllocation(object):
+
+    def setUp(self):
+        self.blackboard = Blackboard()
+
+    def leaf(self, node_class, name):
+        return node_class(name, blackboard=self.blackboard)
+
+    def behavior(self, behavior_class, *children):
+        node = behavior_class(behavior_class.__name__,
+                              blackboard=self.blackboard)
+        for i, child_class in enumerate(children):
+            node.add_child(self.leaf(child_class, 'child_%d' % i))
+        return node
+
+    def decorator(self, decorator_class, child_class, *args):
+        node = decorator_class(decorator_class.__name__, *args,
+                               blackboard=self.blackboard)
+        node.set_child(self.leaf(child_class, 'child'))
+        return node
+
+    def check(self, node):
+        created, live = count_allocations(node)
+        assert_equal((type(node).__name__, created), (type(node).__name__, 0))
+        assert live <= 0, (type(node).__name__, live)
+
+    def test_branch(self):
+        trees = [self.behavior(branch.Selector, Fail, Continue),
+                 self.behavior(branch.Sequencer, Success, Continue),
+                 self.behavior(branch.Runner, Success, Continue),
+                 self.behavior(branch.Any, Fail, Continue),
+                 self.behavior(branch.All, Success, Continue),
+                 self.behavior(branch.Random, Continue),
+                 self.behavior(branch.Progressor, Success, Continue),
+                 self.behavior(branch.Majority, Continue, Continue, Continue),
+                 self.behavior(branch.First, Continue, Continue)]
+        for tree in trees:
+            self.check(tree)
+
+    def test_decorator(self):
+        trees = [self.decorator(decorator.Negate, Continue),
+                 self.decorator(decorator.Repeat, Success),
+                 self.decorator(decorator.While, Success),
+                 self.decorator(decorator.Until, Fail),
+                 self.decorator(decorator.UntilCount, Fail, 1000000),
+                 self.decorator(decorator.Fail, Continue),
+                 self.decorator(decorator.Succeed, Continue)]
+        for tree in trees:
+            self.check(tree)
+
+    def test_nested(self):
+        root = self.behavior(branch.Sequencer, Success)
+        repeat = self.decorator(decorator.Repeat, Success)
+        any_node = self.behavior(branch.Any, Fail, Continue)
+        root.add_child(repeat)
+        root.add_child(any_node)
+        self.check(root)
+
+    def test_status_text(self):
+        node = self.behavior(branch.Sequencer, Success, Continue)
+        result = node.tick()
+        assert_equal(result.status, NodeStatus.ACTIVE)
+        assert_equal(result.text, "Executing Sequencer:child_1")
+        assert result is node.tick()
+        assert_equal(node.get_result().text, "Executing Sequencer:child_1")
@@ -747,6 +747,27 @@ class TestRandom(object):
         assert_equal(self.blackboard.get_node_status(self.RANDOM.child._id),
                      NodeStatus.PENDING)
 
+    def test_clone(self):
+        self.RANDOM.add_child(self.SUCCESS1)
+        self.RANDOM.add_child(self.CONTINUE)
+        self.RANDOM._configure()
+        while (self.RANDOM.child != self.CONTINUE):
+            self.RANDOM._configure()
+        self.RANDOM.tick()
+
+        new = self.RANDOM.clone()
+        success, active = new.get_children()
+        # the selected child of the copy is the copy of the selected child
+        assert new.child is active
+        active.force(NodeStatus.FAIL)
+        result = new.tick()
+        assert_equal(result, NodeStatus.FAIL)
+        assert_equal(self.blackboard.get_node_status(active._id),
+                     NodeStatus.FAIL)
+        assert_equal(self.blackboard.get_node_status(self.CONTINUE._id),
+                     NodeStatus.ACTIVE)
+        assert self.RANDOM.child is self.CONTINUE
+
 
 class TestProgressor(object):
 
@@ -891,6 +912,29 @@ class TestProgressor(object):
         assert_equal(self.blackboard.get_node_status(self.FAIL2._id),
                      NodeStatus.PENDING)
 
+    def test_clone(self):
+        self.PROGRESS.add_child(self.SUCCESS1)
+        self.PROGRESS.add_child(self.CONTINUE)
+        self.PROGRESS.add_child(self.SUCCESS2)
+        self.PROGRESS.tick()
+
+        new = self.PROGRESS.clone()
+        assert_equal(new.index, 1)
+        success1, active, success2 = new.get_children()
+        assert_equal(new._open_nodes, [active._id])
+        active.force(NodeStatus.SUCCESS)
+        result = new.tick()
+        assert_equal(result, NodeStatus.SUCCESS)
+        assert_equal(self.blackboard.get_node_status(success2._id),
+                     NodeStatus.SUCCESS)
+        # the prototype is still running its second child
+        assert_equal(self.PROGRESS.index, 1)
+        assert_equal(self.PROGRESS._open_nodes, [self.CONTINUE._id])
+        assert_equal(self.blackboard.get_node_status(self.CONTINUE._id),
+                     NodeStatus.ACTIVE)
+        assert_equal(self.blackboard.get_node_status(self.SUCCESS2._id),
+                     NodeStatus.PENDING)
+
 
 class TestMajority(object):
 
@@ -1039,6 +1083,28 @@ class TestMajority(object):
         assert_equal(self.blackboard.get_node_status(self.FAIL2._id),
                      NodeStatus.FAIL)
 
+    def test_clone(self):
+        self.MAJORITY.add_child(self.CONTINUE)
+        self.MAJORITY.add_child(self.SUCCESS1)
+        self.MAJORITY.add_child(self.FAIL1)
+        self.MAJORITY.add_child(self.FAIL2)
+        result = self.MAJORITY.tick()
+        assert_equal(result, NodeStatus.ACTIVE)
+
+        new = self.MAJORITY.clone()
+        assert_equal((new.num_fail, new.num_succeed), (2, 1))
+        active = new.get_children()[0]
+        assert_equal(new._open_nodes, [active._id])
+        active.force(NodeStatus.SUCCESS)
+        result = new.tick()
+        assert_equal(result, NodeStatus.SUCCESS)
+        # the prototype keeps its counts and its running child
+        assert_equal((self.MAJORITY.num_fail, self.MAJORITY.num_succeed),
+                     (2, 1))
+        assert_equal(self.MAJORITY._open_nodes, [self.CONTINUE._id])
+        assert_equal(self.blackboard.get_node_status(self.CONTINUE._id),
+                     NodeStatus.ACTIVE)
+
 
 class TestFirst(object):
 
@@ -0,0 +1,206 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equal
+
+from task_behavior_engine.branch import Majority
+from task_behavior_engine.branch import Progressor
+from task_behavior_engine.checkpoint import Checkpoint
+from task_behavior_engine.checkpoint import walk
+from task_behavior_engine.delta import DeltaStream
+from task_behavior_engine.node import Fail
+from task_behavior_engine.node import Success
+from task_behavior_engine.tree import Blackboard
+from task_behavior_engine.tree import Node
+from task_behavior_engine.tree import NodeStatus
+
+
+class Count(Node):
+
+    def __init__(self, name, *args, **kwargs):
+        super(Count, self).__init__(name,
+                                    configure_cb=self.configure,
+                                    run_cb=self.run,
+                                    *args, **kwargs)
+
+    def configure(self, nodedata):
+        nodedata.configured = nodedata.get_data('configured', 0) + 1
+        nodedata.index = 0
+
+    def run(self, nodedata):
+        nodedata.index += 1
+        if nodedata.index < 3:
+            return NodeStatus(NodeStatus.ACTIVE, "Count " + str(nodedata.index))
+        return NodeStatus(NodeStatus.SUCCESS)
+
+
+def build_tree():
+    blackboard = Blackboard()
+    root = Progressor("root", blackboard=blackboard)
+    root.add_child(Success("success", blackboard=blackboard))
+    vote = Majority("vote", blackboard=blackboard)
+    vote.add_child(Fail("fail", blackboard=blackboard))
+    vote.add_child(Count("count", blackboard=blackboard))
+    root.add_child(vote)
+    return root
+
+
+class TestCheckpoint(object):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "tree.ckpt")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_walk(self):
+        root = build_tree()
+        paths = [path for path, node in walk(root)]
+        assert_equal(paths, ['root', 'root/success', 'root/vote',
+                             'root/vote/fail', 'root/vote/count'])
+
+    def test_restore(self):
+        root = build_tree()
+        root._blackboard.save('mission', 'patrol')
+        checkpoint = Checkpoint(self.filename, root)
+        assert_equal(root.tick(), NodeStatus.ACTIVE)
+        checkpoint.save()
+        checkpoint.close()
+
+        # restore into a new tree as if the process restarted
+        restored = build_tree()
+        checkpoint = Checkpoint(self.filename, restored)
+        assert checkpoint.restore() > 0
+        checkpoint.close()
+
+        blackboard = restored._blackboard
+        vote = restored._children[1]
+        count = vote._children[1]
+        assert_equal(blackboard.get('mission'), 'patrol')
+        assert_equal(restored.get_result(), NodeStatus.ACTIVE)
+        assert_equal(restored.index, 1)
+        assert_equal(vote.num_fail, 1)
+        assert_equal(vote.num_succeed, 0)
+        assert_equal(vote._open_nodes, [count._id])
+        assert_equal(blackboard.get_node_status(count._id), NodeStatus.ACTIVE)
+        assert_equal(blackboard.get('index', count._id), 1)
+
+        # active nodes resume without being configured again
+        result = restored.tick()
+        assert_equal(blackboard.get('configured', count._id), 1)
+        assert_equal(blackboard.get('index', count._id), 2)
+        assert_equal(result, NodeStatus.ACTIVE)
+        result = restored.tick()
+        assert_equal(result, NodeStatus.SUCCESS)
+
+    def test_incremental(self):
+        root = build_tree()
+        checkpoint = Checkpoint(self.filename, root)
+        first = checkpoint.save()
+        assert first > 0
+        # nothing changed
+        assert_equal(checkpoint.save(), 0)
+        root.tick()
+        changed = checkpoint.save()
+        assert 0 < changed
+        assert_equal(checkpoint.save(), 0)
+        checkpoint.close()
+
+    def test_compact(self):
+        root = build_tree()
+        checkpoint = Checkpoint(self.filename, root, size=512)
+        for i in range(200):
+            root._blackboard.save('tick', i)
+            checkpoint.save()
+        checkpoint.close()
+
+        restored = build_tree()
+        checkpoint = Checkpoint(self.filename, restored)
+        checkpoint.restore()
+        checkpoint.close()
+        assert_equal(restored._blackboard.get('tick'), 199)
+        assert not os.path.exists(self.filename + '.tmp')
+
+    def test_tracked(self):
+        root = build_tree()
+        blackboard = root._blackboard
+        count = root._children[1]._children[1]
+        checkpoint = Checkpoint(self.filename, root)
+        checkpoint.save()
+        root.tick()
+        assert 0 < checkpoint.save()
+        # only the keys written since the last save are saved
+        count.set_nodedata('limit', [1])
+        blackboard.save('mission', 'patrol')
+        assert_equal(checkpoint.save(), 2)
+        # values changed in place are only seen by a full save
+        blackboard.get('limit', count._id).append(2)
+        assert_equal(checkpoint.save(), 0)
+        assert_equal(checkpoint.save(full=True), 1)
+        # forcing a node changes its state
+        root._children[0].force(NodeStatus.FAIL)
+        assert_equal(checkpoint.save(), 1)
+        checkpoint.close()
+
+        restored = build_tree()
+        checkpoint = Checkpoint(self.filename, restored)
+        checkpoint.restore()
+        checkpoint.close()
+        count = restored._children[1]._children[1]
+        assert_equal(restored._blackboard.get('mission'), 'patrol')
+        assert_equal(restored._blackboard.get('limit', count._id), [1, 2])
+        assert_equal(restored._children[0]._force_state, NodeStatus.FAIL)
+        assert_equal(restored.index, 1)
+
+    def test_removed(self):
+        root = build_tree()
+        checkpoint = Checkpoint(self.filename, root)
+        checkpoint.save()
+        root.tick()
+        checkpoint.save()
+        vote = root._children[1]
+        root.remove_child(vote)
+        # node, status and data records of the 3 removed nodes
+        assert_equal(checkpoint.save(), 3 + 3 + 2)
+        root.add_child(vote)
+        assert_equal(checkpoint.save(), 3 + 3 + 2)
+        checkpoint.close()
+
+    def test_delta_stream(self):
+        root = build_tree()
+        blackboard = root._blackboard
+        # a checkpoint shares the stream of the blackboard
+        stream = DeltaStream(blackboard)
+        subscription = stream.subscribe()
+        checkpoint = Checkpoint(self.filename, root)
+        checkpoint.save()
+        root.tick()
+        checkpoint.save()
+        assert len(subscription) > 0
+        checkpoint.close()
+        assert blackboard._deltas is stream
+        assert_equal(stream._subscriptions, [subscription])
+        stream.close()
+
+        # or creates its own, closed with the checkpoint
+        checkpoint = Checkpoint(self.filename, root)
+        checkpoint.save()
+        assert blackboard._deltas is not None
+        checkpoint.close()
+        assert blackboard._deltas is None
@@ -0,0 +1,129 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import io
+
+import numpy
+
+from nose.tools import assert_equal
+from nose.tools import assert_raises
+
+from task_behavior_engine import codec
+from task_behavior_engine.tree import Blackboard
+from task_behavior_engine.tree import NodeData
+from task_behavior_engine.tree import NodeStatus
+from task_behavior_engine.tree import StatusTable
+from task_behavior_engine.tree import nodedata_class
+
+
+class TestCodec(object):
+
+    def test_small(self):
+        data, buffers = codec.dumps({'a': 1, 'b': b'bytes'})
+        assert_equal(buffers, [])
+        assert_equal(codec.loads(data, buffers), {'a': 1, 'b': b'bytes'})
+
+    def test_out_of_band(self):
+        array = numpy.arange(10000, dtype=numpy.float64).reshape(100, 100)
+        blob = b'x' * 10000
+        data, buffers = codec.dumps({'array': array, 'blob': blob,
+                                     'mutable': bytearray(blob)})
+        assert_equal(len(buffers), 3)
+        # the large values are not in the pickled data
+        assert len(data) < 1000
+        # bytes are passed as-is
+        assert any(buf is blob for buf in buffers)
+        value = codec.loads(data, buffers)
+        assert_equal(value['blob'], blob)
+        assert_equal(value['mutable'], bytearray(blob))
+        assert_equal(value['array'].shape, (100, 100))
+        assert_equal(value['array'].dtype, numpy.float64)
+        assert_equal((value['array'] == array).all(), True)
+
+    def test_non_contiguous(self):
+        array = numpy.arange(10000, dtype=numpy.int32).reshape(100, 100).T
+        data, buffers = codec.dumps(array)
+        # numpy pickles a copy of the data, which is still passed out-of-band
+        assert all(type(buf) is bytes for buf in buffers)
+        decoded = codec.loads(data, buffers)
+        assert_equal(decoded.shape, (100, 100))
+        assert_equal((decoded == array).all(), True)
+
+    def test_file(self):
+        array = numpy.arange(5000, dtype=numpy.int16)
+        stream = io.BytesIO()
+        size = codec.dump({'array': array, 'name': 'test'}, stream)
+        codec.dump(NodeStatus(NodeStatus.FAIL, 'failed'), stream)
+        assert size < len(stream.getvalue())
+        stream.seek(0)
+        value = codec.load(stream)
+        assert_equal(value['name'], 'test')
+        assert_equal((value['array'] == array).all(), True)
+        status = codec.load(stream)
+        assert_equal(status.status, NodeStatus.FAIL)
+        assert_equal(status.text, 'failed')
+        assert_raises(EOFError, codec.load, stream)
+
+    def test_nodedata(self):
+        nd = NodeData()
+        nd.count = 3
+        nd['image'] = numpy.zeros((64, 64), dtype=numpy.uint8)
+        decoded = codec.loads(*codec.dumps(nd))
+        assert_equal(decoded.count, 3)
+        assert_equal(decoded.image.shape, (64, 64))
+        decoded.other = 1
+        assert_equal(sorted(decoded.keys()), ['count', 'image', 'other'])
+
+        Data = nodedata_class([('count', int, 0), ('name', str, '')])
+        nd = Data()
+        nd.count = 5
+        nd['extra'] = True
+        decoded = codec.loads(*codec.dumps(nd))
+        assert_equal(decoded.count, 5)
+        assert_equal(decoded.name, '')
+        assert_equal(decoded['extra'], True)
+        assert_equal(type(decoded).__name__, 'SchemaNodeData')
+
+    def test_status(self):
+        t = StatusTable()
+        t.set('a', NodeStatus.ACTIVE, 'running')
+        t.set('b', NodeStatus.FAIL)
+        t.set('c', NodeStatus.SUCCESS)
+        t.remove('c')
+        decoded = codec.loads(*codec.dumps(t))
+        assert_equal(sorted(scope for scope, status in decoded.items()),
+                     ['a', 'b'])
+        assert_equal(decoded.get('a').text, 'running')
+        assert_equal(decoded.with_status(NodeStatus.FAIL), ['b'])
+
+    def test_blackboard(self):
+        b = Blackboard()
+        b.save('mission', 'patrol')
+        b.save('scan', numpy.ones(10000), 'scope1')
+        b.save('foo', 'bar', 'scope1')
+        b.add_remapping('scope1', 'foo', 'scope2', 'new_foo')
+        b.set_parent_scope('scope2', 'scope1')
+        b.set_node_status('scope1', NodeStatus(NodeStatus.ACTIVE))
+
+        data, buffers = codec.dumps(b)
+        assert_equal(len(buffers), 1)
+        decoded = codec.loads(data, buffers)
+        assert_equal(decoded.get('mission'), 'patrol')
+        assert_equal(decoded.get('scan', 'scope1').sum(), 10000)
+        assert_equal(decoded.get('new_foo', 'scope2'), 'bar')
+        assert_equal(decoded.get('scan', 'scope2').sum(), 10000)
+        assert_equal(decoded.get_node_status('scope1'), NodeStatus.ACTIVE)
+        # remappings are still tracked after decoding
+        decoded.drop_scope('scope1')
+        assert_equal(decoded._node_memory['scope2']['remapping'], {})
@@ -0,0 +1,197 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import threading
+
+from nose.tools import assert_equal
+from nose.tools import assert_raises
+
+from task_behavior_engine.branch import Sequencer
+from task_behavior_engine.delta import Delta
+from task_behavior_engine.delta import DeltaStream
+from task_behavior_engine.delta import Empty
+from task_behavior_engine.delta import Subscription
+from task_behavior_engine.node import Success
+from task_behavior_engine.tree import Blackboard
+from task_behavior_engine.tree import Node
+from task_behavior_engine.tree import NodeStatus
+
+
+class Count(Node):
+
+    def __init__(self, name, *args, **kwargs):
+        super(Count, self).__init__(name,
+                                    configure_cb=self.configure,
+                                    run_cb=self.run,
+                                    *args, **kwargs)
+
+    def configure(self, nodedata):
+        nodedata.index = 0
+
+    def run(self, nodedata):
+        nodedata.index += 1
+        if nodedata.index < 2:
+            return NodeStatus(NodeStatus.ACTIVE)
+        return NodeStatus(NodeStatus.SUCCESS)
+
+
+class Typed(Node):
+
+    nodedata_schema = [('value', int, 0)]
+
+    def __init__(self, name, *args, **kwargs):
+        super(Typed, self).__init__(name, run_cb=self.run, *args, **kwargs)
+
+    def run(self, nodedata):
+        nodedata.value += 1
+        return NodeStatus(NodeStatus.SUCCESS)
+
+
+class TestDeltaStream(object):
+
+    def setUp(self):
+        self.blackboard = Blackboard()
+        self.root = Sequencer("root", blackboard=self.blackboard)
+        self.count = Count("count", blackboard=self.blackboard)
+        self.success = Success("success", blackboard=self.blackboard)
+        self.root.add_child(self.count)
+        self.root.add_child(self.success)
+        self.stream = DeltaStream(self.blackboard)
+
+    def tearDown(self):
+        self.stream.close()
+
+    def test_tick(self):
+        subscription = self.stream.subscribe()
+        self.blackboard.save('mission', 'patrol')
+        self.root.tick()
+        # one delta per root tick (not per node)
+        assert_equal(len(subscription), 1)
+        delta = subscription.get_nowait()
+        assert_equal(delta.tick, 1)
+        assert_equal(delta.writes, {(None, 'mission'): 'patrol',
+                                    (self.count._id, 'index'): 1})
+        assert_equal(sorted(delta.statuses.keys()),
+                     sorted([self.root._id, self.count._id]))
+        assert_equal(delta.statuses[self.count._id], NodeStatus.ACTIVE)
+
+        self.root.tick()
+        delta = subscription.get_nowait()
+        assert_equal(delta.tick, 2)
+        assert_equal(delta.writes, {(self.count._id, 'index'): 2})
+        assert_equal(delta.statuses[self.root._id], NodeStatus.SUCCESS)
+        assert_equal(delta.statuses[self.success._id], NodeStatus.SUCCESS)
+
+        # unchanged statuses are not sent again
+        self.blackboard.set_node_status(self.success._id,
+                                        NodeStatus(NodeStatus.SUCCESS))
+        assert_equal(len(self.stream.flush()), 0)
+        assert_equal(subscription.get_nowait().tick, 3)
+        assert_raises(Empty, subscription.get, True, 0.01)
+
+    def test_remapping(self):
+        other = Node("other", blackboard=self.blackboard)
+        self.blackboard.save('foo', 'bar', self.count._id)
+        self.blackboard.add_remapping(self.count._id, 'foo',
+                                      other._id, 'new_foo')
+        self.blackboard.get_memory(other._id)
+        delta = self.stream.flush()
+        assert_equal(delta.writes, {(self.count._id, 'foo'): 'bar',
+                                    (other._id, 'new_foo'): 'bar'})
+        # unchanged remapped values are not written again
+        self.blackboard.get_memory(other._id)
+        assert_equal(self.stream.flush().writes, {})
+
+    def test_schema(self):
+        subscription = self.stream.subscribe()
+        typed = Typed("typed", blackboard=self.blackboard)
+        typed.tick()
+        delta = subscription.get_nowait()
+        assert_equal(delta.writes, {(typed._id, 'value'): 1})
+        assert_equal(self.stream.flush().writes, {})
+
+    def test_versions(self):
+        self.stream.close()
+        self.stream = DeltaStream(self.blackboard, values=False)
+        self.blackboard.save('mission', 'patrol')
+        self.blackboard.save('mission', 'dock')
+        assert_equal(self.stream.flush().writes, {(None, 'mission'): 1})
+        self.blackboard.save('mission', 'patrol')
+        assert_equal(self.stream.flush().writes, {(None, 'mission'): 2})
+
+    def test_clear(self):
+        self.root.tick()
+        self.stream.flush()
+        self.blackboard.clear_node_status()
+        delta = self.stream.flush()
+        assert_equal(delta.statuses[self.count._id], NodeStatus.PENDING)
+        assert_equal(delta.statuses[self.root._id], NodeStatus.PENDING)
+
+    def test_close(self):
+        assert_raises(RuntimeError, DeltaStream, self.blackboard)
+        self.stream.close()
+        assert_equal(self.blackboard._deltas, None)
+        self.root.tick()
+        stream = DeltaStream(self.blackboard)
+        assert_equal(len(stream.flush()), 0)
+        stream.close()
+
+    def test_unsubscribe(self):
+        subscription = self.stream.subscribe()
+        self.stream.unsubscribe(subscription)
+        self.root.tick()
+        assert_equal(len(subscription), 0)
+
+
+class TestSubscription(object):
+
+    def test_policy(self):
+        assert_raises(ValueError, Subscription, 1, 'unknown')
+        assert_raises(ValueError, Subscription, 0)
+
+    def test_drop_oldest(self):
+        subscription = Subscription(2, Subscription.DROP_OLDEST)
+        for tick in range(1, 5):
+            subscription.put(Delta(tick))
+        assert_equal(subscription.dropped, 2)
+        assert_equal(subscription.get().tick, 3)
+        assert_equal(subscription.get().tick, 4)
+
+    def test_drop_newest(self):
+        subscription = Subscription(2, Subscription.DROP_NEWEST)
+        for tick in range(1, 5):
+            subscription.put(Delta(tick))
+        assert_equal(subscription.dropped, 2)
+        assert_equal(subscription.get().tick, 1)
+        assert_equal(subscription.get().tick, 2)
+
+    def test_merge(self):
+        subscription = Subscription(1, Subscription.MERGE)
+        first = Delta(1, {(None, 'a'): 1, (None, 'b'): 1})
+        subscription.put(first)
+        subscription.put(Delta(2, {(None, 'a'): 2}))
+        subscription.put(Delta(3, {}, {5: NodeStatus(NodeStatus.FAIL)}))
+        delta = subscription.get_nowait()
+        assert_equal(delta.tick, 3)
+        assert_equal(delta.writes, {(None, 'a'): 2, (None, 'b'): 1})
+        assert_equal(delta.statuses, {5: NodeStatus.FAIL})
+        # queued deltas (which may be shared) are not modified
+        assert_equal(first.writes, {(None, 'a'): 1, (None, 'b'): 1})
+
+    def test_wait(self):
+        subscription = Subscription()
+        timer = threading.Timer(0.01, subscription.put, [Delta(7)])
+        timer.start()
+        assert_equal(subscription.get(timeout=1).tick, 7)
+        timer.join()
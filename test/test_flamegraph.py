@@ -0,0 +1,106 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import json
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equal
+
+from task_behavior_engine import tracing
+from task_behavior_engine.branch import Sequencer
+from task_behavior_engine.flamegraph import FlameGraph
+from task_behavior_engine.node import Success
+from task_behavior_engine.tree import Blackboard
+from task_behavior_engine.tree import NodeStatus
+
+
+class TestFlameGraph(object):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        blackboard = Blackboard()
+        self.root = Sequencer("root", blackboard=blackboard)
+        self.patrol = Sequencer("patrol", blackboard=blackboard)
+        self.move_to = Success("move_to", blackboard=blackboard)
+        self.check = Success("check", blackboard=blackboard)
+        self.root.add_child(self.patrol)
+        self.root.add_child(self.check)
+        self.patrol.add_child(self.move_to)
+        self.graph = FlameGraph()
+
+    def tearDown(self):
+        tracing.remove_tracer(self.graph)
+        shutil.rmtree(self.directory)
+
+    def tick(self, count):
+        tracing.add_tracer(self.graph)
+        for i in range(count):
+            self.root.tick()
+        tracing.remove_tracer(self.graph)
+
+    def test_collapsed(self):
+        self.tick(2)
+        times = self.graph.get_self_times()
+        assert_equal(sorted(times),
+                     ['root', 'root;check', 'root;patrol',
+                      'root;patrol;move_to'])
+        assert all(t > 0 for t in times.values())
+
+        filename = os.path.join(self.directory, 'tree.folded')
+        self.graph.write_collapsed(filename)
+        with open(filename) as f:
+            lines = f.read().splitlines()
+        assert_equal([line.split(' ')[0] for line in lines], sorted(times))
+        assert_equal(lines, self.graph.collapsed())
+        assert all(int(line.split(' ')[1]) >= 0 for line in lines)
+
+        self.graph.clear()
+        assert_equal(self.graph.get_self_times(), {})
+        assert_equal(self.graph.chrome_trace()['traceEvents'], [])
+
+    def test_chrome_trace(self):
+        self.tick(2)
+        filename = os.path.join(self.directory, 'trace.json')
+        self.graph.write_chrome_trace(filename)
+        with open(filename) as f:
+            events = json.load(f)['traceEvents']
+        assert_equal(len(events), 8)
+        # children exit (and are recorded) before their parents
+        assert_equal([e['name'] for e in events[:4]],
+                     ['move_to', 'patrol', 'check', 'root'])
+        root = events[3]
+        assert_equal(root['ph'], 'X')
+        assert_equal(root['args'], {'path': 'root',
+                                    'status': NodeStatus.SUCCESS})
+        for event in events[:3]:
+            assert root['ts'] <= event['ts']
+            assert event['ts'] + event['dur'] <= root['ts'] + root['dur']
+        assert events[4]['ts'] >= root['ts'] + root['dur']
+
+    def test_timeline_disabled(self):
+        graph = FlameGraph(maxlen=0)
+        tracing.add_tracer(graph)
+        try:
+            self.root.tick()
+        finally:
+            tracing.remove_tracer(graph)
+        assert_equal(len(graph.get_self_times()), 4)
+        assert_equal(graph.chrome_trace()['traceEvents'], [])
+
+    def test_added_during_tick(self):
+        # exits of ticks entered before the tracer was added are ignored
+        self.graph.record(tracing.EXIT, self.root, tracing.TICK, None)
+        assert_equal(self.graph.get_self_times(), {})
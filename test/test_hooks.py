@@ -0,0 +1,96 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from nose.tools import assert_equal
+from nose.tools import assert_raises
+
+from task_behavior_engine.branch import Sequencer
+from task_behavior_engine.hooks import Hook
+from task_behavior_engine.hooks import add_hook
+from task_behavior_engine.hooks import get_hooks
+from task_behavior_engine.hooks import remove_hook
+from task_behavior_engine.node import Success
+from task_behavior_engine.tree import Blackboard
+from task_behavior_engine.tree import Node
+
+
+class Recorder(Hook):
+
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+
+    def enter(self, node, phase):
+        self.calls.append((self.name, 'enter', node._name, phase))
+        return node._name
+
+    def exit(self, node, phase, token, error):
+        assert_equal(token, node._name)
+        self.calls.append((self.name, 'exit', node._name, phase,
+                           type(error).__name__ if error else None))
+
+
+def raise_error(nodedata):
+    raise ValueError("failed")
+
+
+class TestHooks(object):
+
+    def setUp(self):
+        blackboard = Blackboard()
+        self.root = Sequencer("root", blackboard=blackboard)
+        self.success = Success("success", blackboard=blackboard)
+        self.root.add_child(self.success)
+
+    def test_order(self):
+        calls = []
+        first = Recorder('first', calls)
+        second = Recorder('second', calls)
+        add_hook(self.root, first)
+        add_hook(self.root, second)
+        add_hook(self.root, first)
+        assert_equal(get_hooks(self.success), (first, second))
+        self.success.tick()
+        assert_equal(calls[:4], [
+            ('first', 'enter', 'success', '_configure'),
+            ('second', 'enter', 'success', '_configure'),
+            ('second', 'exit', 'success', '_configure', None),
+            ('first', 'exit', 'success', '_configure', None)])
+        phases = [call[3] for call in calls if call[0] == 'first' and
+                  call[1] == 'enter']
+        assert_equal(phases, ['_configure', '_run', '_cleanup'])
+
+    def test_remove(self):
+        calls = []
+        hook = Recorder('hook', calls)
+        add_hook(self.root, hook)
+        remove_hook(self.root, hook)
+        assert_equal(get_hooks(self.root), ())
+        assert '_run' not in self.root.__dict__
+        self.root.tick()
+        assert_equal(calls, [])
+
+    def test_own_phase(self):
+        calls = []
+        hook = Recorder('hook', calls)
+        node = Node("node", run_cb=raise_error)
+        run = node._run
+        node._run = run
+        add_hook(node, hook)
+        assert_raises(ValueError, node.tick)
+        assert_equal(calls[-1], ('hook', 'exit', 'node', '_run',
+                                 'ValueError'))
+        remove_hook(node, hook)
+        # phases overridden on the node are restored
+        assert node.__dict__['_run'] is run
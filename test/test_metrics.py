@@ -0,0 +1,139 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import shutil
+import tempfile
+
+try:
+    from urllib2 import urlopen
+except ImportError:
+    from urllib.request import urlopen
+
+from nose.tools import assert_equal
+from nose.tools import assert_raises
+
+from task_behavior_engine.branch import Sequencer
+from task_behavior_engine.hooks import get_hooks
+from task_behavior_engine.metrics import BUCKETS
+from task_behavior_engine.metrics import Metrics
+from task_behavior_engine.metrics import OTHER
+from task_behavior_engine.node import Continue
+from task_behavior_engine.node import Fail
+from task_behavior_engine.node import Success
+from task_behavior_engine.tree import Blackboard
+
+
+class TestMetrics(object):
+
+    def setUp(self):
+        blackboard = Blackboard()
+        self.root = Sequencer("root", blackboard=blackboard)
+        self.success = Success("success", blackboard=blackboard)
+        self.fail = Fail("fail", blackboard=blackboard)
+        self.root.add_child(self.success)
+        self.root.add_child(self.fail)
+        self.metrics = Metrics()
+
+    def tearDown(self):
+        self.metrics.remove_tree(self.root)
+
+    def test_outcomes(self):
+        tree = self.metrics.add_tree(self.root)
+        self.root.tick()
+        self.root.tick()
+        assert_equal(tree.get_counts('root/success')['success'], 2)
+        assert_equal(tree.get_counts('root/fail')['fail'], 2)
+        counts = tree.get_counts('root')
+        assert_equal(counts['fail'], 2)
+        assert_equal(counts['success'], 0)
+        assert_equal(counts['canceled'], 0)
+        assert_raises(KeyError, tree.get_counts, OTHER)
+
+        text = self.metrics.format()
+        assert ('tbe_node_outcomes_total{tree="root",node="root/fail",'
+                'outcome="fail"} 2') in text
+        assert 'outcome="success"} 0' not in text
+        assert 'tbe_tick_duration_seconds_count{tree="root"} 2' in text
+        assert 'tbe_tick_duration_seconds_bucket{tree="root",le="+Inf"} 2' \
+            in text
+        buckets = [line for line in text.splitlines()
+                   if line.startswith('tbe_tick_duration_seconds_bucket')]
+        assert_equal(len(buckets), len(BUCKETS) + 1)
+        counts = [int(line.split(' ')[1]) for line in buckets]
+        assert_equal(counts, sorted(counts))
+
+    def test_cancel(self):
+        blackboard = Blackboard()
+        root = Sequencer("root", blackboard=blackboard)
+        child = Continue("continue", blackboard=blackboard)
+        root.add_child(child)
+        metrics = Metrics()
+        tree = metrics.add_tree(root, name='patrol')
+        root.tick()
+        root.cancel()
+        assert_equal(tree.get_counts('root/continue')['canceled'], 1)
+        assert_equal(tree.get_counts('root/continue')['cancel'], 1)
+        assert_equal(tree.get_counts('root/continue')['active'], 1)
+        assert ('tbe_node_cancels_total{tree="patrol",node="root/continue"} 1'
+                in metrics.format())
+        metrics.remove_tree(root)
+
+    def test_max_nodes(self):
+        tree = self.metrics.add_tree(self.root, max_nodes=2)
+        self.root.tick()
+        assert_equal(tree.get_counts('root')['fail'], 1)
+        assert_equal(tree.get_counts('root/success')['success'], 1)
+        assert_raises(KeyError, tree.get_counts, 'root/fail')
+        assert_equal(tree.get_counts(OTHER)['fail'], 1)
+
+        # nodes added later share the other counters
+        late = Success("late", blackboard=self.root._blackboard)
+        self.root.prepend_child(late)
+        assert tree is self.metrics.add_tree(self.root)
+        self.root.tick()
+        assert_equal(tree.get_counts(OTHER)['success'], 1)
+
+    def test_remove(self):
+        self.metrics.add_tree(self.root)
+        self.metrics.remove_tree(self.root)
+        assert_equal(get_hooks(self.success), ())
+        self.root.tick()
+        assert 'tree="root"' not in self.metrics.format()
+
+    def test_write(self):
+        self.metrics.add_tree(self.root)
+        self.root.tick()
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'tbe.prom')
+            self.metrics.write(filename)
+            with open(filename) as f:
+                assert_equal(f.read(), self.metrics.format())
+            assert_equal(os.listdir(directory), ['tbe.prom'])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_serve(self):
+        self.metrics.add_tree(self.root)
+        self.root.tick()
+        server = self.metrics.serve()
+        try:
+            response = urlopen('http://127.0.0.1:%d/metrics' %
+                               server.server_address[1])
+            body = response.read().decode('utf-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert_equal(body, self.metrics.format())
@@ -0,0 +1,158 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equal
+from nose.tools import assert_raises
+
+from task_behavior_engine.branch import Sequencer
+from task_behavior_engine.playback import CallbackPlayer
+from task_behavior_engine.playback import CallbackRecorder
+from task_behavior_engine.playback import Recording
+from task_behavior_engine.tree import Blackboard
+from task_behavior_engine.tree import Node
+from task_behavior_engine.tree import NodeStatus
+
+
+class Robot(object):
+
+    """ Stands in for the hardware the callbacks talk to. """
+
+    def __init__(self):
+        self.readings = 0
+        self.steps = 0
+        self.configured = 0
+        self.blackboard = None
+
+    def sense(self, nodedata):
+        self.readings += 1
+        nodedata.reading = self.readings * 10
+        self.blackboard.save('count', self.readings)
+        return NodeStatus(NodeStatus.SUCCESS, "read")
+
+    def move(self, nodedata):
+        self.steps += 1
+        nodedata.steps = self.steps
+        if self.steps % 3:
+            return NodeStatus(NodeStatus.ACTIVE, "moving")
+        return NodeStatus(NodeStatus.SUCCESS, "arrived")
+
+    def configure(self, nodedata):
+        self.configured += 1
+
+
+def make_tree(robot):
+    blackboard = Blackboard()
+    robot.blackboard = blackboard
+    root = Sequencer("root", blackboard=blackboard)
+    sense = Node("sense", blackboard=blackboard, run_cb=robot.sense)
+    move = Node("move", blackboard=blackboard, run_cb=robot.move,
+                configure_cb=robot.configure)
+    root.add_child(sense)
+    root.add_child(move)
+    blackboard.add_remapping(sense._id, 'reading', move._id, 'target')
+    return root, sense, move
+
+
+def record_tree(robot, ticks):
+    root, sense, move = make_tree(robot)
+    recorder = CallbackRecorder(root)
+    recorder.start()
+    for i in range(ticks):
+        root.tick()
+    return root, recorder.stop()
+
+
+class TestPlayback(object):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_record(self):
+        robot = Robot()
+        root, recording = record_tree(robot, 6)
+        assert_equal(len(recording), 6)
+        assert_equal(recording.results,
+                     [NodeStatus.ACTIVE, NodeStatus.ACTIVE, NodeStatus.SUCCESS,
+                      NodeStatus.ACTIVE, NodeStatus.ACTIVE,
+                      NodeStatus.SUCCESS])
+        sense = recording.steps['root/sense']
+        assert_equal(len(sense), 6)
+        assert_equal(sense[0], (NodeStatus.SUCCESS, "read",
+                                [('reading', 10)], [('count', 1)]))
+        move = recording.steps['root/move']
+        assert_equal(move[0][:2], (NodeStatus.ACTIVE, "moving"))
+        assert_equal(move[2][:2], (NodeStatus.SUCCESS, "arrived"))
+        # the remapped key is written before the callback, not by it
+        assert_equal(move[0][2], [('steps', 1)])
+
+        # the callbacks and the tick are restored
+        root.tick()
+        assert_equal(len(recording), 6)
+        assert 'tick' not in root.__dict__
+
+    def test_replay(self):
+        robot = Robot()
+        root, recording = record_tree(robot, 6)
+        filename = os.path.join(self.directory, 'mission.rec')
+        recording.save(filename)
+        recording = Recording.load(filename)
+        assert_equal(len(recording), 6)
+
+        # nothing is asked of the hardware during the replay
+        replay_robot = Robot()
+        replay_root, sense, move = make_tree(replay_robot)
+        player = CallbackPlayer(replay_root, recording)
+        assert_equal(player.run(), None)
+        assert_equal(replay_robot.readings, 0)
+        assert_equal(replay_robot.configured, 0)
+        assert_equal(player.remaining(), {'root/sense': 0, 'root/move': 0})
+
+        blackboard = replay_root._blackboard
+        assert_equal(blackboard.get('count'), 6)
+        assert_equal(blackboard.get('steps', move._id), 6)
+        assert_equal(blackboard.get('target', move._id), 60)
+
+        assert_raises(RuntimeError, replay_root.tick)
+        player.stop()
+        replay_root.tick()
+        assert_equal(replay_robot.readings, 1)
+
+    def test_divergence(self):
+        robot = Robot()
+        root, recording = record_tree(robot, 3)
+        recording.results[1] = NodeStatus.FAIL
+        replay_root, sense, move = make_tree(Robot())
+        player = CallbackPlayer(replay_root, recording)
+        assert_equal(player.run(), 1)
+
+        root, recording = record_tree(Robot(), 3)
+        replay_root, sense, move = make_tree(Robot())
+        player = CallbackPlayer(replay_root, recording)
+        assert_equal(player.run(2), None)
+        assert_equal(player.remaining(), {'root/sense': 1, 'root/move': 1})
+
+    def test_missing_leaf(self):
+        robot = Robot()
+        root, recording = record_tree(robot, 1)
+        replay_root, sense, move = make_tree(Robot())
+        replay_root.add_child(Node("extra", blackboard=replay_root._blackboard,
+                                   run_cb=robot.sense))
+        assert_raises(KeyError, CallbackPlayer(replay_root, recording).start)
@@ -0,0 +1,120 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import time
+
+from nose.tools import assert_equal
+
+from task_behavior_engine.branch import Sequencer
+from task_behavior_engine.hooks import get_hooks
+from task_behavior_engine.node import Success
+from task_behavior_engine.profiler import Histogram
+from task_behavior_engine.profiler import Profiler
+from task_behavior_engine.tree import Blackboard
+from task_behavior_engine.tree import Node
+from task_behavior_engine.tree import NodeStatus
+
+
+def sleep(nodedata):
+    time.sleep(0.01)
+    return NodeStatus(NodeStatus.SUCCESS)
+
+
+class TestHistogram(object):
+
+    def test_exact(self):
+        h = Histogram()
+        for value in range(1, 11):
+            h.record(value)
+        assert_equal(h.count, 10)
+        assert_equal(h.total, 55)
+        assert_equal(h.percentile(50), 5)
+        assert_equal(h.percentile(100), 10)
+        assert_equal(Histogram().percentile(50), 0)
+
+    def test_precision(self):
+        h = Histogram(precision=5)
+        for value in [1000, 123456, 10 ** 9]:
+            h.reset()
+            h.record(value)
+            h.record(value + 1)
+            p50 = h.percentile(50)
+            assert value <= p50 <= value * (1 + 1.0 / 16)
+        # buckets are continuous
+        for value in range(10000):
+            assert h._index(value) <= h._index(value + 1) <= \
+                h._index(value) + 1
+            assert h._value(h._index(value)) >= value
+
+    def test_max(self):
+        h = Histogram(max_value=1000)
+        h.record(10 ** 6)
+        h.record(-5)
+        assert_equal(h.max, 10 ** 6)
+        assert_equal(h.percentile(100), 10 ** 6)
+        assert_equal(h.percentile(1), 0)
+
+    def test_merge(self):
+        a = Histogram()
+        b = Histogram()
+        a.record(10)
+        b.record(20)
+        b.record(30)
+        a.merge(b)
+        assert_equal(a.count, 3)
+        assert_equal(a.percentile(100), 30)
+
+
+class TestProfiler(object):
+
+    def setUp(self):
+        blackboard = Blackboard()
+        self.root = Sequencer("root", blackboard=blackboard)
+        self.slow = Node("slow", run_cb=sleep, blackboard=blackboard)
+        self.fast = Success("fast", blackboard=blackboard)
+        self.root.add_child(self.slow)
+        self.root.add_child(self.fast)
+
+    def test_self_time(self):
+        profiler = Profiler(self.root)
+        profiler.start()
+        self.root.tick()
+        profiler.stop()
+        assert_equal(get_hooks(self.root), ())
+
+        rows = profiler.report(sort='total')
+        assert_equal((rows[0]['path'], rows[0]['phase']), ('root', '_run'))
+        assert rows[0]['total'] >= 0.01
+        # the sleep is child time of the root
+        assert rows[0]['self_total'] < 0.01
+        rows = profiler.report(1, sort='self_p99')
+        assert_equal((rows[0]['path'], rows[0]['phase']),
+                     ('root/slow', '_run'))
+        assert rows[0]['self_p99'] >= 0.01
+
+    def test_by_node(self):
+        profiler = Profiler(self.root)
+        profiler.start()
+        for i in range(3):
+            self.root.tick()
+        profiler.stop()
+        rows = profiler.report(count=10, sort='p50', by_phase=False)
+        assert_equal(len(rows), 3)
+        slow = [row for row in rows if row['path'] == 'root/slow'][0]
+        # configure, run and cleanup for each tick
+        assert_equal(slow['calls'], 9)
+        assert_equal(slow['phase'], None)
+        assert 'root/slow' in profiler.format_report()
+        profiler.reset()
+        assert_equal(profiler.report(), [])
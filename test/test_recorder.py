@@ -0,0 +1,111 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equal
+from nose.tools import assert_raises
+
+from task_behavior_engine import tracing
+from task_behavior_engine.branch import Sequencer
+from task_behavior_engine.node import Success
+from task_behavior_engine.recorder import PHASES
+from task_behavior_engine.recorder import TraceReader
+from task_behavior_engine.recorder import TraceRecorder
+from task_behavior_engine.tracing import TraceBuffer
+from task_behavior_engine.tree import Blackboard
+from task_behavior_engine.tree import NodeStatus
+
+
+class TestRecorder(object):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'trace.bin')
+        blackboard = Blackboard()
+        self.root = Sequencer("root", blackboard=blackboard)
+        self.success = Success("success", blackboard=blackboard)
+        self.root.add_child(self.success)
+        self.recorder = None
+
+    def tearDown(self):
+        if self.recorder is not None:
+            tracing.remove_tracer(self.recorder)
+            self.recorder.close()
+        shutil.rmtree(self.directory)
+
+    def record(self, ticks, **kwargs):
+        self.recorder = TraceRecorder(root=self.root, **kwargs)
+        tracing.add_tracer(self.recorder)
+        for i in range(ticks):
+            self.root.tick()
+        tracing.remove_tracer(self.recorder)
+        self.recorder.close()
+
+    def test_file(self):
+        # chunks of 5 events do not line up with the 16 events of a tick
+        self.record(3, filename=self.filename, capacity=10, chunk=5)
+        reader = TraceReader(self.filename)
+        assert_equal(len(reader), 48)
+        assert_equal(reader.names, {self.root._id: 'root',
+                                    self.success._id: 'root/success'})
+
+        records = reader.tick(2)
+        assert_equal(len(records), 16)
+        first = records[0]
+        assert_equal(int(first['node']), self.root._id)
+        assert_equal(int(first['kind']), tracing.ENTER)
+        assert_equal(PHASES[first['phase']], tracing.TICK)
+        assert_equal(int(first['status']), NodeStatus.PENDING)
+        last = records[-1]
+        assert_equal(int(last['kind']), tracing.EXIT)
+        assert_equal(int(last['status']), NodeStatus.SUCCESS)
+        times = list(reader.records['time'])
+        assert_equal(times, sorted(times))
+        assert_equal(sorted(set(reader.records['tick'])), [1, 2, 3])
+
+    def test_snapshot(self):
+        self.record(3, capacity=20, chunk=5)
+        reader = TraceReader.from_snapshot(self.recorder.snapshot(),
+                                           self.recorder.get_names())
+        # only the latest 20 events are kept
+        assert_equal(len(reader), 20)
+        assert_equal(list(reader.records['tick']), [2] * 4 + [3] * 16)
+        assert_equal(reader.tick(3)['node'][0], self.root._id)
+
+        recorder = TraceRecorder()
+        assert_equal(len(TraceReader.from_snapshot(recorder.snapshot())), 0)
+
+    def test_replay(self):
+        self.record(1, filename=self.filename)
+        reader = TraceReader(self.filename)
+        buffer = TraceBuffer()
+        assert_equal(reader.replay(buffer), 16)
+        events = [(e.kind, e.name, e.phase, e.status) for e in buffer.events]
+        assert_equal(events[:2], [
+            (tracing.ENTER, 'root', tracing.TICK, NodeStatus.PENDING),
+            (tracing.ENTER, 'root', tracing.CONFIGURE, NodeStatus.PENDING)])
+        assert_equal(events[-1],
+                     (tracing.EXIT, 'root', tracing.TICK, NodeStatus.SUCCESS))
+
+        buffer.clear()
+        assert_equal(reader.replay(buffer, 4, 6), 2)
+        assert_equal(buffer.events[0].name, 'root/success')
+
+    def test_invalid(self):
+        with open(self.filename, 'wb') as f:
+            f.write(b'not a trace file')
+        assert_raises(ValueError, TraceReader, self.filename)
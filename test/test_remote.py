@@ -0,0 +1,127 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import shutil
+import socket
+import stat
+import tempfile
+import threading
+
+import numpy
+
+from nose.tools import assert_equal
+from nose.tools import assert_raises
+
+from task_behavior_engine.remote import BlackboardClient
+from task_behavior_engine.remote import BlackboardServer
+from task_behavior_engine.tree import Blackboard
+
+
+class TestRemoteBlackboard(object):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "blackboard.sock")
+        self.blackboard = Blackboard()
+        self.server = BlackboardServer(self.blackboard, self.path)
+        self.server.start()
+        self.client = BlackboardClient(self.path, batch_size=4)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+        shutil.rmtree(self.directory)
+
+    def test_save(self):
+        self.client.save('mission', 'patrol')
+        self.client.save('foo', 'bar', 'scope1')
+        # writes wait for a flush
+        assert_raises(KeyError, self.blackboard.get, 'mission')
+        assert_equal(self.client.flush(), 2)
+        assert_equal(self.blackboard.get('mission'), 'patrol')
+        assert_equal(self.blackboard.get('foo', 'scope1'), 'bar')
+        assert_equal(self.client.flush(), 0)
+
+    def test_permissions(self):
+        # only the owner may connect, as clients can run code in the server
+        mode = stat.S_IMODE(os.stat(self.path).st_mode)
+        assert_equal(mode, 0o600)
+
+    def test_coalesce(self):
+        for i in range(3):
+            self.client.save('range', i, 'lidar')
+        assert_equal(self.client.flush(), 1)
+        assert_equal(self.blackboard.get('range', 'lidar'), 2)
+        # a full batch is sent right away
+        for i in range(4):
+            self.client.save('key' + str(i), i, 'lidar')
+        assert_equal(self.blackboard.get('key3', 'lidar'), 3)
+
+    def test_flush_error(self):
+        client = BlackboardClient(os.path.join(self.directory, "missing.sock"))
+        client.save('mission', 'patrol')
+        client.save('foo', 'bar', 'scope1')
+        assert_raises(socket.error, client.flush)
+        # writes that were not sent wait for the next flush, unless their
+        # key was written again
+        client.save('mission', 'dock')
+        client._path = self.path
+        assert_equal(client.flush(), 2)
+        assert_equal(self.blackboard.get('mission'), 'dock')
+        assert_equal(self.blackboard.get('foo', 'scope1'), 'bar')
+        client.close()
+
+    def test_get(self):
+        self.blackboard.save('mission', 'patrol')
+        self.client.save('foo', 'bar', 'scope1')
+        # reads see waiting writes
+        assert_equal(self.client.get('foo', 'scope1'), 'bar')
+        assert_equal(self.client.get('mission'), 'patrol')
+        assert_raises(KeyError, self.client.get, 'missing')
+        assert_equal(self.client.get_many([('mission', None),
+                                           ('foo', 'scope1')]),
+                     ['patrol', 'bar'])
+
+    def test_get_memory(self):
+        self.blackboard.save('foo', 'bar', 'scope1')
+        self.blackboard.add_remapping('scope1', 'foo', 'scope2', 'new_foo')
+        memory = self.client.get_memory('scope2')
+        assert_equal(memory.new_foo, 'bar')
+
+    def test_array(self):
+        image = numpy.arange(100000, dtype=numpy.float32)
+        self.client.save('image', image, 'camera')
+        self.client.flush()
+        assert_equal((self.blackboard.get('image', 'camera') == image).all(),
+                     True)
+        assert_equal((self.client.get('image', 'camera') == image).all(),
+                     True)
+
+    def test_threads(self):
+        def write(name):
+            for i in range(50):
+                self.client.save(name, i, 'threads')
+                self.client.get(name, 'threads')
+
+        threads = [threading.Thread(target=write, args=('key' + str(i),))
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.client.flush()
+        for i in range(4):
+            assert_equal(self.blackboard.get('key' + str(i), 'threads'), 49)
+        assert len(self.client._pool) <= 4
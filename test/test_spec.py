@@ -0,0 +1,165 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import json
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equal
+from nose.tools import assert_raises
+
+from task_behavior_engine import spec
+from task_behavior_engine.branch import Sequencer
+from task_behavior_engine.decorator import UntilCount
+from task_behavior_engine.node import Fail
+from task_behavior_engine.tree import Node
+from task_behavior_engine.tree import NodeStatus
+
+
+def sense(nodedata):
+    nodedata.reading = nodedata.rate * 2
+    return NodeStatus(NodeStatus.SUCCESS)
+
+
+spec.register_callback('sense', sense)
+
+SPEC = {"root": {"type": "Sequencer", "name": "root",
+                 "children": [
+                     {"type": "Node", "name": "sense",
+                      "params": {"run_cb": "sense"},
+                      "data": {"rate": 10}},
+                     {"type": "UntilCount", "name": "retry",
+                      "params": {"max_count": 3},
+                      "children": [{"type": "node.Fail",
+                                    "name": "attempt"}]}]},
+        "remappings": [{"from": "root/sense", "from_key": "reading",
+                        "to": "root/retry/attempt", "to_key": "target"}],
+        "blackboard": {"mission": "patrol"}}
+
+
+def with_root(root):
+    return dict(SPEC, root=root, remappings=[])
+
+
+class TestSpec(object):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def check_tree(self, root):
+        assert isinstance(root, Sequencer)
+        sense_node, retry = root.get_children()
+        assert_equal(type(sense_node), Node)
+        assert isinstance(retry, UntilCount)
+        assert_equal(retry._max_count, 3)
+        attempt = retry.get_children()[0]
+        assert isinstance(attempt, Fail)
+
+        blackboard = root._blackboard
+        assert_equal(blackboard.get('mission'), 'patrol')
+        assert_equal(blackboard.get('rate', sense_node._id), 10)
+        result = root.tick()
+        assert_equal(result.status, NodeStatus.ACTIVE)
+        assert_equal(blackboard.get('target', attempt._id), 20)
+
+    def test_load(self):
+        self.check_tree(spec.loads(json.dumps(SPEC)))
+        filename = os.path.join(self.directory, 'tree.json')
+        with open(filename, 'w') as f:
+            json.dump(SPEC, f)
+        self.check_tree(spec.load(filename))
+
+    def test_cache(self):
+        cache = os.path.join(self.directory, 'cache')
+        text = json.dumps(SPEC)
+        self.check_tree(spec.loads(text, cache_dir=cache))
+        plans = os.listdir(cache)
+        assert_equal(len(plans), 1)
+
+        # the cached plan is used instead of the spec
+        filename = os.path.join(cache, plans[0])
+        with open(filename, 'rb') as f:
+            plan = spec.pickle.load(f)
+        plan['blackboard'] = {'mission': 'cached'}
+        with open(filename, 'wb') as f:
+            spec.pickle.dump(plan, f)
+        root = spec.loads(text, cache_dir=cache)
+        assert_equal(root._blackboard.get('mission'), 'cached')
+
+        # a different spec gets its own plan
+        spec.loads(json.dumps(with_root(SPEC['root'])), cache_dir=cache)
+        assert_equal(len(os.listdir(cache)), 2)
+
+        # an unreadable plan is replaced
+        with open(filename, 'wb') as f:
+            f.write(b'garbage')
+        self.check_tree(spec.loads(text, cache_dir=cache))
+
+    def test_register_type(self):
+        class Custom(Node):
+            pass
+        spec.register_type('Custom', Custom)
+        root = spec.loads(json.dumps(with_root(
+            {"type": "Custom", "name": "custom"})))
+        assert isinstance(root, Custom)
+        assert_raises(TypeError, spec.register_type, 'Bad', object)
+
+    def test_invalid(self):
+        invalid = [
+            {"type": "Missing", "name": "root"},
+            {"type": "Sequencer"},
+            {"type": "Sequencer", "name": "root", "extra": 1},
+            {"type": "Node", "name": "root", "params": {"run_cb": "missing"}},
+            {"type": "Node", "name": "root", "params": {"blackboard": 1}},
+            {"type": "Node", "name": "root",
+             "children": [{"type": "Node", "name": "child"}]},
+            {"type": "Negate", "name": "root",
+             "children": [{"type": "Node", "name": "a"},
+                          {"type": "Node", "name": "b"}]},
+            {"type": "Sequencer", "name": "root",
+             "children": [{"type": "Node", "name": "a"},
+                          {"type": "Node", "name": "a"}]},
+        ]
+        for root in invalid:
+            assert_raises(ValueError, spec.compile_spec, with_root(root))
+        assert_raises(ValueError, spec.compile_spec,
+                      dict(SPEC, remappings=[{"from": "root/missing",
+                                              "from_key": "a",
+                                              "to": "root/sense",
+                                              "to_key": "b"}]))
+        assert_raises(ValueError, spec.compile_spec, {})
+        # Fail is in both node and decorator, so it must be qualified
+        assert_raises(ValueError, spec.compile_spec,
+                      with_root({"type": "Fail", "name": "root"}))
+
+    def test_params(self):
+        # params are checked against the constructor
+        for params in ({}, {"maxcount": 3}, {"max_count": 3, "other": 1}):
+            root = {"type": "UntilCount", "name": "retry", "params": params}
+            assert_raises(ValueError, spec.compile_spec, with_root(root))
+        # invalid plans are not cached
+        text = json.dumps(with_root({"type": "UntilCount", "name": "retry",
+                                     "params": {"maxcount": 3}}))
+        assert_raises(ValueError, spec.loads, text, cache_dir=self.directory)
+        assert_equal(os.listdir(self.directory), [])
+        # arguments of the base constructors are accepted
+        root = spec.build(spec.compile_spec(with_root(
+            {"type": "UntilCount", "name": "retry",
+             "params": {"max_count": 3, "cancel_cb": "sense"}})))
+        assert_equal(root._max_count, 3)
+        assert_equal(root._cancel_cb, sense)
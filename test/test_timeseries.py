@@ -0,0 +1,120 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import copy
+import pickle
+
+import numpy
+
+from nose.tools import assert_equal
+from nose.tools import assert_raises
+
+from task_behavior_engine import codec
+from task_behavior_engine.timeseries import TimeSeries
+from task_behavior_engine.tree import Blackboard
+
+
+class TestTimeSeries(object):
+
+    def test_append(self):
+        series = TimeSeries(4)
+        assert_raises(IndexError, series.latest)
+        for i in range(3):
+            series.append(i * 10, i)
+        assert_equal(len(series), 3)
+        times, values = series.last()
+        assert_equal(list(times), [0, 1, 2])
+        assert_equal(list(values), [0, 10, 20])
+        assert_equal(series.latest(), (2, 20))
+        assert_raises(ValueError, series.append, 0, 1)
+        assert_raises(ValueError, TimeSeries, 0)
+
+    def test_wrap(self):
+        series = TimeSeries(4)
+        for i in range(10):
+            series.append(i, i)
+            times, values = series.last()
+            assert_equal(list(values), list(range(max(0, i - 3), i + 1)))
+        assert_equal(len(series), 4)
+        assert_equal(list(series.last(2)[1]), [8, 9])
+        assert_equal(list(series.last(10)[1]), [6, 7, 8, 9])
+
+    def test_views(self):
+        series = TimeSeries(8, shape=(3,), dtype=numpy.int32)
+        for i in range(20):
+            series.append([i, i, i], i)
+        times, values = series.last(5)
+        assert_equal(values.shape, (5, 3))
+        # views share the ring buffer
+        assert values.base is series._values
+        assert_raises(ValueError, values.__setitem__, 0, 0)
+
+    def test_window(self):
+        series = TimeSeries(100)
+        for i in range(50):
+            series.append(i, i)
+        times, values = series.window(4.5, now=49)
+        assert_equal(list(values), [45, 46, 47, 48, 49])
+        times, values = series.window(100, now=49)
+        assert_equal(len(values), 50)
+
+    def test_ttl(self):
+        series = TimeSeries(100, ttl=10.5)
+        for i in range(30):
+            series.append(i, i)
+        assert_equal(series.expire(now=30), 20)
+        assert_equal(len(series), 10)
+        assert_equal(series.window(100, now=30)[1][0], 20)
+        series.clear()
+        assert_equal(len(series), 0)
+
+    def test_pickle(self):
+        series = TimeSeries(4, ttl=1e12)
+        for i in range(6):
+            series.append(i, i)
+        for copied in [pickle.loads(pickle.dumps(series, 2)),
+                       codec.loads(*codec.dumps(series)),
+                       copy.copy(series)]:
+            assert_equal(copied.ttl, 1e12)
+            assert_equal(list(copied.last()[1]), [2, 3, 4, 5])
+            copied.append(6, 6)
+            assert_equal(list(copied.last()[1]), [3, 4, 5, 6])
+        # copies do not share the buffers
+        assert_equal(list(series.last()[1]), [2, 3, 4, 5])
+
+
+class TestBlackboardTimeSeries(object):
+
+    def test_append(self):
+        b = Blackboard()
+        series = b.append('range', 1.5, 'lidar', timestamp=1.0, capacity=8)
+        b.append('range', 2.5, 'lidar', timestamp=2.0)
+        assert b.get('range', 'lidar') is series
+        assert_equal(series.capacity, 8)
+        assert_equal(list(series.last()[1]), [1.5, 2.5])
+
+        b.save('mission', 'patrol')
+        assert_raises(TypeError, b.append, 'mission', 1.0)
+
+    def test_remapping(self):
+        b = Blackboard()
+        b.append('pose', [0.0, 0.0], 'localizer', timestamp=0.0)
+        b.add_remapping('localizer', 'pose', 'planner', 'pose_history')
+        shared = b.get('pose_history', 'planner')
+        assert shared is b.get('pose', 'localizer')
+        b.append('pose', [1.0, 2.0], 'localizer', timestamp=1.0)
+        assert_equal(shared.last()[1].shape, (2, 2))
+        # appending through the remapped key updates the source history
+        b.append('pose_history', [2.0, 4.0], 'planner', timestamp=2.0)
+        assert_equal(len(b.get('pose', 'localizer')), 3)
@@ -0,0 +1,111 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import logging
+
+from nose.tools import assert_equal
+
+from task_behavior_engine import tracing
+from task_behavior_engine.branch import Sequencer
+from task_behavior_engine.node import Continue
+from task_behavior_engine.node import Success
+from task_behavior_engine.tracing import LoggingTracer
+from task_behavior_engine.tracing import TraceBuffer
+from task_behavior_engine.tree import Blackboard
+from task_behavior_engine.tree import NodeStatus
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TestTracing(object):
+
+    def setUp(self):
+        blackboard = Blackboard()
+        self.root = Sequencer("root", blackboard=blackboard)
+        self.success = Success("success", blackboard=blackboard)
+        self.root.add_child(self.success)
+        self.buffer = TraceBuffer()
+
+    def tearDown(self):
+        tracing.remove_tracer(self.buffer)
+
+    def test_disabled(self):
+        assert not tracing.is_enabled()
+        self.root.tick()
+        assert_equal(len(self.buffer.events), 0)
+
+    def test_events(self):
+        tracing.add_tracer(self.buffer)
+        assert tracing.is_enabled()
+        self.success.tick()
+        events = [(e.kind, e.name, e.phase, e.status)
+                  for e in self.buffer.events]
+        assert_equal(events, [
+            (tracing.ENTER, 'success', tracing.TICK, NodeStatus.PENDING),
+            (tracing.ENTER, 'success', tracing.CONFIGURE, NodeStatus.PENDING),
+            (tracing.EXIT, 'success', tracing.CONFIGURE, NodeStatus.ACTIVE),
+            (tracing.ENTER, 'success', tracing.RUN, NodeStatus.ACTIVE),
+            (tracing.EXIT, 'success', tracing.RUN, NodeStatus.SUCCESS),
+            (tracing.ENTER, 'success', tracing.CLEANUP, NodeStatus.SUCCESS),
+            (tracing.EXIT, 'success', tracing.CLEANUP, NodeStatus.PENDING),
+            (tracing.EXIT, 'success', tracing.TICK, NodeStatus.SUCCESS)])
+        assert_equal(self.buffer.events[0].node_id, self.success._id)
+        times = [e.time for e in self.buffer.events]
+        assert_equal(times, sorted(times))
+
+        tracing.remove_tracer(self.buffer)
+        self.buffer.clear()
+        self.success.tick()
+        assert_equal(len(self.buffer.events), 0)
+
+    def test_marks(self):
+        blackboard = Blackboard()
+        root = Sequencer("root", blackboard=blackboard)
+        child = Continue("continue", blackboard=blackboard)
+        root.add_child(child)
+        tracing.add_tracer(self.buffer)
+        root.tick()
+        child.force(NodeStatus.SUCCESS)
+        root.tick()
+        marks = [(e.name, e.phase, e.status) for e in self.buffer.events
+                 if e.kind == tracing.MARK]
+        assert_equal(marks, [('continue', tracing.OPEN, None),
+                             ('continue', tracing.FORCE, NodeStatus.SUCCESS),
+                             ('continue', tracing.CLOSE, None)])
+
+    def test_logging(self):
+        log = logging.getLogger('test_tracing')
+        log.setLevel(logging.DEBUG)
+        handler = ListHandler()
+        log.addHandler(handler)
+        tracer = LoggingTracer(log)
+        tracing.add_tracer(tracer)
+        try:
+            self.success.tick()
+            log.setLevel(logging.INFO)
+            self.success.tick()
+        finally:
+            tracing.remove_tracer(tracer)
+            log.removeHandler(handler)
+        assert_equal(len(handler.messages), 8)
+        assert_equal(handler.messages[3],
+                     'success.run() entering... ACTIVE Configured success')
@@ -12,6 +12,9 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import gc
+import sys
+
 from nose.tools import assert_equal
 from nose.tools import assert_not_equal
 from nose.tools import assert_raises
@@ -22,6 +25,8 @@ from task_behavior_engine.tree import Decorator
 from task_behavior_engine.tree import Node
 from task_behavior_engine.tree import NodeData
 from task_behavior_engine.tree import NodeStatus
+from task_behavior_engine.tree import StatusTable
+from task_behavior_engine.tree import nodedata_class
 
 
 class TestNodeData(object):
@@ -67,6 +72,116 @@ class TestNodeData(object):
         assert_equal(("test" in nd), True)
         assert_not_equal(("foo" in nd), True)
 
+    def test_private(self):
+        nd = NodeData()
+        # private attributes are not keys
+        nd._anything = 1
+        assert_equal(nd._anything, 1)
+        assert_equal(nd.keys(), [])
+        assert_raises(AttributeError, getattr, nd, '_other')
+
+
+class TestNodeDataSchema(object):
+
+    def setUp(self):
+        self.Data = nodedata_class([('count', int, 0),
+                                    ('names', list, []),
+                                    ('target', str, None)])
+
+    def test_init(self):
+        nd = self.Data()
+        assert_equal(nd.count, 0)
+        assert_equal(nd.names, [])
+        assert_equal(nd.target, None)
+        # undeclared keys have no dictionaries until one is written
+        assert_equal(nd._data, None)
+        assert_equal(nd._locks, None)
+        assert_equal(nd.keys(), ['count', 'names', 'target'])
+        # mutable defaults are not shared
+        nd.names.append('a')
+        assert_equal(self.Data().names, [])
+        # declared keys are not kept in the instance dictionary
+        assert_equal(nd.__dict__, {})
+        assert_raises(TypeError, nodedata_class, [('count', int, 'zero')])
+        assert_raises(ValueError, nodedata_class, [('_count', int, 0)])
+
+    def test_assignment(self):
+        nd = self.Data()
+        nd.count = 5
+        assert_equal(nd['count'], 5)
+        nd['count'] += 1
+        assert_equal(nd.count, 6)
+        nd.set_data('target', 'dock')
+        assert_equal(nd.target, 'dock')
+        # undeclared keys are kept with the other data
+        nd['extra'] = 'value'
+        assert_equal(nd.extra, 'value')
+        assert_equal(nd['extra'], 'value')
+        nd.other = 1
+        assert_equal(nd['other'], 1)
+        assert_equal(nd.get_data('other'), 1)
+        assert_equal(nd._data, {'extra': 'value', 'other': 1})
+        # private attributes are not keys
+        nd._private = 2
+        assert_equal(nd._private, 2)
+        assert_equal('_private' in nd, False)
+        assert_raises(AttributeError, getattr, nd, '_missing')
+        assert_raises(KeyError, getattr, self.Data(), 'missing')
+
+    def test_footprint(self):
+        def size(nd):
+            return sys.getsizeof(nd) + sys.getsizeof(nd._data) + \
+                sys.getsizeof(nd._locks)
+
+        assert size(self.Data()) < size(NodeData())
+
+    def test_keys(self):
+        nd = self.Data()
+        assert_equal(nd.keys(), ['count', 'names', 'target'])
+        nd['extra'] = 1
+        assert_equal(nd.keys(), ['count', 'names', 'target', 'extra'])
+        assert_equal('count' in nd, True)
+        assert_equal('extra' in nd, True)
+        assert_equal('other' in nd, False)
+
+    def test_get_data(self):
+        nd = self.Data()
+        # declared defaults take precedence over the call default
+        assert_equal(nd.get_data('count', 10), 0)
+        assert_equal(nd.get_data('other', 10), 10)
+
+    def test_node(self):
+        class Counter(Node):
+            nodedata_schema = [('count', int, 0)]
+
+            def __init__(self, name, *args, **kwargs):
+                super(Counter, self).__init__(name, run_cb=self.run,
+                                              *args, **kwargs)
+
+            def run(self, nodedata):
+                nodedata.count += 1
+                return NodeStatus(NodeStatus.SUCCESS)
+
+        b = Blackboard()
+        n = Counter('counter', blackboard=b)
+        nd = n.get_nodedata()
+        assert_equal(type(nd), Counter._nodedata_class())
+        assert_equal(type(nd).__name__, 'CounterData')
+        n.tick()
+        n.tick()
+        assert_equal(b.get('count', n._id), 2)
+        # remapping into declared and undeclared keys
+        b.save('total', 7, 'source')
+        b.add_remapping('source', 'total', n._id, 'count')
+        b.add_remapping('source', 'total', n._id, 'total')
+        nd = b.get_memory(n._id)
+        assert_equal(nd.count, 7)
+        assert_equal(nd['total'], 7)
+        # moving to another blackboard keeps the schema
+        other = Blackboard()
+        n.set_blackboard(other)
+        assert_equal(other.get('count', n._id), 0)
+
 
 class TestNodeStatus(object):
 
@@ -113,6 +228,91 @@ class TestNodeStatus(object):
         assert_not_equal(NodeStatus(NodeStatus.FAIL), NodeStatus.SUCCESS)
 
 
+class TestStatusTable(object):
+
+    def test_index(self):
+        t = StatusTable(capacity=2)
+        assert_equal(t.index('a'), 0)
+        assert_equal(t.index('b'), 1)
+        assert_equal(t.index('a'), 0)
+        # grows past the initial capacity
+        assert_equal(t.index('c'), 2)
+        assert_equal(t.scopes(), ['a', 'b', 'c'])
+        assert_equal(len(t), 3)
+        # assigning an index does not set a status
+        assert_equal(t.items(), [])
+
+    def test_set(self):
+        t = StatusTable()
+        t.set('a', NodeStatus.ACTIVE, 'running')
+        status = t.get('a')
+        assert_equal(status.status, NodeStatus.ACTIVE)
+        assert_equal(status.text, 'running')
+        assert_equal(t.get('b'), NodeStatus.PENDING)
+        assert_equal(sorted(scope for scope, status in t.items()), ['a', 'b'])
+
+    def test_clear(self):
+        t = StatusTable()
+        t.set('a', NodeStatus.FAIL, 'failed')
+        t.clear()
+        assert_equal(t.items(), [])
+        assert_equal(t.get('a'), NodeStatus.PENDING)
+        assert_equal(t.get('a').text, '')
+
+    def test_remove(self):
+        t = StatusTable()
+        t.set('a', NodeStatus.FAIL)
+        t.set('b', NodeStatus.ACTIVE)
+        t.remove('a')
+        assert_equal(len(t), 1)
+        assert_equal(t.scopes(), [None, 'b'])
+        assert_equal(t.items()[0][0], 'b')
+        # removed indexes are reused
+        assert_equal(t.index('c'), 0)
+        assert_equal(t.get('c'), NodeStatus.PENDING)
+        t.remove('unknown')
+
+    def test_with_status(self):
+        t = StatusTable()
+        t.set('a', NodeStatus.ACTIVE)
+        t.set('b', NodeStatus.ACTIVE)
+        t.set('c', NodeStatus.FAIL)
+        assert_equal(sorted(t.with_status(NodeStatus.ACTIVE)), ['a', 'b'])
+        assert_equal(t.count(NodeStatus.ACTIVE), 2)
+        assert_equal(t.count(NodeStatus.SUCCESS), 0)
+        assert_equal(t.with_status(NodeStatus.SUCCESS), [])
+        t.set('a', NodeStatus.SUCCESS)
+        t.set('a', NodeStatus.SUCCESS, 'again')
+        assert_equal(t.with_status(NodeStatus.ACTIVE), ['b'])
+        assert_equal(t.with_status(NodeStatus.SUCCESS), ['a'])
+        t.remove('c')
+        assert_equal(t.count(NodeStatus.FAIL), 0)
+        t.get('d')
+        assert_equal(t.with_status(NodeStatus.PENDING), ['d'])
+        t.clear()
+        assert_equal(t.count(NodeStatus.ACTIVE), 0)
+        t.set('b', NodeStatus.FAIL)
+        assert_equal(t.with_status(NodeStatus.FAIL), ['b'])
+        assert_equal(t.count(NodeStatus.SUCCESS), 0)
+
+    def test_as_array(self):
+        t = StatusTable(capacity=2)
+        t.set('a', NodeStatus.SUCCESS)
+        t.set('b', NodeStatus.FAIL)
+        statuses = t.as_array()
+        assert_equal(list(statuses), [NodeStatus.SUCCESS, NodeStatus.FAIL])
+        # the array is a view on the table
+        t.set('a', NodeStatus.ACTIVE)
+        assert_equal(list(statuses), [NodeStatus.ACTIVE, NodeStatus.FAIL])
+        # cleared entries read as PENDING
+        t.clear()
+        t.set('b', NodeStatus.CANCEL)
+        t.set('c', NodeStatus.ACTIVE)
+        statuses = t.as_array()
+        assert_equal(list(statuses), [NodeStatus.PENDING, NodeStatus.CANCEL,
+                                      NodeStatus.ACTIVE])
+
+
 class TestBlackboard(object):
 
     def test_init(self):
@@ -188,6 +388,151 @@ class TestBlackboard(object):
         assert_raises(RuntimeError,
                       b.add_remapping, 'scope1', 'ping', 'scope2', 'new_foo')
 
+    def test_drop_scope(self):
+        b = Blackboard()
+        b.save('foo', 'bar', 'scope1')
+        b.save('hello', 'world', 'scope2')
+        b.add_remapping('scope1', 'foo', 'scope2', 'new_foo')
+        b.add_remapping('scope2', 'hello', 'scope3', 'new_hello')
+        b.set_node_status('scope2', NodeStatus(NodeStatus.ACTIVE))
+        assert_equal(b.get('new_hello', 'scope3'), 'world')
+        b.drop_scope('scope2')
+        assert_equal('scope2' in b._node_memory, False)
+        assert_equal('scope2' in b.get_status(), False)
+        # remappings from the dropped scope are removed
+        assert_equal(b._node_memory['scope3']['remapping'], {})
+        assert_equal(b.get('new_hello', 'scope3'), 'world')
+        assert_equal('scope2' in b._node_memory, False)
+        assert_equal(b._remap_targets, {})
+        # dropping an unknown scope does nothing
+        b.drop_scope('unknown')
+
+    def test_drop_node(self):
+        b = Blackboard()
+        root = Behavior('root', blackboard=b)
+        child = Node('child', blackboard=b)
+        root.add_child(child)
+        b.save('foo', 'bar', child._id)
+        b.save('foo', 'bar', root._id)
+        root.remove_child(child)
+        b.drop_node(child)
+        assert_equal(child._id in b._node_memory, False)
+        assert_equal(root._id in b._node_memory, True)
+        b.drop_node(root)
+        assert_equal(b._node_memory, {})
+        assert_equal(len(b._node_status), 0)
+
+    def test_collect(self):
+        b = Blackboard()
+        n = Node('test', blackboard=b)
+        scope = n._id
+        b.save('foo', 'bar', scope)
+        b.set_node_status(scope, NodeStatus(NodeStatus.SUCCESS))
+        del n
+        gc.collect()
+        assert_equal(b.collect(), 1)
+        assert_equal(scope in b._node_memory, False)
+        assert_equal(scope in b.get_status(), False)
+        assert_equal(b.collect(), 0)
+        # dead nodes are also collected when new nodes register
+        n = Node('test', blackboard=b)
+        b.save('foo', 'bar', n._id)
+        del n
+        gc.collect()
+        Node('other', blackboard=b)
+        assert_equal(b._node_memory, {})
+
+    def test_parent_scope(self):
+        b = Blackboard()
+        b.save('mission', 'patrol')
+        b.save('speed', 1.0, 'tree')
+        b.save('speed', 0.5, 'subtree')
+        b.save('own', True, 'node')
+        b.set_parent_scope('tree')
+        b.set_parent_scope('subtree', 'tree')
+        b.set_parent_scope('node', 'subtree')
+        # keys are resolved up the scope chain
+        assert_equal(b.get('own', 'node'), True)
+        assert_equal(b.get('speed', 'node'), 0.5)
+        assert_equal(b.get('mission', 'node'), 'patrol')
+        nd = b.get_memory('node')
+        assert_equal(nd.speed, 0.5)
+        assert_equal(nd.get_data('mission', 'none'), 'patrol')
+        assert_equal(nd.get_data('missing', 'default'), 'default')
+        assert_raises(KeyError, b.get, 'unknown', 'node')
+        # updating a parent value is seen by children
+        b.save('speed', 0.25, 'subtree')
+        assert_equal(nd.speed, 0.25)
+        # adding a closer key invalidates the cached location
+        b.save('mission', 'dock', 'tree')
+        assert_equal(nd.mission, 'dock')
+        b.get_memory('subtree').mission = 'charge'
+        assert_equal(nd.mission, 'charge')
+        # local writes shadow parent keys
+        nd.speed = 2.0
+        assert_equal(b.get('speed', 'node'), 2.0)
+        assert_equal(b.get('speed', 'subtree'), 0.25)
+        # unlinked scopes only see their own keys
+        assert_raises(KeyError, b.get, 'mission', 'other')
+        # cycles are not allowed
+        assert_raises(RuntimeError, b.set_parent_scope, 'tree', 'node')
+        # dropping a scope links its children to its parent
+        b.drop_scope('subtree')
+        assert_equal(b._scope_parents['node'], 'tree')
+        assert_equal(b.get('mission', 'node'), 'dock')
+
+    def test_drop_parent_scope(self):
+        b = Blackboard()
+        b.save('speed', 1.0, 'parent')
+        b.set_parent_scope('child', 'parent')
+        assert_equal(b.get('speed', 'child'), 1.0)
+        # a parent without a parent of its own reaches the global memory
+        b.drop_scope('parent')
+        b.save('speed', 2.0)
+        assert_equal(b.get('speed', 'child'), 2.0)
+        assert_equal(b._scope_parents, {'child': None})
+        # nothing refers to the dropped memory anymore
+        assert_equal([owner for owner in b._key_location.values()
+                      if owner is not b._base_memory], [])
+
+    def test_parent_remapping(self):
+        b = Blackboard()
+        b.save('value', 'global')
+        b.save('source', 'remapped', 'other')
+        b.set_parent_scope('parent')
+        b.set_parent_scope('child', 'parent')
+        assert_equal(b.get('value', 'child'), 'global')
+        # children see the remappings of their parents
+        b.add_remapping('other', 'source', 'parent', 'value')
+        assert_equal(b.get('value', 'parent'), 'remapped')
+        assert_equal(b.get('value', 'child'), 'remapped')
+        b.save('source', 'updated', 'other')
+        assert_equal(b.get('value', 'child'), 'updated')
+
+    def test_link_scopes(self):
+        b = Blackboard()
+        root = Behavior('root', blackboard=b)
+        subtree = Behavior('subtree', blackboard=b)
+        leaf = Node('leaf', blackboard=b)
+        subtree.add_child(leaf)
+        root.add_child(subtree)
+        b.link_scopes(root)
+        b.save('target', 'kitchen', subtree._id)
+        b.save('mission', 'patrol')
+        assert_equal(leaf.get_nodedata().target, 'kitchen')
+        assert_equal(leaf.get_nodedata().mission, 'patrol')
+        assert_raises(KeyError, b.get, 'target', root._id)
+
+    def test_memory_usage(self):
+        b = Blackboard()
+        b.save('small', 1, 'scope1')
+        b.save('large', 'x' * 10000, 'scope2')
+        b.save('foo', 'bar')
+        usage = b.get_memory_usage()
+        assert_equal(sorted(usage.keys()), [None, 'scope1', 'scope2'])
+        assert usage['scope2'] > usage['scope1'] + 10000
+        assert usage[None] > 0
+
     def test_node_status(self):
         b = Blackboard()
         assert_equal(b.get_node_status("blah"), NodeStatus.PENDING)
@@ -203,6 +548,19 @@ class TestBlackboard(object):
         status = b.get_status()
         assert_equal(status, {})
 
+        b.set_node_status("scope2", NodeStatus(NodeStatus.FAIL, "failed"))
+        b.reset_node_status("scope2")
+        assert_equal(b.get_node_status("scope2"), NodeStatus.PENDING)
+        index = b.get_node_index("scope2")
+        b.set_node_status("scope2", NodeStatus(NodeStatus.SUCCESS))
+        assert_equal(b.get_status_array()[index], NodeStatus.SUCCESS)
+
+        b.set_node_status("scope3", NodeStatus(NodeStatus.SUCCESS))
+        assert_equal(sorted(b.nodes_with_status(NodeStatus.SUCCESS)),
+                     ["scope2", "scope3"])
+        assert_equal(b.count_status(NodeStatus.SUCCESS), 2)
+        assert_equal(b.count_status(NodeStatus.ACTIVE), 0)
+
 
 class TestNode(object):
 
@@ -427,6 +785,70 @@ class TestNode(object):
         assert_equal(nd.cancel_called, 1)
 
 
+class TestNodeRegistry(object):
+
+    def setUp(self):
+        self.root = Behavior('root')
+        self.counts = Behavior('finish_counts')
+        self.count1 = Node('count_1')
+        self.count2 = Node('count_2')
+        self.counts.add_child(self.count1)
+        self.root.add_child(self.counts)
+
+    def test_ids(self):
+        n1 = Node('node1')
+        n2 = Node('node2')
+        assert_equal(n2._id, n1._id + 1)
+        # uuids are generated on demand and kept
+        assert_equal(n1._uuid, None)
+        assert_equal(n1.get_uuid(), n1.get_uuid())
+        assert_not_equal(n1.get_uuid(), n2.get_uuid())
+
+    def test_find(self):
+        registry = self.count1.get_registry()
+        assert_equal(registry, self.root._registry)
+        assert_equal(len(registry), 3)
+        assert_equal(registry.find('root/finish_counts/count_1'), self.count1)
+        assert_equal(registry.get_node(self.counts._id), self.counts)
+        assert_equal(self.count1.get_path(), 'root/finish_counts/count_1')
+        assert_equal(sorted(registry.paths()),
+                     ['root', 'root/finish_counts',
+                      'root/finish_counts/count_1'])
+        assert_raises(KeyError, registry.find, 'root/count_1')
+
+    def test_update(self):
+        registry = self.root.get_registry()
+        self.counts.add_child(self.count2)
+        assert_equal('root/finish_counts/count_2' in registry, True)
+        assert_equal(self.count2.get_path(), 'root/finish_counts/count_2')
+        # removing a subtree removes all of its nodes
+        self.root.remove_child(self.counts)
+        assert_equal(len(registry), 1)
+        assert_equal('root/finish_counts/count_1' in registry, False)
+        # the removed subtree is now its own tree
+        assert_equal(self.count2.get_path(), 'finish_counts/count_2')
+        # decorators update the registry when their child changes
+        d = Decorator('repeat', self.counts)
+        self.root.add_child(d)
+        assert_equal(self.count2.get_path(), 'root/repeat/finish_counts/count_2')
+        other = Node('other')
+        d.set_child(other)
+        assert_equal(len(registry), 3)
+        assert_equal(registry.find('root/repeat/other'), other)
+
+    def test_attach_registered(self):
+        root = Behavior('root')
+        sub = Behavior('sub')
+        leaf = Node('leaf')
+        sub.add_child(leaf)
+        assert_equal(leaf.get_path(), 'sub/leaf')
+        # a subtree with its own registry gets the registry of its new tree
+        root.add_child(sub)
+        assert_equal(leaf.get_path(), 'root/sub/leaf')
+        assert leaf.get_registry() is root.get_registry()
+        assert_equal(root.get_registry().find('root/sub/leaf'), leaf)
+
+
 class TestDecorator(object):
 
     def test_init(self):
@@ -663,3 +1085,148 @@ class TestBehavior(object):
         assert_equal(n1.get_result().status, NodeStatus.PENDING)
         assert_equal(n2.get_result().status, NodeStatus.PENDING)
         assert_equal(b.get_result().status, NodeStatus.PENDING)
+
+
+class Counter(Node):
+
+    def __init__(self, name, *args, **kwargs):
+        super(Counter, self).__init__(name, run_cb=self.count, *args, **kwargs)
+
+    def count(self, nodedata):
+        nodedata.count = nodedata.get_data('count', 0) + 1
+        return self._get_status(NodeStatus.ACTIVE, "Counting %(node)s")
+
+
+class TestClone(object):
+
+    def setUp(self):
+        self.blackboard = Blackboard()
+        self.external = Node('external', blackboard=self.blackboard)
+        self.root = Behavior('root', blackboard=self.blackboard)
+        self.wrap = Decorator('wrap', blackboard=self.blackboard)
+        self.counter = Counter('counter', blackboard=self.blackboard)
+        self.reader = Node('reader', blackboard=self.blackboard,
+                           run_cb=lambda nodedata: None)
+        self.wrap.set_child(self.counter)
+        self.root.add_child(self.wrap)
+        self.root.add_child(self.reader)
+        self.blackboard.add_remapping(self.counter._id, 'count',
+                                      self.reader._id, 'total')
+        self.blackboard.add_remapping(self.external._id, 'goal',
+                                      self.reader._id, 'goal')
+        self.blackboard.save('goal', 'dock', self.external._id)
+
+    def test_topology(self):
+        copy = self.root.clone()
+        assert type(copy) is Behavior
+        wrap, reader = copy.get_children()
+        counter = wrap.get_children()[0]
+        assert type(counter) is Counter
+        assert_equal([node._name for node in (copy, wrap, counter, reader)],
+                     ['root', 'wrap', 'counter', 'reader'])
+        for node, new in ((self.root, copy), (self.wrap, wrap),
+                          (self.counter, counter), (self.reader, reader)):
+            assert_not_equal(node._id, new._id)
+            assert new._blackboard is self.blackboard
+        assert wrap._parent is copy
+        assert counter._parent is wrap
+        assert copy._parent is None
+        assert_equal(counter.get_path(), 'root/wrap/counter')
+        # the prototype is not changed
+        assert_equal(self.root.get_children(), [self.wrap, self.reader])
+        assert self.counter._parent is self.wrap
+
+    def test_callbacks(self):
+        copy = self.root.clone()
+        counter = copy.get_children()[0].get_children()[0]
+        reader = copy.get_children()[1]
+        # bound to the copy, functions are shared
+        assert counter._run_cb.__self__ is counter
+        assert reader._run_cb is self.reader._run_cb
+
+        counter.tick()
+        counter.tick()
+        blackboard = self.blackboard
+        assert_equal(blackboard.get('count', counter._id), 2)
+        assert_equal(blackboard.get_memory(self.counter._id).keys(), [])
+        assert_equal(counter.get_result().text, "Counting counter")
+
+    def test_remapping(self):
+        self.counter.tick()
+        copy = self.root.clone()
+        counter = copy.get_children()[0].get_children()[0]
+        reader = copy.get_children()[1]
+        blackboard = self.blackboard
+        # node data is copied
+        assert_equal(blackboard.get('count', counter._id), 1)
+        counter.tick()
+        assert_equal(blackboard.get('total', reader._id), 2)
+        assert_equal(blackboard.get('total', self.reader._id), 1)
+        # remappings from outside of the subtree are kept
+        assert_equal(blackboard.get('goal', reader._id), 'dock')
+
+    def test_state(self):
+        self.counter.tick()
+        self.root._open_nodes = [self.wrap._id]
+        self.reader.force(NodeStatus.FAIL)
+        copy = self.root.clone()
+        wrap, reader = copy.get_children()
+        counter = wrap.get_children()[0]
+        assert_equal(counter.get_result().status, NodeStatus.ACTIVE)
+        assert_equal(copy._open_nodes, [wrap._id])
+        assert_equal(reader._force_state.status, NodeStatus.FAIL)
+        assert_equal(counter._statuses, {})
+
+    def test_mutable_state(self):
+        self.blackboard.save('seen', ['start'], self.counter._id)
+        self.counter.limits = {'count': 1}
+        new = self.counter.clone()
+        self.blackboard.get('seen', new._id).append('dock')
+        new.limits['count'] = 2
+        assert_equal(self.blackboard.get('seen', self.counter._id), ['start'])
+        assert_equal(self.counter.limits, {'count': 1})
+
+    def test_template(self):
+        self.root.clone()
+        template = self.root._template
+        # callbacks registered since are bound to the copies
+        self.reader.register_run_cb(self.counter.count)
+        new = self.root.clone()
+        assert self.root._template is template
+        assert new._template is None
+        counter = new.get_children()[0].get_children()[0]
+        assert new.get_children()[1]._run_cb.__self__ is counter
+
+        # the template is dropped when the subtree changes
+        self.wrap.set_child(Node('other', blackboard=self.blackboard))
+        assert self.root._template is None
+        new = self.root.clone()
+        assert_equal(new.get_children()[0].get_children()[0]._name, 'other')
+        assert new.get_children()[1]._run_cb.__self__ is self.counter
+
+    def test_hooks(self):
+        self.counter._hooks = ()
+        self.counter.tick = lambda: None
+        copy = self.counter.clone()
+        assert '_hooks' not in copy.__dict__
+        assert 'tick' not in copy.__dict__
+        assert_equal(copy.tick().status, NodeStatus.ACTIVE)
+
+    def test_blackboard(self):
+        blackboard = Blackboard()
+        self.blackboard.link_scopes(self.root)
+        copy = self.root.clone(blackboard)
+        reader = copy.get_children()[1]
+        assert reader._blackboard is blackboard
+        assert_equal(blackboard._scope_parents[reader._id], copy._id)
+        assert_equal(blackboard._scope_parents[copy._id], None)
+        blackboard.save('mode', 'auto', copy._id)
+        assert_equal(blackboard.get_memory(reader._id).mode, 'auto')
+
+        # the copies are dropped with their nodes
+        ids = [copy._id, reader._id]
+        del copy, reader
+        gc.collect()
+        blackboard.collect()
+        for scope in ids:
+            assert scope not in blackboard._node_memory
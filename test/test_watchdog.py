@@ -0,0 +1,135 @@
+# Copyright 2016 Toyota Research Institute
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+
+#   http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import time
+
+from nose.tools import assert_equal
+from nose.tools import assert_raises
+
+from task_behavior_engine.branch import Sequencer
+from task_behavior_engine.hooks import get_hooks
+from task_behavior_engine.node import Success
+from task_behavior_engine.tree import Blackboard
+from task_behavior_engine.tree import Node
+from task_behavior_engine.tree import NodeStatus
+from task_behavior_engine.watchdog import ACTIVE
+from task_behavior_engine.watchdog import Watchdog
+from task_behavior_engine.watchdog import get_budget
+from task_behavior_engine.watchdog import set_budget
+
+
+def hang(nodedata):
+    time.sleep(0.1)
+    return NodeStatus(NodeStatus.SUCCESS)
+
+
+class TestWatchdog(object):
+
+    def setUp(self):
+        blackboard = Blackboard()
+        self.root = Sequencer("root", blackboard=blackboard)
+        self.success = Success("success", blackboard=blackboard)
+        self.cancels = 0
+        self.job = Node("job", blackboard=blackboard, run_cb=self.wait,
+                        cancel_cb=self.cancel)
+        self.root.add_child(self.success)
+        self.root.add_child(self.job)
+        self.overruns = []
+        self.watchdog = None
+
+    def tearDown(self):
+        if self.watchdog is not None:
+            self.watchdog.stop()
+
+    def wait(self, nodedata):
+        return NodeStatus(NodeStatus.ACTIVE)
+
+    def cancel(self, nodedata):
+        self.cancels += 1
+
+    def test_budget(self):
+        assert_equal(get_budget(self.job), None)
+        set_budget(self.job, 0.5)
+        set_budget(self.job, 2, ACTIVE)
+        assert_equal(get_budget(self.job), 0.5)
+        assert_equal(get_budget(self.job, ACTIVE), 2)
+        set_budget(self.job, None)
+        assert_equal(get_budget(self.job), None)
+        assert_raises(ValueError, set_budget, self.job, 1, 'run')
+        assert_raises(ValueError, Watchdog, self.root,
+                      action=NodeStatus.SUCCESS)
+        # copies have their own budgets
+        set_budget(self.job, 1.0)
+        job = self.job.clone()
+        set_budget(job, 5.0)
+        assert_equal(get_budget(self.job), 1.0)
+        assert_equal(get_budget(job), 5.0)
+
+    def test_hung_callback(self):
+        hung = Node("hung", blackboard=self.root._blackboard, run_cb=hang)
+        self.root.prepend_child(hung)
+        set_budget(hung, 0.01)
+        self.watchdog = Watchdog(self.root, interval=0.005,
+                                 on_overrun=self.overruns.append)
+        self.watchdog.start()
+        # only nodes with budgets are hooked
+        assert_equal(get_hooks(self.success), ())
+        assert_equal(get_hooks(hung), (self.watchdog,))
+
+        self.root.tick()
+        assert_equal(len(self.overruns), 1)
+        overrun = self.overruns[0]
+        assert_equal(overrun.path, 'root/hung')
+        assert_equal(overrun.phase, '_run')
+        assert_equal(overrun.budget, 0.01)
+        assert overrun.elapsed >= 0.01
+        assert 'in hang' in overrun.stack
+
+        self.watchdog.stop()
+        assert_equal(get_hooks(hung), ())
+
+    def test_active_fail(self):
+        set_budget(self.job, 0.05, ACTIVE)
+        self.watchdog = Watchdog(self.root, interval=60,
+                                 action=NodeStatus.FAIL,
+                                 on_overrun=self.overruns.append)
+        self.watchdog.start()
+        self.root.tick()
+        assert_equal(self.watchdog.check(), [])
+        self.root.tick()
+
+        overruns = self.watchdog.check(time.time() + 1)
+        assert_equal([(o.path, o.phase) for o in overruns],
+                     [('root/job', ACTIVE)])
+        assert_equal(self.overruns, overruns)
+        # reported once
+        assert_equal(self.watchdog.check(time.time() + 1), [])
+        assert_equal(self.root.tick(), NodeStatus.FAIL)
+
+    def test_active_cancel(self):
+        set_budget(self.job, 0.05, ACTIVE)
+        self.watchdog = Watchdog(self.root, interval=60,
+                                 action=NodeStatus.CANCEL,
+                                 on_overrun=self.overruns.append)
+        self.watchdog.start()
+        self.job.tick()
+        self.watchdog.check(time.time() + 1)
+        assert_equal(self.cancels, 0)
+        assert_equal(self.job.tick(), NodeStatus.CANCEL)
+        assert_equal(self.cancels, 1)
+
+        # the next run starts a new budget
+        self.job.tick()
+        assert_equal(self.watchdog.check(), [])
+        assert_equal(len(self.watchdog.check(time.time() + 1)), 1)